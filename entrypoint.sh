@@ -4,12 +4,39 @@
 
 python manage.py migrate
 
+# Cached template fragments may be rendered by the templates of a previous release.
+if [ "${CACHE_BACKEND:-file}" = "file" ]; then
+    rm -rf "${CACHE_LOCATION:-/var/tmp/steambird-cache}"
+fi
+
+# Metrics of the previous run would be added to the new ones.
+if [ -n "${METRICS_DIR}" ]; then
+    rm -rf "${METRICS_DIR}"
+    mkdir -p "${METRICS_DIR}"
+fi
+
+# SERVER_MODE=asgi serves the site with uvicorn, where the lookup views are async and
+#  do not hold a worker while waiting for external services.
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+    SERVE_STATIC=True exec uvicorn \
+        --host 0.0.0.0 \
+        --port 8000 \
+        --workers "${ASGI_WORKERS:-4}" \
+        --timeout-keep-alive 5 \
+        steambird.asgi:application
+fi
+
+# Static files with a hash in their name (see steambird.util.static) are cached by browsers for a
+#  year, and their gzipped copies are served to browsers that accept them.
 uwsgi \
     --chdir "/project/"\
     --static-map "/static=static" \
+    --static-gzip-all \
+    --static-expires ".*\.[0-9a-f]{12}\.[^/]+$ 31536000" \
     --http=0.0.0.0:8000 \
     --processes=4 \
     --harakiri=20 \
+    --enable-threads \
     --vacuum \
     -b 32768 \
     --module=steambird.wsgi:application
@@ -2,7 +2,7 @@ from django.contrib import admin
 
 from steambird.models import Book, Course, CourseStudy, MSP, MSPLine, \
     OtherMaterial, ScientificArticle, Study, StudyAssociation, StudyMaterial, \
-    StudyMaterialEdition, Teacher, Config, AuthToken
+    StudyMaterialEdition, Teacher, Config, AuthToken, OutboxMessage, MSPNotification
 
 admin.site.register(Study)
 admin.site.register(StudyMaterial)
@@ -17,6 +17,7 @@ admin.site.register(Book)
 admin.site.register(OtherMaterial)
 admin.site.register(ScientificArticle)
 admin.site.register(Config)
+admin.site.register(MSPNotification)
 
 
 @admin.register(AuthToken)
@@ -27,3 +28,17 @@ class AuthTokenAdmin(admin.ModelAdmin):
         'user',
         'login_url'
     )
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    exclude = ('data',)
+    list_display = (
+        'subject',
+        'recipients',
+        'status',
+        'attempts',
+        'next_attempt',
+        'sent',
+    )
+    list_filter = ('status',)
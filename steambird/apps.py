@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class SteambirdConfig(AppConfig):
+    name = 'steambird'
+
+    def ready(self):
+        # pylint: disable=import-outside-toplevel, unused-import
+        from steambird.mail.mailsender import reload_templates
+        # Importing these modules connects their signal receivers.
+        from steambird.mail import notifications
+        from steambird import cache
+        from steambird.util import db, queries
+
+        reload_templates()
@@ -0,0 +1,50 @@
+"""
+ASGI config for steambird project, which serves the async lookup views without tying up a worker
+per lookup. See entrypoint.sh for the ASGI deployment mode.
+
+It exposes the ASGI callable as a module-level variable named ``application``.
+
+For more information on this file, see
+https://docs.djangoproject.com/en/3.1/howto/deployment/asgi/
+"""
+
+import os
+
+from django.core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'steambird.settings')
+
+# pylint: disable=invalid-name
+django_application = get_asgi_application()
+
+if os.getenv('SERVE_STATIC', 'False') in ['True', '1', 'true']:
+    # pylint: disable=wrong-import-position
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler
+
+    # There is no uWSGI to serve static files in the ASGI deployment mode.
+    django_application = ASGIStaticFilesHandler(django_application)
+
+# pylint: disable=wrong-import-position
+from steambird.util.http import aclose_clients
+
+
+async def _lifespan(receive, send) -> None:
+    """
+    Closes the pooled connections to upstreams when the worker shuts down, which Django 3.1 does
+    not handle lifespan events for.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await aclose_clients()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send) -> None:
+    if scope['type'] == 'lifespan':
+        await _lifespan(receive, send)
+    else:
+        await django_application(scope, receive, send)
@@ -1,69 +1,65 @@
-import re
-
 from django import views
+from django.conf import settings
 from django.http.response import HttpResponseBadRequest, JsonResponse
-from vobject.base import Component
 
-from steambird.util.import_from_ut_people import search_people, read_vcard
+from steambird.util.http import UpstreamUnavailable
+from steambird.util.import_from_ut_people import search_people, read_vcards, asearch_people, \
+    aread_vcards, describe_person
+from steambird.util.query_cache import QueryCache
 
 
-class FindPeopleView(views.View):
-    @staticmethod
-    def _get_first_name(name):
-        search = re.search(r"\(([^\\]*)\)", name)
+def _person_matches(query: str, person: dict) -> bool:
+    text = ' '.join(value.lower() for value in person.values() if isinstance(value, str))
+    return all(word in text for word in query.split())
 
-        return None if search is None else search.group(1)
 
-    @staticmethod
-    def _get_surname_prefix(full_name, family_name):
-        search = re.search(r"\.([^.]*)$", full_name)
+# pylint: disable=invalid-name
+people_cache = QueryCache(settings.PEOPLE_SEARCH_CACHE_TTL, matches=_person_matches,
+                          prefix_max_results=settings.PEOPLE_SEARCH_PREFIX_MAX_RESULTS)
 
-        return None if search is None else search.group(1)[1:-(len(family_name) + 3)]
 
-    @staticmethod
-    def _get_initials(given_name):
-        search = re.search(r"^.*\.", given_name)
+def _people_unavailable() -> JsonResponse:
+    return JsonResponse({'error': 'The people search did not respond in time'}, status=504)
 
-        return None if search is None else search.group(0)[1:]
-
-    @staticmethod
-    def _get_acedemic_title(full_name, initials):
-        return full_name.split(initials)[0][:-1]
 
+class FindPeopleView(views.View):
     @staticmethod
-    def _serialize_vcard(vcard: Component):
-        return {line.name: line.value for line in vcard.contents}
+    def _find_people(query):
+        people = search_people(query)
+        people = [person for person in people if person['type'] == 'person']
+        vcards = read_vcards(person['vcard'] for person in people)
+        return [describe_person(person, vcards[person['vcard']]) for person in people]
 
     # pylint: disable=no-self-use
     def get(self, request):
         if 'query' not in request.GET:
             return HttpResponseBadRequest()
 
-        people = search_people(request.GET['query'])
-        new_people = []
+        try:
+            people = people_cache.get(request.GET['query'], FindPeopleView._find_people)
+        except UpstreamUnavailable:
+            return _people_unavailable()
+
+        return JsonResponse(people, safe=False)
 
-        for person in people:
-            if person['type'] != 'person':
-                continue
 
-            vcard = read_vcard(person['vcard'])
+async def _afind_people(query):
+    people = await asearch_people(query)
+    people = [person for person in people if person['type'] == 'person']
+    vcards = await aread_vcards(person['vcard'] for person in people)
+    return [describe_person(person, vcards[person['vcard']]) for person in people]
 
-            new_person = {
-                **person,
-                'first_name': FindPeopleView._get_first_name(person['name']),
-            }
 
-            if vcard is not None:
-                initials = FindPeopleView._get_initials(vcard.n.value.given)
-                new_person = {
-                    **new_person,
-                    'surname_prefix': FindPeopleView._get_surname_prefix(
-                        str(vcard.n.value), vcard.n.value.family),
-                    'family_name': vcard.n.value.family,
-                    'initials': initials,
-                    'acedemic_title': FindPeopleView._get_acedemic_title(vcard.fn.value, initials)
-                }
+async def afind_people_view(request):
+    """
+    Async variant of :py:class:`FindPeopleView`.
+    """
+    if 'query' not in request.GET:
+        return HttpResponseBadRequest()
 
-            new_people.append(new_person)
+    try:
+        people = await people_cache.aget(request.GET['query'], _afind_people)
+    except UpstreamUnavailable:
+        return _people_unavailable()
 
-        return JsonResponse(new_people, safe=False)
+    return JsonResponse(people, safe=False)
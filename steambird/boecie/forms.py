@@ -88,6 +88,12 @@ def get_course_form(course_id=None):
 
 
             }
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # The selected MSPs are rendered with str(), which needs their lines.
+            self.fields['materials'].queryset = MSP.objects.with_lines()
+
     return CourseForm
 
 
@@ -0,0 +1,223 @@
+"""
+Synchronisation of Teachers with the people search of the University of Twente. A list of e-mail
+addresses or names is resolved concurrently, the results are compared with the stored Teachers
+by e-mail address, and the differences are stored in bulk, including a User and an AuthToken for
+every new Teacher.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+from steambird.cache import COURSES, ROLES
+from steambird.models import Teacher, AuthToken
+from steambird.util.http import UpstreamUnavailable
+from steambird.util.import_from_ut_people import search_people, read_vcard, describe_person
+
+
+LOGGER = logging.getLogger(__name__)
+
+TEACHER_FIELDS = ('titles', 'initials', 'first_name', 'surname_prefix', 'last_name')
+"""
+The fields of a Teacher that are taken from the people search. The e-mail address identifies a
+Teacher; whether a Teacher is active or retired is left alone.
+"""
+
+
+@dataclass
+class SyncReport:
+    """
+    Outcome of a synchronisation, per entry or e-mail address
+    """
+    entries: int = 0
+    not_found: List[str] = field(default_factory=list)
+    ambiguous: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+    created: List[str] = field(default_factory=list)
+    updated: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+
+
+def _teacher_data(person: dict) -> Optional[Dict[str, Optional[str]]]:
+    if not person.get('email') or not person.get('family_name'):
+        return None
+
+    return {
+        'email': person['email'].strip(),
+        'titles': person['acedemic_title'] or None,
+        'initials': person['initials'] or '',
+        'first_name': person['first_name'] or '',
+        'surname_prefix': person['surname_prefix'] or None,
+        'last_name': person['family_name'],
+    }
+
+
+def resolve(entry: str) -> Tuple[str, Optional[dict]]:
+    """
+    Looks up a single person. An e-mail address has to match exactly, a name has to match a
+    single person.
+
+    :param entry: E-mail address or name
+    :return: 'found', 'not_found', 'ambiguous' or 'failed', and the Teacher fields if found
+    """
+    try:
+        people = [person for person in search_people(entry) if person['type'] == 'person']
+    except (UpstreamUnavailable, ValueError, KeyError) as error:
+        LOGGER.warning('Searching for %s failed: %r', entry, error)
+        return 'failed', None
+
+    if '@' in entry:
+        people = [person for person in people
+                  if (person.get('email') or '').lower() == entry.lower()]
+
+    if not people:
+        return 'not_found', None
+    if len(people) > 1:
+        return 'ambiguous', None
+
+    data = _teacher_data(describe_person(people[0], read_vcard(people[0]['vcard'])))
+    if data is None:
+        return 'failed', None
+
+    return 'found', data
+
+
+def _unique_usernames(bases: List[str]) -> List[str]:
+    """
+    Makes usernames unique, among each other and the existing Users, by appending a number.
+    """
+    if not bases:
+        return []
+
+    taken = set(User.objects.filter(
+        reduce(or_, (Q(username__startswith=base) for base in set(bases)))
+    ).values_list('username', flat=True))
+
+    usernames = []
+    for base in bases:
+        username, number = base, 2
+        while username in taken:
+            username, number = '{}{}'.format(base, number), number + 1
+        taken.add(username)
+        usernames.append(username)
+
+    return usernames
+
+
+def _create_users(teachers: List[Teacher]) -> List[User]:
+    usernames = _unique_usernames([
+        (teacher.initials.replace('.', '') + teacher.last_name)[:140] for teacher in teachers
+    ])
+
+    return User.objects.bulk_create([
+        User(
+            username=username,
+            first_name=teacher.first_name,
+            last_name=(teacher.surname_prefix or '') + teacher.last_name,
+            password=make_password(None),
+        )
+        for username, teacher in zip(usernames, teachers)
+    ])
+
+
+def _create_tokens(users: List[User]) -> None:
+    AuthToken.objects.bulk_create([AuthToken(user=user) for user in users])
+
+
+def _create_teachers(teachers: List[Teacher], users: List[User]) -> None:
+    for teacher, user in zip(teachers, users):
+        teacher.user = user
+    Teacher.objects.bulk_create(teachers)
+
+
+def _log_progress(message: str) -> None:
+    LOGGER.info('%s', message)
+
+
+def _resolve_all(entries: List[str], workers: int, report: SyncReport,
+                 progress: Callable[[str], None]) -> Dict[str, dict]:
+    """
+    :return: Lower case e-mail address -> Teacher fields, of the entries that were found. The
+        others are added to the report.
+    """
+    found: Dict[str, dict] = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for done, (entry, (status, data)) in enumerate(
+                zip(entries, executor.map(resolve, entries)), 1):
+            if status == 'found':
+                found.setdefault(data['email'].lower(), data)
+            else:
+                getattr(report, status).append(entry)
+            if done % 25 == 0 or done == len(entries):
+                progress('Resolved {}/{}'.format(done, len(entries)))
+
+    return found
+
+
+def _compare(found: Dict[str, dict], report: SyncReport) -> Tuple[List[Teacher], List[Teacher]]:
+    """
+    :return: The Teachers to create, and the stored Teachers that changed
+    """
+    existing = {
+        teacher.email_lower: teacher
+        for teacher in Teacher.objects.annotate(email_lower=Lower('email'))
+        .filter(email_lower__in=list(found))
+    }
+
+    new, changed = [], []
+    for email, data in found.items():
+        teacher = existing.get(email)
+
+        if teacher is None:
+            new.append(Teacher(**data))
+            report.created.append(data['email'])
+        elif any(getattr(teacher, name) != data[name] for name in TEACHER_FIELDS):
+            for name in TEACHER_FIELDS:
+                setattr(teacher, name, data[name])
+            changed.append(teacher)
+            report.updated.append(teacher.email)
+        else:
+            report.unchanged.append(teacher.email)
+
+    return new, changed
+
+
+def sync_teachers(entries: Iterable[str], workers: int = 8, dry_run: bool = False,
+                  progress: Callable[[str], None] = _log_progress) -> SyncReport:
+    """
+    Creates or updates a Teacher for every entry.
+
+    :param entries: E-mail addresses or names
+    :param workers: Number of concurrent lookups
+    :param dry_run: Do everything, except storing the changes
+    :param progress: Called with progress messages, which are logged by default
+    :return: A report of the synchronisation
+    """
+    report = SyncReport()
+    unique_entries = list(dict.fromkeys(
+        entry.strip() for entry in entries if entry and entry.strip()))
+    report.entries = len(unique_entries)
+
+    new, changed = _compare(_resolve_all(unique_entries, workers, report, progress), report)
+
+    if not dry_run:
+        with transaction.atomic():
+            Teacher.objects.bulk_update(changed, TEACHER_FIELDS)
+            users = _create_users(new)
+            _create_tokens(users)
+            _create_teachers(new, users)
+            # Bulk updates and creates do not send the signals that invalidate cached values.
+            if changed:
+                COURSES.bump()
+            if new:
+                ROLES.bump()
+
+    return report
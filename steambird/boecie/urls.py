@@ -1,12 +1,13 @@
 from django.urls import path
 
-from steambird.boecie.api_views import FindPeopleView
+from steambird.boecie.api_views import FindPeopleView, afind_people_view
 from steambird.boecie.views import CourseCreateView, CourseUpdateView, \
     HomeView, StudyDetailView, TeacherCreateView, TeacherDeleteView, \
     CourseStudyListView, CourseStudyDeleteView, TeacherEditView, \
     TeachersListView, \
     LmlExport, ConfigView, CoursesListView, MSPDetail, MaterialListView, \
     MSPCreateView
+from steambird.util import sync_or_async
 
 # pylint: disable=invalid-name
 urlpatterns = [
@@ -40,7 +41,8 @@ urlpatterns = [
     # path('lml_export/', LmlExportOverView.as_view(), name='lmlexport.overview'),
     path('lml_export/', LmlExport.as_view(), name='lml_export'),
 
-    path('api/find_teacher', FindPeopleView.as_view(), name='api_find_teacher'),
+    path('api/find_teacher', sync_or_async(FindPeopleView.as_view(), afind_people_view),
+         name='api_find_teacher'),
 ]
 
 # pylint: disable=invalid-name
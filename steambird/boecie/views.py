@@ -7,10 +7,10 @@ import datetime
 import io
 import logging
 from collections import defaultdict
-from typing import Optional, Any, Dict, Type
+from typing import Optional, Any, Dict, List, Type
 
 from django.contrib.auth.models import User
-from django.db.models import Count, Q, QuerySet
+from django.db.models import Count, Q, QuerySet, Prefetch
 from django.forms import Form, ModelForm
 from django.http import HttpRequest, Http404, HttpResponse, HttpResponseRedirect
 from django.shortcuts import render, redirect
@@ -22,6 +22,7 @@ from django_addanother.views import CreatePopupMixin
 
 from steambird.boecie.forms import ConfigForm, get_course_form, TeacherForm, \
     StudyCourseForm, LmlExportForm, MSPCreateForm
+from steambird.cache import cached, COURSES, ROLES
 from steambird.models import Book, Config, MSP, Study, Course, Teacher, \
     CourseStudy, MSPLineType, MSPLine, StudyMaterialEdition, AuthToken, StudyAssociation
 from steambird.models.coursetree import Period
@@ -34,6 +35,56 @@ from steambird.util import MultiFormView
 LOGGER = logging.getLogger(__name__)
 
 
+@cached(COURSES, ROLES)
+def study_progress(user_id: int, year: int, period: str) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    The number of courses of the studies of the associations of a user, in a year and period, and
+    how many of them are updated by teachers and associations. Cached until a course, study or
+    association changes.
+
+    :param user_id: Primary key of a User
+    :param year: Calendar year
+    :param period: Name of a Period
+    :return: Per study type, a dictionary per study
+    """
+    types = defaultdict(list)
+
+    studies = Study.objects.order_by('type') \
+        .filter(studyassociation__users__in=[user_id]) \
+        .annotate(course_total=Count('course', filter=Q(
+            course__period=period,
+            course__calendar_year=year))) \
+        .annotate(courses_updated_teacher=Count('course', filter=Q(
+            course__updated_teacher=True,
+            course__period=period,
+            course__calendar_year=year))) \
+        .annotate(courses_updated_associations=Count('course', filter=Q(
+            course__updated_associations=True,
+            course__period=period,
+            course__calendar_year=year)))
+
+    for study in studies:
+        course_total = study.course_total
+        courses_updated_teacher = study.courses_updated_teacher
+        courses_updated_associations = study.courses_updated_associations
+        types[study.type].append({
+            'name': study.name,
+            'type': study.type,
+            'id': study.pk,
+            'courses_total': course_total,
+            'courses_updated_teacher': courses_updated_teacher,
+            'courses_updated_teacher_p': round(
+                ((courses_updated_teacher / course_total * 100)
+                 if course_total > 0 else 0), 2),
+            'courses_updated_association': courses_updated_associations,
+            'courses_updated_association_p':
+                round((((courses_updated_associations - courses_updated_teacher) /
+                        course_total * 100) if course_total > 0 else 0), 2)
+        })
+
+    return dict(types)
+
+
 class HomeView(IsStudyAssociationMixin, View):
     """
     View that creates the Home-page of the Boecie view. Shows which courses you are linked to as
@@ -53,48 +104,12 @@ class HomeView(IsStudyAssociationMixin, View):
 
         # TODO: limit to study association you are part of
         context = {
-            'types': defaultdict(list)
+            'types': study_progress(self.request.user.pk, Config.get_system_value('year'),
+                                    Config.get_system_value('period')),
         }
 
-        year = Config.get_system_value('year')
-        period = Config.get_system_value('period')
-
-        studies = Study.objects.order_by('type') \
-            .filter(studyassociation__users__in=[self.request.user]) \
-            .annotate(course_total=Count('course', filter=Q(
-                course__period=period,
-                course__calendar_year=year))) \
-            .annotate(courses_updated_teacher=Count('course', filter=Q(
-                course__updated_teacher=True,
-                course__period=period,
-                course__calendar_year=year))) \
-            .annotate(courses_updated_associations=Count('course', filter=Q(
-                course__updated_associations=True,
-                course__period=period,
-                course__calendar_year=year)))
-
-        for study in studies:
-            course_total = study.course_total
-            courses_updated_teacher = study.courses_updated_teacher
-            courses_updated_associations = study.courses_updated_associations
-            context['types'][study.type].append({
-                'name': study.name,
-                'type': study.type,
-                'id': study.pk,
-                'courses_total': course_total,
-                'courses_updated_teacher': courses_updated_teacher,
-                'courses_updated_teacher_p': round(
-                    ((courses_updated_teacher / course_total * 100)
-                     if course_total > 0 else 0), 2),
-                'courses_updated_association': courses_updated_associations,
-                'courses_updated_association_p':
-                    round((((courses_updated_associations - courses_updated_teacher) /
-                            course_total * 100) if course_total > 0 else 0), 2)
-            })
-
         associations = StudyAssociation.objects.filter(users__in=[self.request.user])
 
-        context["types"] = dict(context["types"])
         context["studyassociations"] = associations
 
         # TODO: Add fixed MSP (not yet finalized by teacher) count (?)
@@ -123,17 +138,17 @@ class StudyDetailView(IsStudyAssociationMixin, FormView):
         """
 
         context = super().get_context_data(**kwargs)
-        context['study'] = Study.objects.get(pk=self.kwargs['pk'])
-        context['courses_not_updated'] = Course.objects.filter(
-            calendar_year=Config.get_system_value("year"),
-            period=Config.get_system_value("period"),
-            studies=self.kwargs['pk'],
-            updated_associations=False)
-        context['courses_updated'] = Course.objects.filter(
-            calendar_year=Config.get_system_value("year"),
-            period=Config.get_system_value("period"),
+        config = Config.current()
+        # The coordinator and teachers are shown for every course.
+        courses = Course.objects.filter(
+            calendar_year=config.year,
+            period=config.period,
             studies=self.kwargs['pk'],
-            updated_associations=True)
+        ).select_related('coordinator').prefetch_related('teachers')
+
+        context['study'] = Study.objects.get(pk=self.kwargs['pk'])
+        context['courses_not_updated'] = courses.filter(updated_associations=False)
+        context['courses_updated'] = courses.filter(updated_associations=True)
         return context
 
     # For the small included form on the top of the page
@@ -179,12 +194,15 @@ class CoursesListView(IsStudyAssociationMixin, TemplateView):
         }
 
         # Defines a base query configured to prefetch all resources that will
-        #  be used either in this view or in the template.
+        #  be used either in this view or in the template. Filtering on the CourseStudy lets the
+        #  ordering use the same join, so courses of several studies are listed once.
         courses = Course.objects.with_all_periods().filter(
-            studies__pk=study,
+            coursestudy__study=study,
             calendar_year=year)\
             .order_by('coursestudy__study_year', 'period')\
-            .prefetch_related('coursestudy_set', 'coordinator')
+            .select_related('coordinator')\
+            .prefetch_related(Prefetch('coursestudy_set',
+                                       queryset=CourseStudy.objects.filter(study=study)))
 
         per_year_quartile = defaultdict(list)
 
@@ -192,7 +210,7 @@ class CoursesListView(IsStudyAssociationMixin, TemplateView):
         #  query. After this ,the result of that query is cached.
         for course in courses:
             # As coursestudy_set was prefetched, this will not execute a second
-            #  query.
+            #  query. It only contains the CourseStudy of this study.
             for coursestudy in course.coursestudy_set.all():
                 for period in course.period_all:
                     period_obj = Period[period]
@@ -359,7 +377,8 @@ class TeachersListView(IsStudyAssociationMixin, ListView):
     """
 
     template_name = 'boecie/teachers_list.html'
-    queryset = Teacher.objects.all()
+    # The last login of every teacher is shown.
+    queryset = Teacher.objects.select_related('user')
     context_object_name = 'teachers'
 
 
@@ -384,7 +403,7 @@ class TeacherEditView(IsStudyAssociationMixin, UpdateView):
         """
 
         result = super().get_context_data()
-        result['courses'] = Teacher.objects.get(pk=self.kwargs['pk']).all_courses_year(
+        result['courses'] = self.object.all_courses_year(
             year=Config.get_system_value('year')
         )
         return result
@@ -467,7 +486,7 @@ class CourseStudyListView(IsStudyAssociationMixin, ListView):
         :return: Django Queryset object
         """
 
-        config = Config.objects.first()
+        config = Config.current()
         result = CourseStudy.objects.filter(
             course__calendar_year=config.year).order_by('study__name')\
             .prefetch_related('course', 'study')
@@ -494,7 +513,21 @@ class LmlExport(IsStudyAssociationMixin, FormView):
     template_name = 'boecie/lml_export_overview.html'
     form_class = LmlExportForm
 
-    # pylint: disable = too-many-nested-blocks, too-many-branches
+    @staticmethod
+    def _resolved_books(course: Course):
+        """
+        Yields the books of the resolved MSPs of a course, together with their MSP. Expects the
+        MSPs of the course, their lines and the materials of those lines to be prefetched.
+
+        :param course: The course to export the books of
+        :return: Generator of (MSP, Book) tuples
+        """
+        for msp in course.materials.all():
+            if msp.resolved():
+                for book in msp.last_line.materials.all():
+                    if isinstance(book, Book):
+                        yield msp, book
+
     def form_valid(self, form: Form) -> HttpResponse:
         """
         Validates if the form submitted contains valid options, returns a download for
@@ -507,6 +540,7 @@ class LmlExport(IsStudyAssociationMixin, FormView):
         form = form.cleaned_data
 
         period = Period[form.get('period')]
+        option = int(form.get('option'))
 
         result = io.StringIO()
 
@@ -514,94 +548,46 @@ class LmlExport(IsStudyAssociationMixin, FormView):
         writer.writerow('groep;vak;standaardvak;isbn;prognose;schoolBetaalt;verplicht;huurkoop;'
                         'vanprijs;korting;opmerking'.split(';'))
 
-        if int(form.get('option')) < 4:
-            for study in Study.objects.filter(type='bachelor'):
-                courses = [c for c in Course.objects.with_all_periods().filter(
-                    coursestudy__study_year=int(form.get('option')),
-                    calendar_year=form.get('year', Config.get_system_value('year')))
-                           if c.falls_in(period)]
-
-                for course in courses:
-                    for msp in MSP.objects.filter(course=course):
-                        if msp.resolved():
-                            for book in msp.mspline_set.last().materials.all():
-                                if isinstance(book, Book):
-                                    writer.writerow(
-                                        [
-                                            study,
-                                            'Module {year}.{period} - {name}'.format(
-                                                year=form.get('option'),
-                                                period=course.period[1],
-                                                name=course.name
-                                            ),
-                                            '',
-                                            book.ISBN,
-                                            '',
-                                            'n',
-                                            'verplicht' if msp.mandatory else 'aanbevolen',
-                                            'koop'
-                                            '',
-                                            '',
-                                            ''
-                                        ]
-                                    )
-
-        elif int(form.get('option')) == 4:
-            for study in Study.objects.filter(type='master'):
-                courses = [c for c in Course.objects.filter(
-                    calendar_year=form.get('year', datetime.date.today().year)
-                ) if c.falls_in(period)]
-
-                for course in courses:
-                    for msp in MSP.objects.filter(course=course):
-                        if msp.resolved():
-                            for book in msp.mspline_set.last().materials.all():
-                                if isinstance(book, Book):
-                                    writer.writerow(
-                                        [
-                                            study,
-                                            '{name}'.format(
-                                                name=course.name
-                                            ),
-                                            '',
-                                            book.ISBN,
-                                            '',
-                                            'n',
-                                            'verplicht' if msp.mandatory else 'aanbevolen',
-                                            'koop'
-                                            '',
-                                            '',
-                                            ''
-                                        ]
-                                    )
-        elif int(form.get('option')) == 5:
-            for study in Study.objects.filter('premaster'):
-                courses = [c for c in Course.objects.filter(
-                    calendar_year=form.get('year', datetime.date.today().year)
-                ) if c.falls_in(period)]
-
-                for course in courses:
-                    for msp in MSP.objects.filter(course=course):
-                        if msp.resolved():
-                            for book in msp.mspline_set.last().materials.all():
-                                if isinstance(book, Book):
-                                    writer.writerow(
-                                        [
-                                            study,
-                                            '{name}'.format(
-                                                name=course.name
-                                            ),
-                                            '',
-                                            book.ISBN,
-                                            '',
-                                            'n',
-                                            'verplicht' if msp.mandatory else 'aanbevolen',
-                                            'koop'
-                                            '',
-                                            '',
-                                            ''
-                                        ]
-                                    )
+        if option < 4:
+            studies = Study.objects.filter(type='bachelor')
+            courses = Course.objects.with_all_periods().filter(
+                coursestudy__study_year=option,
+                calendar_year=form.get('year') or Config.get_system_value('year'))
+            course_name = 'Module {year}.{period} - {name}'
+        else:
+            studies = Study.objects.filter(type='master' if option == 4 else 'premaster')
+            courses = Course.objects.with_all_periods().filter(
+                calendar_year=form.get('year', datetime.date.today().year))
+            course_name = '{name}'
+
+        # The rows do not depend on the study, so the courses and their books are retrieved once,
+        #  instead of once per study and MSP.
+        courses = [course for course in courses.prefetch_related(
+            Prefetch('materials', queryset=MSP.objects.with_lines())
+        ) if course.falls_in(period)]
+
+        for study in studies:
+            for course in courses:
+                for msp, book in self._resolved_books(course):
+                    writer.writerow(
+                        [
+                            study,
+                            course_name.format(
+                                year=option,
+                                period=course.period[1],
+                                name=course.name
+                            ),
+                            '',
+                            book.ISBN,
+                            '',
+                            'n',
+                            'verplicht' if msp.mandatory else 'aanbevolen',
+                            'koop',
+                            '',
+                            ''
+                        ]
+                    )
+
         response = HttpResponse(result.getvalue(), content_type="text/csv")
         response['Content-Disposition'] = 'attachment; filename="{}.csv"'.format('foobarbaz')
         return response
@@ -698,8 +684,9 @@ class MSPDetail(IsStudyAssociationMixin, FormView):
         :return: a context
         """
         try:
-            msp = MSP.objects.get(pk=self.kwargs.get("pk"))
-        except MSPLine.DoesNotExist as error:
+            # All lines are shown with their creator and materials.
+            msp = MSP.objects.with_lines().get(pk=self.kwargs.get("pk"))
+        except MSP.DoesNotExist as error:
             raise Http404 from error
 
         data = super().get_context_data(**kwargs)
@@ -731,8 +718,10 @@ class MSPDetail(IsStudyAssociationMixin, FormView):
                 })
 
                 if line.type == 'set_available_materials':
+                    # Unbound, as a bound form would be validated, with queries, when it is
+                    #  rendered.
                     data["lines"][-1]["materials"][-1]["form"] = \
-                        PrefilledMSPLineForm({
+                        PrefilledMSPLineForm(initial={
                             "msp": msp.pk,
                             "comment": "",
                             "materials": [material.pk],
@@ -0,0 +1,278 @@
+"""
+Caching of computed values, on top of Django's cache framework (see ``CACHE_BACKEND`` in the
+settings).
+
+A :py:class:`Namespace` groups cached values that depend on the same models. Its version is part
+of the key of every value in it, and changes when one of its models is saved or deleted, which
+invalidates all of its values at once, in all processes.
+
+A :py:class:`Key` is a typed cached value, computed by a function from the arguments it is
+retrieved with. Values are:
+
+- memoised per request (see :py:class:`RequestMemoMiddleware`), so a value that is needed a few
+  times in a request is only retrieved once,
+- recomputed by a single process at a time when they are missing, while the others wait for the
+  result, and recomputed a little before they expire, by one process, while the others still use
+  the current value (probabilistic early expiration), so an expiring value does not cause a
+  stampede of recomputations,
+- counted as hits and misses in :py:mod:`steambird.util.metrics`.
+
+Keys are usually made with :py:func:`cached`::
+
+    @cached(CONFIG)
+    def current_config() -> Config:
+        return Config.objects.first()
+
+    current_config()  # A Config, computed once per version of the CONFIG namespace
+"""
+import contextvars
+import math
+import random
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Dict, Generic, Iterable, Optional, Sequence, TypeVar
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+
+from steambird.util.metrics import CACHE_REQUESTS, record
+from steambird.util.middleware import HybridMiddleware
+
+
+T = TypeVar('T')
+
+DEFAULT_TIMEOUT = 600
+"""Seconds a value is kept, unless its namespace changes first."""
+
+LOCK_TIMEOUT = 10
+"""Seconds a process may take to compute a value, before others compute it too."""
+
+_memo: 'contextvars.ContextVar[Optional[Dict]]' = \
+    contextvars.ContextVar('steambird_cache_memo', default=None)
+
+
+@contextmanager
+def request_memo():
+    """
+    Memoises the values and namespace versions that are retrieved within the block.
+    """
+    token = _memo.set({})
+    try:
+        yield
+    finally:
+        _memo.reset(token)
+
+
+class RequestMemoMiddleware(HybridMiddleware):
+    """
+    Memoises cached values per request, see :py:func:`request_memo`.
+    """
+
+    def handle(self, request):
+        with request_memo():
+            return self.get_response(request)
+
+    async def ahandle(self, request):
+        with request_memo():
+            return await self.get_response(request)
+
+
+def _bump_on_change(namespace: 'Namespace', **_kwargs) -> None:
+    namespace.bump()
+
+
+def _bump_on_m2m_change(namespace: 'Namespace', action: str, **_kwargs) -> None:
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        namespace.bump()
+
+
+class Namespace:
+    """
+    A version shared by cached values, which changes when one of the given models changes.
+
+    :param name: Unique name
+    :param models: Models, as 'app_label.Model', of which saves and deletes change the version
+    :param m2m: Through models, as 'app_label.Model_field', of which changes of the relations
+        change the version
+    """
+
+    registry: Dict[str, 'Namespace'] = {}
+
+    def __init__(self, name: str, models: Iterable[str] = (), m2m: Iterable[str] = ()):
+        self.name = name
+        self.registry[name] = self
+
+        for model in models:
+            for signal in (post_save, post_delete):
+                signal.connect(partial(_bump_on_change, self), sender=model, weak=False,
+                               dispatch_uid='cache-namespace-{}'.format(name))
+        for through in m2m:
+            m2m_changed.connect(partial(_bump_on_m2m_change, self), sender=through, weak=False,
+                                dispatch_uid='cache-namespace-{}'.format(name))
+
+    @property
+    def _key(self) -> str:
+        return 'steambird:namespace:{}'.format(self.name)
+
+    def version(self) -> str:
+        """
+        :return: The current version, which is memoised per request
+        """
+        memo = _memo.get()
+        if memo is not None and self._key in memo:
+            return memo[self._key]
+
+        version = cache.get_or_set(self._key, lambda: uuid4().hex, None)
+        if memo is not None:
+            memo[self._key] = version
+        return version
+
+    def _set_version(self) -> None:
+        version = uuid4().hex
+        cache.set(self._key, version, None)
+        memo = _memo.get()
+        if memo is not None:
+            memo[self._key] = version
+
+    def bump(self) -> None:
+        """
+        Invalidates all values in this namespace, now and once the current transaction is
+        committed, so a value that is computed in between is not used either. Changes that do
+        not send signals, such as ``bulk_update``, should call this themselves.
+        """
+        self._set_version()
+        transaction.on_commit(self._set_version)
+
+
+class Key(Generic[T]):
+    """
+    A cached value of type T, see the module documentation.
+
+    :param name: Unique name, which is also used in the metrics
+    :param compute: Computes the value from the arguments that it is retrieved with, which
+        should have a stable str() that identifies them, such as ints and strings
+    :param namespaces: The namespaces that the value depends on
+    :param timeout: Seconds the value is kept, or None to keep it until a namespace changes
+    :param beta: How early values are recomputed; higher is earlier, 0 is never
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, name: str, compute: Callable[..., T], namespaces: Sequence[Namespace] = (),
+                 timeout: Optional[float] = DEFAULT_TIMEOUT, beta: float = 1.0):
+        self.name = name
+        self.compute = compute
+        self.namespaces = namespaces
+        self.timeout = timeout
+        self.beta = beta
+
+    def __call__(self, *args) -> T:
+        return self.get(*args)
+
+    def key(self, *args) -> str:
+        return ':'.join(['steambird', self.name] +
+                        [namespace.version() for namespace in self.namespaces] +
+                        [str(arg) for arg in args])
+
+    def _expires_early(self, expiry: Optional[float], delta: float) -> bool:
+        """
+        Whether to recompute a value before it expires. The closer the expiry, and the longer the
+        value took to compute, the more likely this is.
+        """
+        if expiry is None or self.beta <= 0:
+            return False
+        return time.time() - delta * self.beta * math.log(1 - random.random()) >= expiry
+
+    def _store(self, key: str, args) -> T:
+        start = time.perf_counter()
+        value = self.compute(*args)
+        delta = time.perf_counter() - start
+
+        expiry = None if self.timeout is None else time.time() + self.timeout
+        cache.set(key, (value, delta, expiry), self.timeout)
+        return value
+
+    def _recompute(self, key: str, args, current) -> T:
+        lock = key + ':lock'
+        if cache.add(lock, True, LOCK_TIMEOUT):
+            try:
+                return self._store(key, args)
+            finally:
+                cache.delete(lock)
+
+        # Another process is computing the value; use the current one while it does.
+        if current is not None:
+            return current[0]
+
+        deadline = time.monotonic() + LOCK_TIMEOUT
+        while time.monotonic() < deadline:
+            time.sleep(0.05)
+            entry = cache.get(key)
+            if entry is not None:
+                return entry[0]
+
+        return self._store(key, args)
+
+    def get(self, *args) -> T:
+        """
+        :param args: The arguments to compute the value from
+        :return: The value, from the request memo or cache if it is there, computed otherwise
+        """
+        key = self.key(*args)
+        memo = _memo.get()
+        if memo is not None and key in memo:
+            record(CACHE_REQUESTS, key=self.name, result='memo')
+            return memo[key]
+
+        entry = cache.get(key)
+        if entry is None:
+            result = 'miss'
+            value = self._recompute(key, args, None)
+        elif self._expires_early(entry[2], entry[1]):
+            result = 'early'
+            value = self._recompute(key, args, entry)
+        else:
+            result = 'hit'
+            value = entry[0]
+
+        record(CACHE_REQUESTS, key=self.name, result=result)
+        if memo is not None:
+            memo[key] = value
+        return value
+
+    def invalidate(self, *args) -> None:
+        """
+        Removes the value for the given arguments from the cache and the request memo.
+        """
+        key = self.key(*args)
+        cache.delete(key)
+        memo = _memo.get()
+        if memo is not None:
+            memo.pop(key, None)
+
+
+def cached(*namespaces: Namespace, timeout: Optional[float] = DEFAULT_TIMEOUT,
+           name: Optional[str] = None) -> Callable[[Callable[..., T]], Key[T]]:
+    """
+    Makes a :py:class:`Key` of a function, which is named after the function by default.
+    """
+    def decorator(compute: Callable[..., T]) -> Key[T]:
+        return Key(name or '{}.{}'.format(compute.__module__, compute.__qualname__), compute,
+                   namespaces, timeout)
+
+    return decorator
+
+
+CONFIG = Namespace('config', models=['steambird.Config'])
+"""The site configuration."""
+
+COURSES = Namespace('courses', models=[
+    'steambird.Course', 'steambird.CourseStudy', 'steambird.Study', 'steambird.Teacher',
+], m2m=['steambird.Course_teachers', 'steambird.CourseStudy'])
+"""Courses with their studies, coordinators and teachers."""
+
+ROLES = Namespace('roles', models=['steambird.StudyAssociation', 'steambird.Teacher'],
+                  m2m=['steambird.StudyAssociation_users', 'steambird.StudyAssociation_studies'])
+"""Which users are teachers or members of a study association, and of which studies."""
@@ -7,6 +7,7 @@ one language per email must be specified.
 .. _RFC8255: https://tools.ietf.org/html/rfc8255
 """
 
+import copy
 import os
 import re
 import sys
@@ -16,22 +17,26 @@ from email.encoders import encode_base64
 from email.mime.base import MIMEBase
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from typing import List, Tuple
+from typing import Dict, List, NamedTuple, Optional, Tuple
 
 from django import get_version
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives, SafeMIMEMultipart, \
     SafeMIMEText, EmailMessage, get_connection
+from django.template.backends.django import Template
 from django.template.loader import get_template
 from django.template.loaders.app_directories import get_app_template_dirs
 from django.utils import translation
 from django.utils.translation import ugettext as _, get_language
 
+from steambird.mail.outbox import enqueue
+from steambird.util.metrics import MAILS, record
+
 
 __ALL__ = [
     'get_mailer_name', 'language', 'MultiTemplatableEmailMessage',
     'MultilingualEmailMessage', 'create_multilingual_email', 'create_email',
-    'send_mimemessages', '_test'
+    'send_mimemessages', 'queue_mimemessages', 'reload_templates', '_test'
 ]
 
 
@@ -140,38 +145,119 @@ class MultilingualEmailMessage(EmailMultiAlternatives):
         self.languages.append((lang, content))
 
 
+class MailTemplate(NamedTuple):
+    """
+    A single compiled mail template, for one language and one MIME subtype.
+    """
+    name: str
+    locale: str
+    subtype: str
+    template: Template
+
+    def render(self, context: dict) -> str:
+        return self.template.render({
+            'locale': self.locale,
+            **context,
+        })
+
+
+class TemplateRegistry:
+    """
+    Registry of all mail templates, compiled once. Templates are found in the
+    `mail` directory of any app template directory, following the pattern
+    `mail/<name>/<locale>.<subtype>`.
+
+    The registry is populated when the steambird app is ready, so that
+    building a message only has to render the context. During development,
+    :func:`reload_templates` can be called to pick up changed templates.
+    """
+
+    regex = re.compile(
+        r'.*/mail/(?P<name>.*)/(?P<locale>[a-z]+)\.(?P<subtype>[a-z]+)')
+
+    header_templates = [
+        ("steambird/mail/multilingual_header.html", "html"),
+        ("steambird/mail/multilingual_header.plain", "plain"),
+    ]
+
+    def __init__(self):
+        self.templates: Dict[str, Dict[str, List[MailTemplate]]] = {}
+        self.header: Optional[MIMEMultipart] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self.header is not None
+
+    def load(self) -> None:
+        """
+        Collects and compiles all mail templates, and pre-renders the static
+        header that is included in multilingual mails.
+
+        :return: None
+        """
+        templates = defaultdict(lambda: defaultdict(list))
+
+        for template_dir in get_app_template_dirs("templates"):
+            for directory, _dirs, filenames in os.walk(template_dir):
+                for filename in sorted(filenames):
+                    path = os.path.join(directory, filename)
+                    match = self.regex.match(path)
+                    if match:
+                        d = match.groupdict()
+                        templates[d['name']][d['locale']].append(MailTemplate(
+                            template=get_template(
+                                os.path.relpath(path, template_dir)),
+                            **d,
+                        ))
+
+        header = MIMEMultipart(_subtype='alternative')
+        with language(settings.LANGUAGE_CODE):
+            for template_name, subtype in self.header_templates:
+                header.attach(SafeMIMEText(
+                    get_template(template_name).render({}),
+                    _subtype=subtype, _charset="utf-8"))
+        header.add_header("Content-Disposition", "inline")
+
+        self.templates = {k: dict(v) for k, v in templates.items()}
+        self.header = header
+
+    def get(self, template_name: str) -> Dict[str, List[MailTemplate]]:
+        """
+        :param template_name: The name of the mail template
+        :return: Dict of locale -> list of templates for that locale
+        """
+        return self.templates[template_name]
+
+    def get_header(self) -> MIMEMultipart:
+        """
+        :return: A copy of the pre-rendered multilingual header, which can be
+            attached to a message.
+        """
+        return copy.deepcopy(self.header)
+
+
 # pylint: disable=invalid-name
-templates = None
+registry = TemplateRegistry()
 
 
-def _ensure_setup() -> None:
+def reload_templates() -> None:
     """
-    Ensure templates are populated
+    (Re)loads all mail templates. This is done automatically when the app is
+    ready; call it again when templates have changed during development.
 
     :return: None
     """
-    # pylint: disable=global-statement
-    global templates
+    registry.load()
 
-    if templates:
-        return
 
-    # Collect all mail templates
-    templates = defaultdict(lambda: defaultdict(list))
-    regex = re.compile(
-        r'.*/mail/(?P<name>.*)/(?P<locale>[a-z]+)\.(?P<subtype>[a-z]+)')
-    for template_dir in (get_app_template_dirs("templates")):
-        for directory, _, filenames in os.walk(template_dir):
-            for filename in filenames:
-                match = regex.match("{}/{}".format(directory, filename))
-                if match:
-                    d = match.groupdict()
-                    templates[d['name']][d['locale']].append({
-                        **d,
-                        'file': os.path.join(directory, filename),
-                    })
+def _ensure_setup() -> None:
+    """
+    Ensure templates are populated, for use outside of a fully set up app.
 
-    templates = {k: dict(v) for k, v in templates.items()}
+    :return: None
+    """
+    if not registry.loaded:
+        registry.load()
 
 
 def create_multilingual_mail(template_name: str, subject: str, context: dict,
@@ -201,7 +287,7 @@ def create_multilingual_mail(template_name: str, subject: str, context: dict,
 
     kwargs['headers'] = {"X-Mailer": get_mailer_name(), **kwargs['headers']}
 
-    langs = templates[template_name]
+    langs = registry.get(template_name)
 
     if len(langs.items()) == 1:
         lang, tpls = list(langs.items())[0]
@@ -218,11 +304,8 @@ def create_multilingual_mail(template_name: str, subject: str, context: dict,
             for template in tpls:
                 msg.attach_alternative(
                     SafeMIMEText(
-                        _text=get_template(template['file']).render({
-                            'locale': template['locale'],
-                            **context,
-                        }),
-                        _subtype=template['subtype'],
+                        _text=template.render(context),
+                        _subtype=template.subtype,
                         _charset=msg.encoding or settings.DEFAULT_CHARSET
                     ), 'unknown/unknown')
 
@@ -237,24 +320,12 @@ def create_multilingual_mail(template_name: str, subject: str, context: dict,
 
             for template in tpls:
                 lang_alt.attach(
-                    SafeMIMEText(get_template(template['file']).render({
-                        'locale': template['locale'],
-                        **context,
-                    }), _subtype=template['subtype']))
+                    SafeMIMEText(template.render(context),
+                                 _subtype=template.subtype))
 
             msg.add_language(lang, lang_alt)
 
-    info = MIMEMultipart(_subtype='alternative')
-    info.attach(SafeMIMEText(
-        get_template("steambird/../templates/mail/multilingual_header.html").render({}),
-        _subtype="html", _charset="utf-8"))
-    info.attach(SafeMIMEText(
-        get_template("steambird/../templates/mail/multilingual_header.plain").render({}),
-        _subtype="plain", _charset="utf-8"))
-
-    info.add_header("Content-Disposition", "inline")
-
-    msg.attach(info)
+    msg.attach(registry.get_header())
 
     return msg
 
@@ -286,7 +357,7 @@ def create_email(template_name: str, subject: str, context: dict,
         **kwargs['headers']
     }
 
-    langs = templates[template_name]
+    langs = registry.get(template_name)
     if lang in langs:
         tpls = langs[lang]
 
@@ -299,11 +370,8 @@ def create_email(template_name: str, subject: str, context: dict,
         for template in tpls:
             msg.attach_alternative(
                 SafeMIMEText(
-                    _text=get_template(template['file']).render({
-                        'locale': template['locale'],
-                        **context,
-                    }),
-                    _subtype=template['subtype'],
+                    _text=template.render(context),
+                    _subtype=template.subtype,
                     _charset=msg.encoding or settings.DEFAULT_CHARSET
                 ), 'unknown/unknown')
 
@@ -312,18 +380,38 @@ def create_email(template_name: str, subject: str, context: dict,
     return create_multilingual_mail(template_name, subject, context, **kwargs)
 
 
-def send_mimemessages(msgs: List[EmailMessage]) -> None:
+def send_mimemessages(msgs: List[EmailMessage], connection=None) -> None:
     """
     Sends a list of EmailMessage.
 
     :param msgs: list of messages to send
+    :param connection: the mail backend to use, or None for the default backend
     :return: nothing
     """
-    conn = get_connection()
+    conn = connection or get_connection()
     conn.open()
-    for msg in msgs:
-        msg.send()
-    conn.close()
+    try:
+        sent = conn.send_messages(msgs) or 0
+    except Exception:
+        record(MAILS, len(msgs), result='failed')
+        raise
+    finally:
+        conn.close()
+
+    record(MAILS, sent, result='sent')
+    if sent < len(msgs):
+        record(MAILS, len(msgs) - sent, result='failed')
+
+
+def queue_mimemessages(msgs: List[EmailMessage]) -> None:
+    """
+    Queues a list of EmailMessage in the outbox. They will be sent by the
+    ``mail_worker`` command, so this is safe to call from within a request.
+
+    :param msgs: list of messages to send
+    :return: nothing
+    """
+    enqueue(msgs)
 
 
 def _test():
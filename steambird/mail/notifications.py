@@ -0,0 +1,105 @@
+"""
+Digests of MSP activity. Adding an MSP line only stores an :py:class:`MSPNotification`; the
+``send_msp_digests`` command periodically groups all pending events per recipient and sends each
+recipient a single mail, so that mail volume depends on the number of recipients rather than the
+number of events.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Set
+
+from django.core.mail import EmailMessage
+from django.db.models import Prefetch
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from steambird.mail.mailsender import create_email
+from steambird.mail.reminders import resolve_coordinators
+from steambird.models import Course, MSPLine, MSPLineType, MSPNotification, Teacher
+
+
+DIGEST_TEMPLATE = 'steambird/msp_digest'
+
+
+# pylint: disable=unused-argument
+@receiver(post_save, sender=MSPLine)
+def enqueue_notification(sender, instance: MSPLine, created: bool, raw: bool = False, **kwargs):
+    """
+    Stores a notification event for every new MSP line.
+    """
+    if created and not raw:
+        MSPNotification.objects.create(line=instance)
+
+
+def _recipients(lines: List[MSPLine]) -> Dict[MSPLine, Set[Teacher]]:
+    """
+    Resolves the teachers that should be notified of each line: the teachers of the MSP, and the
+    teachers and coordinators of its courses, except for the teacher that added the line.
+    """
+    courses = {
+        course
+        for line in lines
+        for course in line.msp.course_set.all()
+    }
+    coordinators = resolve_coordinators(courses)
+
+    result = {}
+    for line in lines:
+        teachers = set(line.msp.teachers.all())
+        for course in line.msp.course_set.all():
+            teachers.update(course.teachers.all())
+            teachers.update(coordinators[course])
+
+        result[line] = {
+            teacher for teacher in teachers
+            if teacher.user_id is None or teacher.user_id != line.created_by_id
+        }
+
+    return result
+
+
+def create_digests(until: datetime, **kwargs) -> List[EmailMessage]:
+    """
+    Creates one mail per recipient for all pending notifications created before `until`, and
+    marks these notifications as processed. Must be called within a transaction, which should
+    only be committed once the mails have been sent or queued.
+
+    :param until: Only notifications created before this moment are included
+    :param kwargs: Any other data that should be passed to the EmailMessage constructor
+    :return: A list of messages, one per recipient
+    """
+    events = list(MSPNotification.objects.select_for_update(skip_locked=True, of=('self',)).filter(
+        processed__isnull=True,
+        created__lte=until,
+    ).select_related('line__msp', 'line__created_by').prefetch_related(
+        'line__materials',
+        'line__msp__teachers',
+        Prefetch('line__msp__course_set',
+                 queryset=Course.objects.prefetch_related('teachers')),
+    ))
+
+    lines = [event.line for event in events]
+    per_teacher = defaultdict(list)
+    for line, teachers in _recipients(lines).items():
+        for teacher in teachers:
+            per_teacher[teacher].append({
+                'line': line,
+                'type': MSPLineType[line.type].value,
+                'courses': list(line.msp.course_set.all()),
+                'materials': [material.name for material in line.materials.all()],
+            })
+
+    MSPNotification.objects.filter(pk__in=[event.pk for event in events])\
+        .update(processed=timezone.now())
+
+    return [
+        create_email(
+            DIGEST_TEMPLATE,
+            "New activity on your study materials",
+            {'teacher': teacher, 'lines': items},
+            to=[teacher.email],
+            **kwargs
+        )
+        for teacher, items in per_teacher.items()
+    ]
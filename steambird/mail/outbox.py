@@ -0,0 +1,217 @@
+"""
+Persistent outbox for outgoing mail. Views only store messages in the outbox, which costs a single
+INSERT; the ``mail_worker`` management command sends them in the background, in batches over a
+single SMTP connection.
+"""
+import logging
+import time
+from datetime import timedelta
+from typing import List, Optional
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from steambird.models.mail import OutboxMessage, OutboxStatus
+from steambird.util.db import check_connections
+from steambird.util.metrics import MAILS, record
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def enqueue(msgs: List[EmailMessage]) -> List[OutboxMessage]:
+    """
+    Stores a list of messages in the outbox, to be sent by the mail worker.
+
+    :param msgs: list of messages to send
+    :return: the created outbox messages
+    """
+    messages = OutboxMessage.objects.bulk_create(
+        [OutboxMessage.from_email_message(msg) for msg in msgs])
+    record(MAILS, len(messages), result='queued')
+    return messages
+
+
+class RateLimiter:
+    """
+    Simple limiter that makes sure no more than `rate` messages are sent per second. A rate of
+    zero or lower disables rate limiting.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate if rate > 0 else 0
+        self.next_slot = time.monotonic()
+
+    def wait(self) -> None:
+        now = time.monotonic()
+        if self.next_slot > now:
+            time.sleep(self.next_slot - now)
+        self.next_slot = max(now, self.next_slot) + self.interval
+
+
+class OutboxWorker:
+    """
+    Drains the outbox. Every batch is claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` in a short
+    transaction, which moves the next attempt of its messages to the end of a lease, so multiple
+    workers can run next to each other without sending a message twice. Right before a message is
+    sent its lease is renewed, and a message of which the lease ended and that was claimed by
+    another worker in the meantime is skipped, as a rate limited batch may take longer than the
+    lease. The result of every message is committed right after it is sent, so a worker that stops
+    halfway through a batch only leaves the messages it did not send yet, which are sent by the
+    next worker once the lease ends. The connection to the mail server is kept open between
+    batches.
+
+    :param lease: Time a worker may take to send a message of a batch, after which the message is
+        claimed again
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, batch_size: int = 50, max_attempts: int = 5, rate: float = 0,
+                 backoff: timedelta = timedelta(minutes=1),
+                 lease: timedelta = timedelta(minutes=10)):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.lease = lease
+        self.limiter = RateLimiter(rate)
+        self.connection = None
+
+    def _get_connection(self):
+        if self.connection is None:
+            self.connection = get_connection()
+            self.connection.open()
+        return self.connection
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def _failed(self, message: OutboxMessage, error: Exception) -> None:
+        message.attempts += 1
+        message.last_error = repr(error)
+
+        if message.attempts >= self.max_attempts:
+            message.status = OutboxStatus.dead.name
+            record(MAILS, result='dead')
+            LOGGER.error('Giving up on outbox message %s after %s attempts: %r',
+                         message.pk, message.attempts, error)
+        else:
+            record(MAILS, result='failed')
+            message.next_attempt = timezone.now() + \
+                self.backoff * (2 ** (message.attempts - 1))
+            LOGGER.warning('Sending outbox message %s failed, retrying at %s: %r',
+                           message.pk, message.next_attempt, error)
+
+    def _send(self, message: OutboxMessage) -> None:
+        try:
+            email = message.to_email_message()
+        # pylint: disable=broad-except
+        except Exception as error:
+            # A message that can not be deserialised will never succeed.
+            message.attempts = self.max_attempts - 1
+            self._failed(message, error)
+            return
+
+        self.limiter.wait()
+
+        try:
+            self._get_connection().send_messages([email])
+        # pylint: disable=broad-except
+        except Exception as error:
+            # The connection may be in a broken state, so start over.
+            self.close()
+            self._failed(message, error)
+            return
+
+        message.status = OutboxStatus.sent.name
+        message.sent = timezone.now()
+        record(MAILS, result='sent')
+
+    def _claim(self) -> List[OutboxMessage]:
+        """
+        Claims a batch of due messages for the duration of the lease.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            batch = list(OutboxMessage.objects.select_for_update(skip_locked=True).filter(
+                status=OutboxStatus.pending.name,
+                next_attempt__lte=now,
+            )[:self.batch_size])
+
+            OutboxMessage.objects.filter(pk__in=[message.pk for message in batch]) \
+                .update(next_attempt=now + self.lease)
+
+        for message in batch:
+            message.next_attempt = now + self.lease
+        return batch
+
+    def _renew(self, message: OutboxMessage) -> bool:
+        """
+        Extends the lease of a claimed message to the full lease from now.
+
+        :return: Whether the message was still claimed by this worker. If not, its lease ended and
+            another worker claimed it.
+        """
+        lease_end = timezone.now() + self.lease
+        renewed = OutboxMessage.objects.filter(
+            pk=message.pk,
+            status=OutboxStatus.pending.name,
+            next_attempt=message.next_attempt,
+        ).update(next_attempt=lease_end)
+
+        message.next_attempt = lease_end
+        return renewed == 1
+
+    def process_batch(self) -> int:
+        """
+        Sends one batch of due messages.
+
+        :return: The number of messages that were processed
+        """
+        batch = self._claim()
+
+        for message in batch:
+            if not self._renew(message):
+                LOGGER.warning('Outbox message %s was claimed by another worker after its lease '
+                               'ended, skipping it', message.pk)
+                continue
+
+            self._send(message)
+            message.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt',
+                                        'sent'])
+
+        return len(batch)
+
+    def run(self, once: bool = False, idle_sleep: float = 5,
+            max_batches: Optional[int] = None) -> int:
+        """
+        Keeps processing batches. When the outbox is empty, the connection is closed and the
+        worker sleeps for `idle_sleep` seconds.
+
+        :param once: Stop as soon as the outbox is empty
+        :param idle_sleep: Seconds to wait when the outbox is empty
+        :param max_batches: Stop after this many batches
+        :return: The total number of messages processed
+        """
+        total = 0
+        batches = 0
+
+        try:
+            while max_batches is None or batches < max_batches:
+                # The database may have been restarted while the worker was sleeping.
+                check_connections()
+                processed = self.process_batch()
+                total += processed
+                batches += 1
+
+                if processed == 0:
+                    if once:
+                        break
+                    self.close()
+                    time.sleep(idle_sleep)
+        finally:
+            self.close()
+
+        return total
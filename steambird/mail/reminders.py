@@ -0,0 +1,144 @@
+"""
+Reminders for coordinators of courses with delayed MSP's. All delayed MSP's are collected and
+their recipients resolved in a fixed number of queries, after which every coordinator receives a
+single digest containing all of their delayed MSP's.
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Set
+
+from django.db.models import Max, OuterRef, Prefetch, Subquery
+from django.core.mail import EmailMessage
+
+from steambird.mail.mailsender import create_email
+from steambird.models import Config, Course, MSP, MSPLine, MSPLineType, Teacher
+from steambird.models.coursetree import Period
+
+
+REMINDER_TEMPLATE = 'steambird/msp_reminder'
+
+
+def delayed_msps(threshold: datetime) -> Dict[Course, List[MSP]]:
+    """
+    Finds all unresolved MSP's of courses in the current year and period, that have not been
+    updated since `threshold`.
+
+    :param threshold: MSP's with a last line older than this are considered delayed
+    :return: Dict of course -> delayed MSP's of that course
+    """
+    config = Config.current()
+    period = Period[config.period]
+
+    courses = {
+        course.pk: course
+        for course in Course.objects.with_all_periods().filter(calendar_year=config.year)
+        if course.falls_in(period)
+    }
+
+    last_line = MSPLine.objects.filter(msp=OuterRef('pk')).order_by('-time')
+
+    msps = MSP.objects.annotate(
+        last_type=Subquery(last_line.values('type')[:1]),
+        last_time=Max('mspline__time'),
+    ).filter(
+        course__in=courses.keys(),
+        last_time__lt=threshold,
+    ).exclude(
+        last_type=MSPLineType.approve_material.name,
+    ).prefetch_related(
+        Prefetch('course_set', queryset=Course.objects.only('pk')),
+        Prefetch('mspline_set', queryset=MSPLine.objects.prefetch_related('materials')),
+    ).distinct()
+
+    result = defaultdict(list)
+    for msp in msps:
+        for course in msp.course_set.all():
+            if course.pk in courses:
+                result[courses[course.pk]].append(msp)
+
+    return dict(result)
+
+
+def resolve_coordinators(courses: Iterable[Course]) -> Dict[Course, Set[Teacher]]:
+    """
+    Resolves the coordinators of courses, including the coordinators of all (indirect) parent
+    courses, as in :py:attr:`Course.coordinators`, in two queries. Parent courses are looked up in
+    the calendar years of the courses, which courses share with their parents.
+
+    :param courses: The courses to find coordinators for
+    :return: Dict of course -> coordinators of that course
+    """
+    courses = list(courses)
+
+    parents = defaultdict(set)
+    for parent_id, child_id in Course.sub_courses.through.objects.filter(
+            to_course__calendar_year__in={course.calendar_year for course in courses},
+    ).values_list('from_course_id', 'to_course_id'):
+        parents[child_id].add(parent_id)
+
+    ancestors = {}
+    for course in courses:
+        seen = {course.pk}
+        todo = [course.pk]
+        while todo:
+            for parent_id in parents[todo.pop()]:
+                if parent_id not in seen:
+                    seen.add(parent_id)
+                    todo.append(parent_id)
+        ancestors[course] = seen
+
+    coordinators = {
+        course.pk: course.coordinator
+        for course in Course.objects.filter(
+            pk__in=set().union(*ancestors.values()),
+            coordinator__isnull=False,
+        ).select_related('coordinator')
+    }
+
+    return {
+        course: {coordinators[pk] for pk in course_ids if pk in coordinators}
+        for course, course_ids in ancestors.items()
+    }
+
+
+def _describe(msp: MSP) -> dict:
+    lines = list(msp.mspline_set.all())
+    last_line = lines[-1]
+
+    return {
+        'msp': msp,
+        'type': MSPLineType[last_line.type].value,
+        'since': last_line.time,
+        'materials': [material.name for material in last_line.materials.all()],
+    }
+
+
+def create_reminders(threshold: datetime, **kwargs) -> List[EmailMessage]:
+    """
+    Creates one digest mail per coordinator, listing all their delayed MSP's.
+
+    :param threshold: MSP's with a last line older than this are considered delayed
+    :param kwargs: Any other data that should be passed to the EmailMessage constructor
+    :return: A list of messages, one per coordinator
+    """
+    delayed = delayed_msps(threshold)
+    coordinators = resolve_coordinators(delayed.keys())
+
+    per_teacher = defaultdict(list)
+    for course, msps in delayed.items():
+        for teacher in coordinators[course]:
+            per_teacher[teacher].append({
+                'course': course,
+                'msps': [_describe(msp) for msp in msps],
+            })
+
+    return [
+        create_email(
+            REMINDER_TEMPLATE,
+            "Study materials are still awaiting your input",
+            {'teacher': teacher, 'courses': courses},
+            to=[teacher.email],
+            **kwargs
+        )
+        for teacher, courses in per_teacher.items()
+    ]
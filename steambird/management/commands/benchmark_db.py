@@ -0,0 +1,100 @@
+import json
+import platform
+import statistics
+import time
+from typing import Callable, List
+
+from django import get_version
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+from django.test.utils import override_settings
+
+from steambird.models import Config
+
+
+def _percentile(durations: List[float], fraction: float) -> float:
+    return sorted(durations)[min(len(durations) - 1, int(len(durations) * fraction))]
+
+
+def _requests(count: int, query: Callable[[], None]) -> dict:
+    """
+    Runs `count` requests of a single query, with the signals that Django sends around a request,
+    so connections are closed and checked as they would be in a worker.
+    """
+    opened = []
+
+    def on_created(**_kwargs):
+        opened.append(True)
+
+    connection_created.connect(on_created)
+    durations = []
+    try:
+        for _ in range(count):
+            start = time.perf_counter()
+            request_started.send(sender=None)
+            query()
+            request_finished.send(sender=None)
+            durations.append(time.perf_counter() - start)
+    finally:
+        connection_created.disconnect(on_created)
+
+    return {
+        'count': count,
+        'connections_opened': len(opened),
+        'per_request_ms': round(statistics.mean(durations) * 1000, 4),
+        'p50_ms': round(_percentile(durations, 0.5) * 1000, 4),
+        'p95_ms': round(_percentile(durations, 0.95) * 1000, 4),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measures the latency per request of connecting to the database for every request, ' \
+           'compared to keeping the connection.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=500,
+                            help='Number of requests per configuration.')
+        parser.add_argument('--output', help='Write the results to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        results = {
+            'django': get_version(),
+            'python': platform.python_version(),
+            'vendor': connection.vendor,
+            'host': connection.settings_dict['HOST'] or 'local socket',
+        }
+
+        def query():
+            Config.objects.exists()
+
+        configurations = (
+            ('connect_per_request', 0, 30),
+            ('persistent', None, 30),
+            # A check before every request, the worst case of DB_HEALTH_CHECK_IDLE.
+            ('persistent_checked', None, 0),
+        )
+        try:
+            for name, conn_max_age, idle in configurations:
+                connection.close()
+                connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+                with override_settings(DB_HEALTH_CHECK_IDLE=idle):
+                    results[name] = _requests(count, query)
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+
+        results['saved_per_request_ms'] = round(
+            results['connect_per_request']['per_request_ms'] -
+            results['persistent']['per_request_ms'], 4)
+
+        output = json.dumps(results, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
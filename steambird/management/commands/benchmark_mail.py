@@ -0,0 +1,107 @@
+import json
+import platform
+import time
+from functools import partial
+from typing import Callable, List
+
+from django import get_version
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from steambird.mail.mailsender import create_email, create_multilingual_mail, language, \
+    send_mimemessages
+from steambird.mail.reminders import REMINDER_TEMPLATE
+from steambird.models import Course, MSPLineType, Teacher
+from steambird.util.smtp_sink import SMTPSink
+
+
+def _teachers(count: int) -> List[Teacher]:
+    return [
+        Teacher(initials='T.', first_name='Teacher', last_name='Number {}'.format(i),
+                email='teacher{}@example.com'.format(i))
+        for i in range(count)
+    ]
+
+
+def _context(teacher: Teacher) -> dict:
+    return {
+        'teacher': teacher,
+        'courses': [{
+            'course': Course(name='Course {}'.format(i), course_code=str(i)),
+            'msps': [{
+                'type': MSPLineType.request_material.value,
+                'since': timezone.now(),
+                'materials': ['Book {}'.format(j) for j in range(2)],
+            } for _ in range(2)],
+        } for i in range(3)],
+    }
+
+
+def _timed(count: int, func: Callable[[], None]) -> dict:
+    start = time.perf_counter()
+    func()
+    total = time.perf_counter() - start
+
+    return {
+        'count': count,
+        'total_s': round(total, 6),
+        'per_message_ms': round(total / count * 1000, 4) if count else None,
+        'messages_per_s': round(count / total, 2) if total else None,
+    }
+
+
+class Command(BaseCommand):
+    help = 'Measures how fast mail can be built and sent, against a local SMTP sink.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=200,
+                            help='Number of teachers (and so messages) to generate.')
+        parser.add_argument('--output', help='Write the results to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        count = options['count']
+        teachers = _teachers(count)
+        results = {
+            'django': get_version(),
+            'python': platform.python_version(),
+            'template': REMINDER_TEMPLATE,
+        }
+
+        def build(create: Callable[..., EmailMessage], out: List[EmailMessage]):
+            def run():
+                for teacher in teachers:
+                    msg = create(REMINDER_TEMPLATE, "Benchmark", _context(teacher),
+                                 from_email='benchmark@example.com', to=[teacher.email])
+                    # Serialise the message, as sending it would.
+                    msg.message().as_bytes()
+                    out.append(msg)
+            return run
+
+        single = []
+        for lang in ('en', 'nl'):
+            with language(lang):
+                results['create_email_{}'.format(lang)] = _timed(
+                    count, build(create_email, single))
+
+        multilingual = []
+        results['create_multilingual_mail'] = _timed(
+            count, build(create_multilingual_mail, multilingual))
+
+        for name, msgs in (('send_mimemessages', single),
+                           ('send_mimemessages_multilingual', multilingual)):
+            with SMTPSink() as sink:
+                connection = get_connection('django.core.mail.backends.smtp.EmailBackend',
+                                            host=sink.host, port=sink.port, use_tls=False,
+                                            use_ssl=False, username='', password='')
+                results[name] = _timed(len(msgs), partial(send_mimemessages, msgs, connection))
+                results[name]['received'] = sink.count
+                results[name]['bytes'] = sink.bytes
+
+        output = json.dumps(results, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
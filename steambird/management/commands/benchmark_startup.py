@@ -0,0 +1,102 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from django import get_version
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# What a worker does before it serves its first request: load the WSGI application, and the
+#  URLconf with all views.
+WORKER_START = 'from steambird.wsgi import application; ' \
+               'from django.urls import get_resolver; get_resolver().url_patterns'
+
+HEAVY_MODULES = ('isbnlib', 'vobject', 'requests', 'httpx', 'crossref')
+"""Optional dependencies, which should only be imported on first use."""
+
+
+def _import_time_per_package(stderr: str) -> Dict[str, int]:
+    """
+    :param stderr: Output of python -X importtime
+    :return: Top-level package -> time spent importing its modules, in microseconds, excluding
+        the time spent importing other packages
+    """
+    result: Dict[str, int] = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        own, _cumulative, module = line[len('import time:'):].split('|')
+        result[module.strip().split('.')[0]] += int(own)
+    return result
+
+
+def _start_worker(importtime: bool) -> Tuple[float, str, List[str]]:
+    """
+    Starts a worker in a new interpreter, with the settings of this one.
+
+    :param importtime: Whether to run with -X importtime, which slows down the imports
+    :return: The time it took, the -X importtime output, and the modules that were imported
+    """
+    code = WORKER_START + '; import sys; print(",".join(sys.modules))'
+    options = ['-X', 'importtime'] if importtime else []
+
+    start = time.perf_counter()
+    process = subprocess.run([sys.executable] + options + ['-c', code], cwd=settings.BASE_DIR,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True, check=False)
+    duration = time.perf_counter() - start
+
+    if process.returncode != 0:
+        raise CommandError('Starting a worker failed:\n{}'.format(process.stderr[-2000:]))
+
+    return duration, process.stderr, process.stdout.strip().splitlines()[-1].split(',')
+
+
+class Command(BaseCommand):
+    help = 'Measures the time to start a worker, and lists the packages that take longest to ' \
+           'import, with python -X importtime.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5,
+                            help='Number of worker starts to measure.')
+        parser.add_argument('--top', type=int, default=15,
+                            help='Number of slowest packages to list.')
+        parser.add_argument('--output', help='Write the results to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        durations = [_start_worker(importtime=False)[0] for _ in range(options['runs'])]
+        _duration, stderr, modules = _start_worker(importtime=True)
+        packages = _import_time_per_package(stderr)
+
+        slowest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+        results = {
+            'django': get_version(),
+            'python': platform.python_version(),
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+            'runs': options['runs'],
+            'start_ms': round(statistics.median(durations) * 1000, 1),
+            'start_min_ms': round(min(durations) * 1000, 1),
+            # Measured with -X importtime, which makes imports slower than they are in start_ms.
+            'imports_ms': round(sum(packages.values()) / 1000, 1),
+            'modules': len(modules),
+            'slowest_packages_ms': {
+                package: round(own / 1000, 1) for package, own in slowest[:options['top']]
+            },
+            'heavy_modules_imported': [
+                module for module in HEAVY_MODULES if module in modules
+            ],
+        }
+
+        output = json.dumps(results, indent=2)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                file.write(output)
+        else:
+            self.stdout.write(output)
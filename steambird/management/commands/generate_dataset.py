@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from steambird.util.dataset import generate_dataset
+
+
+class Command(BaseCommand):
+    help = 'Generates a reproducible, production-shaped data set, for load tests and benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', type=int, default=1,
+                            help='Number of associations, each with a bachelor, master and '
+                                 'premaster study.')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed of the random choices. The same scale and seed give the '
+                                 'same data set.')
+        parser.add_argument('--year', type=int,
+                            help='The last calendar year with courses, the configured year by '
+                                 'default.')
+
+    def handle(self, *args, **options):
+        if options['scale'] < 1:
+            raise CommandError('The scale should be at least 1.')
+
+        try:
+            report = generate_dataset(options['scale'], options['seed'], year=options['year'],
+                                      progress=self.stdout.write)
+        except IntegrityError as error:
+            raise CommandError('A data set with seed {} already exists, use another seed.'
+                               .format(options['seed'])) from error
+
+        self.stdout.write(self.style.SUCCESS(
+            'Created {} studies, {} teachers, {} materials, {} courses with {} study links and '
+            '{} MSPs with {} lines.'.format(
+                report.studies, report.teachers, report.materials, report.courses,
+                report.course_studies, report.msps, report.msp_lines)))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from steambird.material_management.importer import import_materials, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Imports books and scientific articles from a CSV or XLSX file, with columns isbn ' \
+           'or doi, and optionally name, author, year, edition, url and img. XLSX files need ' \
+           'openpyxl, which is not installed by default (pip install openpyxl).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='CSV or XLSX file to import.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of concurrent metadata lookups.')
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Number of materials stored per transaction.')
+        parser.add_argument('--no-enrich', action='store_true',
+                            help='Do not look up missing metadata.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would be imported, without storing anything.')
+
+    def handle(self, *args, **options):
+        try:
+            rows = list(read_rows(options['file']))
+        except ImportError as error:
+            raise CommandError('Importing XLSX files requires openpyxl to be installed.') \
+                from error
+        except OSError as error:
+            raise CommandError(str(error)) from error
+
+        report = import_materials(
+            rows,
+            workers=0 if options['no_enrich'] else options['workers'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+            progress=self.stdout.write,
+        )
+
+        for name, lines in (('Invalid', report.invalid),
+                            ('Duplicate', report.duplicates),
+                            ('Already existing', report.existing),
+                            ('Lookup failed', report.enrich_failed),
+                            ('Incomplete, not imported', report.incomplete)):
+            if lines:
+                self.stdout.write('{} ({}): lines {}'.format(
+                    name, len(lines), ', '.join(map(str, lines))))
+
+        self.stdout.write(self.style.SUCCESS('{} {} book(s) and {} article(s).'.format(
+            'Would import' if options['dry_run'] else 'Imported',
+            report.books, report.articles)))
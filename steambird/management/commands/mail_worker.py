@@ -0,0 +1,39 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from steambird.mail.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = 'Sends the mail that is queued in the outbox.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Number of messages claimed per batch.')
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Number of attempts before a message is marked as dead.')
+        parser.add_argument('--backoff', type=int, default=60,
+                            help='Seconds to wait before the first retry, doubled every retry.')
+        parser.add_argument('--rate', type=float, default=0,
+                            help='Maximum number of messages per second, 0 for no limit.')
+        parser.add_argument('--lease', type=int, default=600,
+                            help='Seconds a worker may take to send a message of a batch, '
+                                 'after which it is sent by another worker.')
+        parser.add_argument('--sleep', type=float, default=5,
+                            help='Seconds to wait when the outbox is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Stop as soon as the outbox is empty.')
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(
+            batch_size=options['batch_size'],
+            max_attempts=options['max_attempts'],
+            rate=options['rate'],
+            backoff=timedelta(seconds=options['backoff']),
+            lease=timedelta(seconds=options['lease']),
+        )
+
+        total = worker.run(once=options['once'], idle_sleep=options['sleep'])
+
+        self.stdout.write('Processed {} message(s).'.format(total))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from steambird.mail.mailsender import language, send_mimemessages, queue_mimemessages
+from steambird.mail.notifications import create_digests
+
+
+class Command(BaseCommand):
+    help = 'Sends every teacher a single digest of the MSP activity since the last run.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-age', type=int, default=60,
+                            help='Only include events older than this many seconds, so that '
+                                 'bursts of activity end up in the same digest.')
+        parser.add_argument('--from-email', default=settings.DEFAULT_FROM_EMAIL,
+                            help='Sender address of the digests.')
+        parser.add_argument('--queue', action='store_true',
+                            help='Queue the digests in the outbox instead of sending them.')
+
+    def handle(self, *args, **options):
+        until = timezone.now() - timedelta(seconds=options['min_age'])
+
+        # Events are only marked as processed when the digests were sent successfully.
+        with transaction.atomic():
+            with language(settings.LANGUAGE_CODE):
+                msgs = create_digests(until, from_email=options['from_email'])
+
+            if options['queue']:
+                queue_mimemessages(msgs)
+            else:
+                send_mimemessages(msgs)
+
+        self.stdout.write('{} digest(s) {}.'.format(
+            len(msgs), 'queued' if options['queue'] else 'sent'))
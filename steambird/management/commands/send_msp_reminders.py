@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from steambird.mail.mailsender import language, send_mimemessages, queue_mimemessages
+from steambird.mail.reminders import create_reminders
+
+
+class Command(BaseCommand):
+    help = "Sends every coordinator a digest of the delayed MSP's of their courses."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=14,
+                            help="MSP's without an update for this many days are delayed.")
+        parser.add_argument('--from-email', default=settings.DEFAULT_FROM_EMAIL,
+                            help='Sender address of the reminders.')
+        parser.add_argument('--queue', action='store_true',
+                            help='Queue the reminders in the outbox instead of sending them.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report who would receive a reminder.')
+
+    def handle(self, *args, **options):
+        threshold = timezone.now() - timedelta(days=options['days'])
+
+        with language(settings.LANGUAGE_CODE):
+            msgs = create_reminders(threshold, from_email=options['from_email'])
+
+        if options['dry_run']:
+            for msg in msgs:
+                self.stdout.write(', '.join(msg.to))
+        elif options['queue']:
+            queue_mimemessages(msgs)
+        else:
+            send_mimemessages(msgs)
+
+        self.stdout.write('{} reminder(s) {}.'.format(
+            len(msgs),
+            'created' if options['dry_run'] else 'queued' if options['queue'] else 'sent'))
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from steambird.boecie.teacher_sync import sync_teachers
+
+
+class Command(BaseCommand):
+    help = 'Creates or updates Teachers from people.utwente.nl, for a list of e-mail addresses ' \
+           'or names.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('entries', nargs='*', help='E-mail addresses or names.')
+        parser.add_argument('--file',
+                            help='File with an e-mail address or name on every line.')
+        parser.add_argument('--workers', type=int, default=8,
+                            help='Number of concurrent lookups.')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report what would change, without storing anything.')
+
+    def handle(self, *args, **options):
+        entries = list(options['entries'])
+
+        if options['file']:
+            try:
+                with open(options['file'], encoding='utf-8-sig') as file:
+                    entries.extend(file.read().splitlines())
+            except OSError as error:
+                raise CommandError(str(error)) from error
+
+        if not entries:
+            raise CommandError('Give e-mail addresses or names, or a file with them.')
+
+        report = sync_teachers(entries, workers=options['workers'],
+                               dry_run=options['dry_run'], progress=self.stdout.write)
+
+        for name, items in (('Not found', report.not_found),
+                            ('Ambiguous', report.ambiguous),
+                            ('Lookup failed', report.failed)):
+            if items:
+                self.stdout.write('{} ({}): {}'.format(name, len(items), ', '.join(items)))
+
+        self.stdout.write(self.style.SUCCESS(
+            '{} {} teacher(s), {} {} and {} unchanged.'.format(
+                'Would create' if options['dry_run'] else 'Created', len(report.created),
+                'would update' if options['dry_run'] else 'updated', len(report.updated),
+                len(report.unchanged))))
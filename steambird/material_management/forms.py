@@ -1,7 +1,6 @@
 from django import forms
 from django.core.exceptions import ValidationError
 from django.utils.translation import ugettext_lazy as _
-import isbnlib as i
 
 from steambird.models import ScientificArticle, Book, OtherMaterial
 
@@ -13,6 +12,10 @@ class ISBNForm(forms.Form):
     isbn = forms.CharField(label=_('ISBN number'), max_length=18, min_length=10)
 
     def clean(self):
+        # isbnlib is imported on first use, as it slows down the start of every worker.
+        # pylint: disable=import-outside-toplevel
+        import isbnlib as i
+
         data = self.cleaned_data
 
         isbn = data.get('isbn')
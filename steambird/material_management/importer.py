@@ -0,0 +1,300 @@
+"""
+Bulk import of study materials from spreadsheets. Rows are identified by their ISBN or DOI,
+deduplicated against each other and the database, enriched with metadata from the external
+lookup services, and then stored in batches.
+"""
+import csv
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+from django.db import connection, transaction
+
+from steambird.material_management.tools import isbn_lookup, doi_lookup, project_doi, \
+    LookupUnavailable
+from steambird.models import Book, ScientificArticle
+from steambird.util.identifiers import normalise_isbn, normalise_doi
+
+
+LOGGER = logging.getLogger(__name__)
+
+COLUMN_ALIASES = {
+    'title': 'name',
+    'authors': 'author',
+    'year_of_publishing': 'year',
+    'image': 'img',
+}
+
+
+@dataclass
+class MaterialRow:
+    """
+    A single material from the imported file
+    """
+    line: int
+    isbn: Optional[str] = None
+    doi: Optional[str] = None
+    name: str = ''
+    author: str = ''
+    year: Optional[int] = None
+    edition: str = ''
+    url: Optional[str] = None
+    img: Optional[str] = None
+
+    @property
+    def is_book(self) -> bool:
+        return self.isbn is not None
+
+    @property
+    def complete(self) -> bool:
+        return bool(self.name and self.author and self.year)
+
+
+@dataclass
+class ImportReport:
+    """
+    Counts of what happened during an import
+    """
+    rows: int = 0
+    invalid: List[int] = field(default_factory=list)
+    duplicates: List[int] = field(default_factory=list)
+    existing: List[int] = field(default_factory=list)
+    enriched: int = 0
+    enrich_failed: List[int] = field(default_factory=list)
+    incomplete: List[int] = field(default_factory=list)
+    books: int = 0
+    articles: int = 0
+
+
+def read_rows(path: str) -> Iterable[Dict[str, str]]:
+    """
+    Reads a CSV or XLSX file with a header row. Column names are case insensitive.
+
+    :param path: The file to read
+    :return: A dict per row, of column name -> value
+    """
+    if os.path.splitext(path)[1].lower() == '.xlsx':
+        # openpyxl is optional, and only needed for spreadsheets.
+        # pylint: disable=import-outside-toplevel
+        from openpyxl import load_workbook
+
+        sheet = load_workbook(path, read_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        header_row = next(rows, None)
+        if header_row is None:
+            return
+
+        header = [str(cell or '').strip().lower() for cell in header_row]
+        for row in rows:
+            yield {
+                key: '' if value is None else str(value).strip()
+                for key, value in zip(header, row)
+            }
+        return
+
+    with open(path, newline='', encoding='utf-8-sig') as file:
+        sample = file.read(4096)
+        if not sample.strip():
+            return
+
+        file.seek(0)
+        dialect = csv.Sniffer().sniff(sample, delimiters=',;\t')
+        for row in csv.DictReader(file, dialect=dialect):
+            yield {
+                (key or '').strip().lower(): (value or '').strip()
+                for key, value in row.items()
+            }
+
+
+def _parse(line: int, raw: Dict[str, str]) -> Optional[MaterialRow]:
+    values = {COLUMN_ALIASES.get(key, key): value for key, value in raw.items() if value}
+
+    row = MaterialRow(line=line)
+    if values.get('isbn'):
+        row.isbn = normalise_isbn(values['isbn'])
+        if row.isbn is None:
+            return None
+    elif values.get('doi'):
+        row.doi = normalise_doi(values['doi'])
+    else:
+        return None
+
+    row.name = values.get('name', '')
+    row.author = values.get('author', '')
+    row.edition = values.get('edition', '')
+    row.url = values.get('url')
+    row.img = values.get('img')
+
+    try:
+        row.year = int(float(values['year'])) if values.get('year') else None
+    except ValueError:
+        row.year = None
+
+    return row
+
+
+def _enrich(row: MaterialRow) -> bool:
+    """
+    Fills in the missing fields of a row from the lookup services.
+
+    :return: Whether data was found
+    """
+    try:
+        if row.is_book:
+            data = isbn_lookup(row.isbn)
+            if data is None:
+                return False
+            meta = data['meta']
+            row.name = row.name or meta.get('Title', '')
+            row.author = row.author or ', '.join(meta.get('Authors') or [])
+            row.year = row.year or (int(meta['Year']) if meta.get('Year') else None)
+            row.img = row.img or meta.get('img')
+        else:
+            data = doi_lookup(row.doi)
+            if data is None:
+                return False
+            projection = project_doi(data)
+            row.name = row.name or projection['title'] or ''
+            row.author = row.author or projection['authors']
+            row.year = row.year or projection['year']
+            row.url = row.url or projection['url']
+        return True
+    except (LookupUnavailable, ValueError, KeyError) as error:
+        LOGGER.warning('Enriching line %s failed: %r', row.line, error)
+        return False
+    finally:
+        # Every worker thread has its own database connection, used by the lookup cache.
+        connection.close()
+
+
+def _to_model(row: MaterialRow):
+    if row.is_book:
+        return Book(
+            ISBN=row.isbn,
+            name=row.name[:255],
+            author=row.author[:1000],
+            year_of_publishing=row.year,
+            edition=row.edition[:256],
+            img=row.img,
+        )
+    return ScientificArticle(
+        DOI=row.doi,
+        name=row.name[:255],
+        author=row.author[:1000],
+        year_of_publishing=row.year,
+        url=row.url,
+    )
+
+
+def _parse_rows(raw_rows: Iterable[Dict[str, str]], report: ImportReport) -> List[MaterialRow]:
+    """
+    :return: The valid rows, without rows of a material that an earlier row has
+    """
+    rows = []
+    seen = set()
+
+    for line, raw in enumerate(raw_rows, start=2):
+        report.rows += 1
+        row = _parse(line, raw)
+
+        if row is None:
+            report.invalid.append(line)
+            continue
+
+        key = row.isbn or row.doi
+        if key in seen:
+            report.duplicates.append(line)
+            continue
+        seen.add(key)
+        rows.append(row)
+
+    return rows
+
+
+def _new_rows(rows: List[MaterialRow], report: ImportReport) -> List[MaterialRow]:
+    """
+    :return: The rows of materials that are not in the database yet
+    """
+    existing_isbns = set(Book.objects.filter(
+        ISBN13__in=[row.isbn for row in rows if row.is_book]
+    ).values_list('ISBN13', flat=True))
+    existing_dois = {
+        normalise_doi(doi)
+        for doi in ScientificArticle.objects.values_list('DOI', flat=True)
+    }
+
+    new_rows = []
+    for row in rows:
+        if (row.isbn in existing_isbns) if row.is_book else (row.doi in existing_dois):
+            report.existing.append(row.line)
+        else:
+            new_rows.append(row)
+
+    return new_rows
+
+
+def _enrich_rows(rows: List[MaterialRow], workers: int, report: ImportReport,
+                 progress: Callable[[str], None]) -> None:
+    todo = [row for row in rows if not row.complete]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for done, (row, found) in enumerate(zip(todo, executor.map(_enrich, todo)), 1):
+            if found:
+                report.enriched += 1
+            else:
+                report.enrich_failed.append(row.line)
+            if done % 25 == 0 or done == len(todo):
+                progress('Enriched {}/{}'.format(done, len(todo)))
+
+
+def _store(rows: List[MaterialRow], batch_size: int, dry_run: bool, report: ImportReport,
+           progress: Callable[[str], None]) -> None:
+    for start in range(0, len(rows), batch_size):
+        batch = [_to_model(row) for row in rows[start:start + batch_size]]
+
+        if not dry_run:
+            # Multi-table inherited models can not be bulk created, so every batch is stored in
+            # a single transaction instead.
+            with transaction.atomic():
+                for material in batch:
+                    material.save()
+
+        report.books += sum(isinstance(material, Book) for material in batch)
+        report.articles += sum(isinstance(material, ScientificArticle) for material in batch)
+        progress('Stored {}/{}'.format(min(start + batch_size, len(rows)), len(rows)))
+
+
+def _log_progress(message: str) -> None:
+    LOGGER.info('%s', message)
+
+
+def import_materials(raw_rows: Iterable[Dict[str, str]], workers: int = 8,
+                     batch_size: int = 100, dry_run: bool = False,
+                     progress: Callable[[str], None] = _log_progress) -> ImportReport:
+    """
+    Imports materials.
+
+    :param raw_rows: Rows as returned by :func:`read_rows`
+    :param workers: Number of concurrent lookups of missing data, 0 to not look it up
+    :param batch_size: Number of materials stored per transaction
+    :param dry_run: Do everything, except storing the materials
+    :param progress: Called with progress messages, which are logged by default
+    :return: A report of the import
+    """
+    report = ImportReport()
+    new_rows = _new_rows(_parse_rows(raw_rows, report), report)
+    progress('{} row(s), {} new material(s)'.format(report.rows, len(new_rows)))
+
+    if workers > 0:
+        _enrich_rows(new_rows, workers, report, progress)
+
+    complete = []
+    for row in new_rows:
+        if row.complete:
+            complete.append(row)
+        else:
+            report.incomplete.append(row.line)
+
+    _store(complete, batch_size, dry_run, report, progress)
+    return report
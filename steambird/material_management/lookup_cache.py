@@ -0,0 +1,129 @@
+"""
+Database backed cache for lookups at external services. Entries are fresh for
+``LOOKUP_CACHE_TTL`` seconds, or ``LOOKUP_CACHE_NEGATIVE_TTL`` seconds if the service had no data.
+After that, an entry with data is still served for ``LOOKUP_CACHE_STALE_TTL`` seconds while it is
+refreshed in the background.
+
+:py:func:`acached_lookup` is the same cache for async views, which fetch with an async function.
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Awaitable, Callable, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from steambird.models.lookups import LookupCacheEntry, LookupKind
+
+
+LOGGER = logging.getLogger(__name__)
+
+Fetcher = Callable[[str], Optional[dict]]
+AsyncFetcher = Callable[[str], Awaitable[Optional[dict]]]
+
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def _ttl(name: str) -> timedelta:
+    return timedelta(seconds=getattr(settings, name))
+
+
+def _store(kind: LookupKind, key: str, data: Optional[dict]) -> None:
+    LookupCacheEntry.objects.update_or_create(
+        kind=kind.name, key=key,
+        defaults={'data': data, 'fetched': timezone.now()},
+    )
+
+
+def _refresh(kind: LookupKind, key: str, fetch: Fetcher) -> Optional[dict]:
+    data = fetch(key)
+    _store(kind, key, data)
+    return data
+
+
+def _refresh_in_background(kind: LookupKind, key: str, fetch: Fetcher) -> None:
+    with _refreshing_lock:
+        if (kind, key) in _refreshing:
+            return
+        _refreshing.add((kind, key))
+
+    def run():
+        try:
+            _refresh(kind, key, fetch)
+        # pylint: disable=broad-except
+        except Exception:
+            LOGGER.exception('Refreshing the %s lookup of %s failed', kind.value, key)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard((kind, key))
+            connection.close()
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def _cached(kind: LookupKind, key: str, fetch: Fetcher) -> Tuple[bool, Optional[dict]]:
+    """
+    Looks for a usable entry, and starts a background refresh if it is stale.
+
+    :return: Whether there is a usable entry, and its data
+    """
+    entry = LookupCacheEntry.objects.filter(kind=kind.name, key=key).first()
+
+    if entry is not None:
+        age = timezone.now() - entry.fetched
+
+        if entry.data is None:
+            if age < _ttl('LOOKUP_CACHE_NEGATIVE_TTL'):
+                return True, None
+        else:
+            ttl = _ttl('LOOKUP_CACHE_TTL')
+            if age < ttl:
+                return True, entry.data
+            if age < ttl + _ttl('LOOKUP_CACHE_STALE_TTL'):
+                _refresh_in_background(kind, key, fetch)
+                return True, entry.data
+
+    return False, None
+
+
+def cached_lookup(kind: LookupKind, key: str, fetch: Fetcher) -> Optional[dict]:
+    """
+    Returns the cached data for a key, or fetches and stores it when there is no usable entry.
+
+    :param kind: The kind of identifier that is looked up
+    :param key: The normalised identifier
+    :param fetch: Function that retrieves the data for a key, or returns None if there is none
+    :return: The data, or None if the service had no data
+    """
+    found, data = _cached(kind, key, fetch)
+
+    if found:
+        return data
+
+    return _refresh(kind, key, fetch)
+
+
+async def acached_lookup(kind: LookupKind, key: str, fetch: Fetcher,
+                         afetch: AsyncFetcher) -> Optional[dict]:
+    """
+    Async version of :py:func:`cached_lookup`. Missing entries are fetched with `afetch`; stale
+    entries are refreshed in a background thread with `fetch`.
+
+    :param kind: The kind of identifier that is looked up
+    :param key: The normalised identifier
+    :param fetch: Function that retrieves the data for a key, or returns None if there is none
+    :param afetch: Async version of `fetch`
+    :return: The data, or None if the service had no data
+    """
+    found, data = await sync_to_async(_cached)(kind, key, fetch)
+
+    if found:
+        return data
+
+    data = await afetch(key)
+    await sync_to_async(_store)(kind, key, data)
+    return data
@@ -1,50 +1,266 @@
-from typing import Optional
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import quote
 
-import isbnlib
-from isbnlib.dev import NoDataForSelectorError
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
 
-from crossref.restful import Works
+from steambird.material_management.lookup_cache import cached_lookup, acached_lookup
+from steambird.models.lookups import LookupKind
+from steambird.util.http import get_upstream, UpstreamUnavailable
+from steambird.util.identifiers import normalise_isbn, normalise_doi
+from steambird.util.metrics import lookup_timer
 
 
-# pylint: disable=invalid-name
-works = Works()
+LOGGER = logging.getLogger(__name__)
 
+CROSSREF_WORKS_URL = 'https://api.crossref.org/works/{}'
 
-def isbn_lookup(isbn: str):
+
+@lru_cache(maxsize=None)
+def _isbnlib():
+    """
+    isbnlib, which is imported on the first ISBN lookup, as importing it (and its plugins) slows
+    down the start of every worker, while most of them never look up an ISBN.
     """
-    Tool that uses isbnlib to look up information for the given ISBN.
+    # pylint: disable=import-outside-toplevel
+    import isbnlib
+    import isbnlib.config
+    import isbnlib.dev
 
-    :param isbn: ISBN in string format, as ISBN can also have some letters and dashes
-    :return: Dict with data, or None
+    # isbnlib does its own requests, so it only gets a timeout per request, which is shared by
+    #  all its services, and one for the services that merge the results of other services.
+    isbnlib.config.seturlopentimeout(settings.ISBN_SOCKETS_TIMEOUT)
+    isbnlib.config.setthreadstimeout(settings.ISBN_SOCKETS_TIMEOUT)
+    return isbnlib
+
+
+def _isbnlib_provider(name: str) -> Callable[[str], Any]:
+    def provider(isbn: str) -> Any:
+        return getattr(_isbnlib(), name)(isbn)
+
+    provider.__name__ = name
+    return provider
+
+
+ISBN_PROVIDERS: Dict[str, Callable[[str], Any]] = {
+    'meta': _isbnlib_provider('meta'),
+    'desc': _isbnlib_provider('desc'),
+    'cover': _isbnlib_provider('cover'),
+}
+"""
+The isbnlib functions that are called for every ISBN lookup. Only 'meta' is required, the
+others may fail or time out without failing the lookup.
+"""
+
+# Shared by all requests, so the number of outstanding provider calls stays bounded, even when
+#  providers hang.
+_isbn_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='isbn-lookup')
+
+
+class LookupUnavailable(Exception):
+    """
+    Raised when an external service could not be reached in time. As opposed to a lookup
+    without a result, this is not cached.
+    """
+
+
+def _call_isbn_provider(provider: Callable[[str], Any], isbn: str) -> Any:
+    isbnlib = _isbnlib()
+    with get_upstream('isbn').guard(ignore=(isbnlib.dev.NoDataForSelectorError,
+                                            isbnlib.NotValidISBNError)):
+        return provider(isbn)
+
+
+@lookup_timer('isbn')
+def _fetch_isbn(isbn: str) -> Optional[dict]:
     """
+    Calls all ISBN_PROVIDERS concurrently. Every provider has its own timeout, and the lookup as a
+    whole has a deadline, which is well within the uWSGI harakiri timeout. Providers that fail or
+    are too slow are left out of the result, except for 'meta'.
+
+    :param isbn: The ISBN to look up
+    :return: Dict with the results per provider, or None if there is no data for this ISBN
+    """
+    isbnlib = _isbnlib()
+    # An ISBN that isbnlib rejects has no data either.
+    no_data_errors = (isbnlib.dev.NoDataForSelectorError, isbnlib.NotValidISBNError)
+    start = time.monotonic()
+    deadline = start + settings.ISBN_LOOKUP_DEADLINE
+    futures = {
+        name: _isbn_executor.submit(copy_context().run, _call_isbn_provider, provider, isbn)
+        for name, provider in ISBN_PROVIDERS.items()
+    }
+
+    result = {}
+    for name, future in futures.items():
+        timeout = min(start + settings.ISBN_LOOKUP_TIMEOUTS.get(name, deadline - start),
+                      deadline)
+        try:
+            result[name] = future.result(timeout=max(0, timeout - time.monotonic()))
+        except no_data_errors:
+            if name == 'meta':
+                return None
+            result[name] = None
+        # Includes the TimeoutError of a provider that took too long.
+        # pylint: disable=broad-except
+        except Exception as error:
+            future.cancel()
+            if name == 'meta':
+                raise LookupUnavailable('ISBN metadata for {} is unavailable'.format(isbn)) \
+                    from error
+            LOGGER.warning('ISBN provider %s failed for %s: %r', name, isbn, error)
+            result[name] = None
+
+    if not result.get('meta'):
+        return None
+
     try:
-        meta_info = isbnlib.meta(isbn)
-        desc = isbnlib.desc(isbn)
-        cover = isbnlib.cover(isbn)
+        result['meta']['img'] = result['cover']['thumbnail']
+    except (TypeError, KeyError):
+        result['meta']['img'] = None
+
+    return result
+
+
+DOI_DEFAULT_FIELDS = ('doi', 'title', 'authors', 'year', 'url')
+
 
+def _doi_authors(record: dict) -> str:
+    return ', '.join(
+        ' '.join(filter(None, [author.get('given'), author.get('family')])) or
+        author.get('name', '')
+        for author in record.get('author', [])
+    )
+
+
+def _doi_year(record: dict) -> Optional[int]:
+    for key in ('issued', 'published-print', 'published-online', 'created'):
         try:
-            meta_info['img'] = cover['thumbnail']
-        except (TypeError, KeyError):
-            meta_info['img'] = None
+            return record[key]['date-parts'][0][0]
+        except (KeyError, IndexError, TypeError):
+            continue
+    return None
+
+
+DOI_PROJECTIONS: Dict[str, Callable[[dict], Any]] = {
+    'doi': lambda record: record.get('DOI'),
+    'title': lambda record: next(iter(record.get('title') or []), None),
+    'authors': _doi_authors,
+    'year': _doi_year,
+    'url': lambda record: record.get('URL'),
+}
+"""
+Compact fields that can be derived from a Crossref record. Any other field name is copied from
+the record as is.
+"""
+
+
+def project_doi(record: dict, fields=DOI_DEFAULT_FIELDS) -> dict:
+    """
+    Reduces a (large) Crossref record to the given fields.
+
+    :param record: The Crossref record, as returned by doi_lookup
+    :param fields: Names from DOI_PROJECTIONS, or keys of the Crossref record
+    :return: Dict of field -> value
+    """
+    return {
+        field: DOI_PROJECTIONS[field](record) if field in DOI_PROJECTIONS else record.get(field)
+        for field in fields
+    }
 
-        return {
-            'meta': meta_info,
-            'desc': desc,
-            'cover': cover,
-        }
 
-    except NoDataForSelectorError:
+@lookup_timer('doi')
+def _fetch_doi(doi: str) -> Optional[dict]:
+    """
+    Retrieves the Crossref record of a DOI, through the 'crossref' upstream.
+
+    :param doi: Normalised DOI
+    :return: The Crossref record, or None if Crossref does not know this DOI
+    """
+    try:
+        response = get_upstream('crossref').get(CROSSREF_WORKS_URL.format(quote(doi)))
+    except UpstreamUnavailable as error:
+        raise LookupUnavailable('DOI metadata for {} is unavailable'.format(doi)) from error
+
+    if response.status_code != 200:
+        return None
+
+    return response.json().get('message')
+
+
+async def _afetch_doi(doi: str) -> Optional[dict]:
+    """
+    Async version of :py:func:`_fetch_doi`.
+    """
+    try:
+        with lookup_timer('doi'):
+            response = await get_upstream('crossref').aget(
+                CROSSREF_WORKS_URL.format(quote(doi)))
+    except UpstreamUnavailable as error:
+        raise LookupUnavailable('DOI metadata for {} is unavailable'.format(doi)) from error
+
+    if response.status_code != 200:
         return None
 
+    return response.json().get('message')
+
+
+def isbn_lookup(isbn: str):
+    """
+    Tool that uses isbnlib to look up information for the given ISBN. Results are cached, see
+    :py:mod:`steambird.material_management.lookup_cache`.
+
+    :param isbn: ISBN in string format, as ISBN can also have some letters and dashes
+    :return: Dict with data, or None, also for an invalid ISBN
+    """
+    key = normalise_isbn(isbn)
+
+    if key is None:
+        return None
+
+    return cached_lookup(LookupKind.isbn, key, _fetch_isbn)
+
 
 def doi_lookup(doi: str) -> Optional[dict]:
     """
-    Tool that uses crossref package to retrieve information based on DOI inputted
+    Tool that uses crossref package to retrieve information based on DOI inputted. Results are
+    cached, see :py:mod:`steambird.material_management.lookup_cache`.
 
     :param doi: DOI of any kind
     :return: Dictionary containing (a lot of) info or None
     """
+    return cached_lookup(LookupKind.doi, normalise_doi(doi), _fetch_doi)
+
+
+def _isbn_lookup_in_thread(isbn: str):
+    try:
+        return isbn_lookup(isbn)
+    finally:
+        connection.close()
 
-    info = works.doi(doi)
 
-    return info
+async def aisbn_lookup(isbn: str):
+    """
+    Async version of :py:func:`isbn_lookup`. isbnlib can only make blocking requests, so the
+    lookup runs in a thread of its own, which does not hold up other lookups.
+
+    :param isbn: ISBN in string format, as ISBN can also have some letters and dashes
+    :return: Dict with data, or None
+    """
+    return await sync_to_async(_isbn_lookup_in_thread, thread_sensitive=False)(isbn)
+
+
+async def adoi_lookup(doi: str) -> Optional[dict]:
+    """
+    Async version of :py:func:`doi_lookup`.
+
+    :param doi: DOI of any kind
+    :return: Dictionary containing (a lot of) info or None
+    """
+    return await acached_lookup(LookupKind.doi, normalise_doi(doi), _fetch_doi, _afetch_doi)
@@ -1,22 +1,27 @@
 from django.urls import path
 
+from steambird.util import sync_or_async
 from .views import AddMaterialView, ISBNLookupView, ISBNView, ISBNDetailView, DOIDetailView, \
-    ISBNSearchApiView, DOISearchApiView, OtherDetailView
+    ISBNSearchApiView, DOISearchApiView, OtherDetailView, aisbn_lookup_view, \
+    aisbn_search_api_view, adoi_search_api_view
 
 # pylint: disable=invalid-name
 app_name = 'material_management'
 
 # pylint: disable=invalid-name
 urlpatterns = [
-    path('isbn/search/<str:isbn>', ISBNLookupView.as_view(), name='isbnlookup'),
+    path('isbn/search/<str:isbn>', sync_or_async(ISBNLookupView.as_view(), aisbn_lookup_view),
+         name='isbnlookup'),
     path('isbn', ISBNView.as_view(), name='isbn'),
     path('isbn/<str:isbn>', ISBNDetailView.as_view(), name='isbndetail'),
     path('doi/<str:doi>', DOIDetailView.as_view(), name='articledetail'),
     path('other/<int:pk>', OtherDetailView.as_view(), name='otherdetail'),
 
 
-    path('api/isbn/search', ISBNSearchApiView.as_view(), name='isbn.search'),
-    path('api/doi/search', DOISearchApiView.as_view(), name='doi.search'),
+    path('api/isbn/search', sync_or_async(ISBNSearchApiView.as_view(), aisbn_search_api_view),
+         name='isbn.search'),
+    path('api/doi/search', sync_or_async(DOISearchApiView.as_view(), adoi_search_api_view),
+         name='doi.search'),
 
     path('material/new', AddMaterialView.as_view(), name='material.create'),
 ]
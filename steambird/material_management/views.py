@@ -3,23 +3,28 @@ from json import dumps
 from typing import Union, Any, Optional
 from urllib.parse import quote, unquote
 
+from asgiref.sync import sync_to_async
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.exceptions import ObjectDoesNotExist
 from django.db.models import QuerySet
 from django.forms import Form
 from django.http import HttpResponseRedirect, HttpResponse, HttpResponseBadRequest, HttpRequest, \
-    HttpResponseNotFound, JsonResponse
+    HttpResponseNotFound, JsonResponse, Http404
 from django.shortcuts import redirect, render
 from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.gzip import gzip_page
 from django.views.generic import FormView, DetailView
 from django_addanother.views import CreatePopupMixin
 
 from steambird.material_management.forms import ISBNForm, BookForm, ScientificPaperForm, \
     OtherMaterialForm
-from steambird.material_management.tools import isbn_lookup, doi_lookup
+from steambird.material_management.tools import isbn_lookup, doi_lookup, aisbn_lookup, \
+    adoi_lookup, LookupUnavailable, project_doi
 from steambird.models import Book, ScientificArticle, OtherMaterial
-from steambird.util import MultiFormView
+from steambird.util import MultiFormView, async_login_required
+from steambird.util.identifiers import normalise_isbn
 
 
 LOGGER = logging.getLogger(__name__)
@@ -42,19 +47,46 @@ class ISBNView(LoginRequiredMixin, FormView):
         return render(self.request, 'material_management/ISBN.html', {'form': form})
 
 
+def _render_isbn_lookup(request: HttpRequest, isbn_data: Optional[dict]) -> HttpResponse:
+    if isbn_data is None:
+        return render(request, 'material_management/book.html', {
+            'retrieved_data': "No data was found for given ISBN"
+        })
+
+    return render(request, 'material_management/book.html', {'book': isbn_data})
+
+
+def _render_isbn_unavailable(request: HttpRequest) -> HttpResponse:
+    return render(request, 'material_management/book.html', {
+        'retrieved_data': "The ISBN service did not respond in time"
+    }, status=504)
+
+
 class ISBNLookupView(LoginRequiredMixin, View):
     """
     A view which does a lookup based on the isbn givin in the URL. Does not show requested isbn's
     stored info if we have any. For that, use :any:`ISBNDetailView`
     """
     def get(self, _request, isbn):
-        isbn_data = isbn_lookup(isbn)
-        result = {'book': isbn_data}
+        try:
+            isbn_data = isbn_lookup(isbn)
+        except LookupUnavailable:
+            return _render_isbn_unavailable(self.request)
+
+        return _render_isbn_lookup(self.request, isbn_data)
 
-        if isbn_data is None:
-            result = {'retrieved_data': "No data was found for given ISBN"}
 
-        return render(self.request, 'material_management/book.html', result)
+@async_login_required
+async def aisbn_lookup_view(request: HttpRequest, isbn: str) -> HttpResponse:
+    """
+    Async variant of :any:`ISBNLookupView`.
+    """
+    try:
+        isbn_data = await aisbn_lookup(isbn)
+    except LookupUnavailable:
+        return await sync_to_async(_render_isbn_unavailable)(request)
+
+    return await sync_to_async(_render_isbn_lookup)(request, isbn_data)
 
 
 class AddMaterialView(LoginRequiredMixin, CreatePopupMixin, MultiFormView):
@@ -80,7 +112,7 @@ class AddMaterialView(LoginRequiredMixin, CreatePopupMixin, MultiFormView):
 
         if isinstance(form, BookForm):
             reverse_url = 'material_management:isbndetail'
-            kwargs = {'isbn': request.POST.get('ISBN')}
+            kwargs = {'isbn': obj.ISBN13 or obj.ISBN}
         elif isinstance(form, ScientificPaperForm):
             reverse_url = 'material_management:articledetail'
             kwargs = {'doi': quote(request.POST.get('DOI', safe=''))}
@@ -99,71 +131,182 @@ class AddMaterialView(LoginRequiredMixin, CreatePopupMixin, MultiFormView):
         return redirect(reverse(reverse_url, kwargs=kwargs))
 
 
+def _book_as_lookup(book: Book) -> dict:
+    """
+    Formats a stored book like the result of :func:`isbn_lookup`.
+
+    :param book: The stored book
+    :return: Dict with data
+    """
+    return {
+        'meta': {
+            'ISBN-13': book.ISBN13,
+            'Title': book.name,
+            'Authors': [author.strip() for author in book.author.split(',')],
+            'Year': str(book.year_of_publishing),
+            'img': book.img,
+        },
+        'desc': '',
+        'cover': {'thumbnail': book.img} if book.img else None,
+        'local': book.pk,
+    }
+
+
+def _stored_book(isbn: str) -> Optional[Book]:
+    isbn13 = normalise_isbn(isbn)
+    return Book.objects.filter(ISBN13=isbn13).first() if isbn13 else None
+
+
+def _unavailable(service: str) -> HttpResponse:
+    return HttpResponse(
+        dumps(str("The {} service did not respond in time".format(service))),
+        content_type="application/json",
+        status=504,
+    )
+
+
+def _isbn_search_response(isbn_data: Optional[dict]) -> Union[HttpResponseNotFound,
+                                                              JsonResponse]:
+    if isbn_data is None:
+        return HttpResponseNotFound(
+            dumps(str("No data was found for given ISBN")),
+            content_type="application/json",
+        )
+
+    return JsonResponse(isbn_data)
+
+
 class ISBNSearchApiView(LoginRequiredMixin, View):
     """
     The 'API endpoint' view we use for retrieving data concerning books. It returns a JsonResponse
-    with the data found on the isbn parameter.
+    with the data found on the isbn parameter. Books that are already stored are returned without
+    an external lookup.
     """
 
     # pylint: disable=no-self-use
     def get(self, request: HttpRequest) -> Union[HttpResponseNotFound, JsonResponse]:
         """
-        Makes a call to the isbn_lookup tool which either returns a JSON response of data, or
-        returns a HttpResponseNotFound if nothing can be found
+        Returns the stored book with this ISBN, if any. Otherwise it makes a call to the
+        isbn_lookup tool which either returns a JSON response of data, or returns a
+        HttpResponseNotFound if nothing can be found
 
         :param request: HttpRequest Object
         :return: Either a response, or the string "No data was found for given ISBN"
         """
         isbn = request.GET['isbn']
-        isbn_data = isbn_lookup(isbn)
 
-        if isbn_data is None:
-            return HttpResponseNotFound(
-                dumps(str("No data was found for given ISBN")),
-                content_type="application/json",
-            )
+        book = _stored_book(isbn)
+        if book is not None:
+            return JsonResponse(_book_as_lookup(book))
+
+        try:
+            isbn_data = isbn_lookup(isbn)
+        except LookupUnavailable:
+            return _unavailable('ISBN')
 
-        return JsonResponse(isbn_data)
+        return _isbn_search_response(isbn_data)
+
+
+@async_login_required
+async def aisbn_search_api_view(request: HttpRequest) -> HttpResponse:
+    """
+    Async variant of :any:`ISBNSearchApiView`.
+    """
+    isbn = request.GET['isbn']
+
+    book = await sync_to_async(_stored_book)(isbn)
+    if book is not None:
+        return JsonResponse(_book_as_lookup(book))
+
+    try:
+        isbn_data = await aisbn_lookup(isbn)
+    except LookupUnavailable:
+        return _unavailable('ISBN')
+
+    return _isbn_search_response(isbn_data)
 
 
 class ISBNDetailView(LoginRequiredMixin, DetailView):
     """
-    Shows details we have stored on a given ISBN. Can return an error when object does not exist
+    Shows details we have stored on a given ISBN, which may be given as ISBN 10 or ISBN 13.
     """
     model = Book
     template_name = 'material_management/bookdetail.html'
 
     def get_object(self, queryset=None):
-        queryset = queryset or Book
+        queryset = queryset or Book.objects.all()
         isbn = self.kwargs['isbn']
-        return queryset.objects.get(ISBN=isbn)
+        isbn13 = normalise_isbn(isbn)
+
+        try:
+            if isbn13:
+                return queryset.get(ISBN13=isbn13)
+            return queryset.get(ISBN=isbn)
+        except Book.DoesNotExist as error:
+            raise Http404 from error
+
+
+def _doi_search_response(request: HttpRequest,
+                         doi_data: Optional[dict]) -> Union[HttpResponseNotFound, JsonResponse]:
+    """
+    :return: The fields of the DOI data that are requested by the `fields` parameter
+    """
+    if doi_data is None:
+        return HttpResponseNotFound(
+            dumps(str("No data was found for given DOI")),
+            content_type="application/json",
+        )
+
+    fields = request.GET.get('fields')
+
+    if fields == '*':
+        return JsonResponse(doi_data)
+
+    if fields:
+        return JsonResponse(project_doi(
+            doi_data, [field.strip() for field in fields.split(',') if field.strip()]))
+
+    return JsonResponse(project_doi(doi_data))
 
 
+@method_decorator(gzip_page, name='dispatch')
 class DOISearchApiView(LoginRequiredMixin, View):
     """
     The 'API endpoint' view  we use for retrieving data concerning Scientific articles. It returns a
-    JsonResponse with the data found on the DOI parameter
+    JsonResponse with the data found on the DOI parameter. By default, only the fields needed to
+    fill in the article form are returned; other fields of the Crossref record can be requested
+    with a comma separated `fields` parameter, or all of them with `fields=*`.
     """
 
     # pylint: disable=no-self-use
     def get(self, request: HttpRequest) -> Union[HttpResponseNotFound, JsonResponse]:
         """
-        Method which makes a call to the doi_lookup tool. Retrieves a lot of data, which all
-        returned and sifted through on the front-end
+        Method which makes a call to the doi_lookup tool, and returns the requested fields of the
+        result.
 
         :param request: HttpRequest object
         :return: Either a HttpResponseNotFound or a JsonResponse if successful
         """
-        doi = request.GET['doi']
-        doi_data = doi_lookup(doi)
+        try:
+            doi_data = doi_lookup(request.GET['doi'])
+        except LookupUnavailable:
+            return _unavailable('DOI')
 
-        if doi_data is None:
-            return HttpResponseNotFound(
-                dumps(str("No data was found for given ISBN")),
-                content_type="application/json",
-            )
+        return _doi_search_response(request, doi_data)
 
-        return JsonResponse(doi_data)
+
+@async_login_required
+async def adoi_search_api_view(request: HttpRequest) -> HttpResponse:
+    """
+    Async variant of :any:`DOISearchApiView`. In Django 3.1, gzip_page only decorates sync views,
+    so under ASGI the response is left to the proxy in front of the site to compress.
+    """
+    try:
+        doi_data = await adoi_lookup(request.GET['doi'])
+    except LookupUnavailable:
+        return _unavailable('DOI')
+
+    return _doi_search_response(request, doi_data)
 
 
 class DOIDetailView(LoginRequiredMixin, DetailView):
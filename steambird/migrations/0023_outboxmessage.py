@@ -0,0 +1,38 @@
+# Generated by Django 3.1.3 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steambird', '0022_auto_20190919_2240'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('subject', models.CharField(max_length=998, verbose_name='Subject')),
+                ('recipients', models.TextField(verbose_name='Recipients, comma separated')),
+                ('data', models.BinaryField(verbose_name='Serialised message')),
+                ('status', models.CharField(choices=[('pending', 'PENDING'), ('sent', 'SENT'), ('dead', 'DEAD')], default='pending', max_length=7, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Number of failed send attempts')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last error')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Do not try to send before')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='Time of sending')),
+            ],
+            options={
+                'verbose_name': 'Outbox message',
+                'verbose_name_plural': 'Outbox messages',
+                'ordering': ['next_attempt'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'next_attempt'], name='steambird_o_status_840627_idx'),
+        ),
+    ]
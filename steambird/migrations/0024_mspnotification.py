@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steambird', '0023_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MSPNotification',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('processed', models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Time this event was included in a digest')),
+                ('line', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='steambird.mspline', verbose_name='The MSP line that was added')),
+            ],
+            options={
+                'verbose_name': 'MSP notification',
+                'verbose_name_plural': 'MSP notifications',
+                'ordering': ['created'],
+            },
+        ),
+    ]
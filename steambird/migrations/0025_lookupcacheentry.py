@@ -0,0 +1,28 @@
+# Generated by Django 3.1.3 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steambird', '0024_mspnotification'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LookupCacheEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('isbn', 'ISBN'), ('doi', 'DOI')], max_length=4, verbose_name='Kind of identifier')),
+                ('key', models.CharField(max_length=255, verbose_name='Normalised identifier')),
+                ('data', models.JSONField(blank=True, null=True, verbose_name='Retrieved data, empty if nothing was found')),
+                ('fetched', models.DateTimeField(verbose_name='Time the data was retrieved')),
+            ],
+            options={
+                'verbose_name': 'Lookup cache entry',
+                'verbose_name_plural': 'Lookup cache entries',
+                'unique_together': {('kind', 'key')},
+            },
+        ),
+    ]
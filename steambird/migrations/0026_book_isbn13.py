@@ -0,0 +1,44 @@
+# Generated by Django 3.1.3 on 2026-10-19 12:00
+
+import logging
+
+from django.db import migrations, models
+
+from steambird.util.identifiers import normalise_isbn
+
+
+LOGGER = logging.getLogger(__name__)
+
+
+def fill_isbn13(apps, schema_editor):
+    Book = apps.get_model('steambird', 'book')
+    seen = set()
+    books = list(Book.objects.order_by('pk'))
+
+    for book in books:
+        book.ISBN13 = normalise_isbn(book.ISBN)
+
+        if book.ISBN13 in seen:
+            LOGGER.warning('Book %s has the same ISBN as an earlier book, leaving ISBN13 empty',
+                           book.pk)
+            book.ISBN13 = None
+        elif book.ISBN13:
+            seen.add(book.ISBN13)
+
+    Book.objects.bulk_update(books, ['ISBN13'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steambird', '0025_lookupcacheentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='ISBN13',
+            field=models.CharField(blank=True, editable=False, max_length=13, null=True, verbose_name='Normalised ISBN 13'),
+        ),
+        migrations.RunPython(fill_isbn13, migrations.RunPython.noop),
+    ]
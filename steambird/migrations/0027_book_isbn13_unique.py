@@ -0,0 +1,18 @@
+# Generated by Django 3.1.3 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('steambird', '0026_book_isbn13'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='book',
+            name='ISBN13',
+            field=models.CharField(blank=True, editable=False, max_length=13, null=True, unique=True, verbose_name='Normalised ISBN 13'),
+        ),
+    ]
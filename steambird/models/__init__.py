@@ -14,3 +14,9 @@ from steambird.models.user import *
 
 # noinspection PyUnresolvedReferences
 from steambird.models.site_config import *
+
+# noinspection PyUnresolvedReferences
+from steambird.models.mail import *
+
+# noinspection PyUnresolvedReferences
+from steambird.models.lookups import *
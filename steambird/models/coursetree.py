@@ -241,6 +241,11 @@ class CourseStudy(models.Model):
         )
 
 
+def _period_names_field() -> ArrayField:
+    # Postgres casts the arrays to the type of this field, which needs a length.
+    return ArrayField(models.CharField(max_length=max(len(period.name) for period in Period)))
+
+
 class CourseQuerySet(models.QuerySet):
     def with_all_periods(self):
         """
@@ -256,7 +261,7 @@ class CourseQuerySet(models.QuerySet):
                         lambda e: e.name,
                         [*period.all_children(), period, *period.all_parents()]
                     )),
-                    output_field=ArrayField(models.CharField())
+                    output_field=_period_names_field()
                 )
             )
             for period in Period
@@ -264,7 +269,7 @@ class CourseQuerySet(models.QuerySet):
 
         return self.annotate(period_all=models.Case(
             *cases,
-            default=models.Value([], ArrayField(models.CharField()))))
+            default=models.Value([], _period_names_field())))
 
     def with_self_and_parents(self):
         """
@@ -278,14 +283,14 @@ class CourseQuerySet(models.QuerySet):
                 models.Q(period=period.name),
                 then=models.Value(list(map(lambda e: e.name,
                                            [period, *period.all_parents()])),
-                                  output_field=ArrayField(models.CharField()))
+                                  output_field=_period_names_field())
             )
             for period in Period
         ]
 
         return self.annotate(period_parents_and_self=models.Case(
             *cases,
-            default=models.Value([], ArrayField(models.CharField()))))
+            default=models.Value([], _period_names_field())))
 
     def with_is_quartile(self):
         """
@@ -425,7 +430,8 @@ class Course(models.Model):
     @property
     def coordinators(self) -> List[Teacher]:
         """
-        These coordinators are also to be autonotified in case of delayed MSP's.
+        These coordinators are also to be autonotified in case of delayed MSP's, see
+        :py:mod:`steambird.mail.reminders`.
 
         :return: A list of teachers that have the end-control over this course.
         """
@@ -0,0 +1,51 @@
+"""
+This package contains the cache of metadata that was looked up at external services, such as
+ISBN and DOI metadata.
+"""
+from enum import Enum
+
+from django.db import models
+from django.utils.translation import ugettext_lazy as _
+
+
+class LookupKind(Enum):
+    """
+    Enum of the kinds of identifiers that can be looked up
+    """
+    isbn = 'ISBN'
+    doi = 'DOI'
+
+
+class LookupCacheEntry(models.Model):
+    """
+    The result of a lookup of a (normalised) identifier. An entry without data records that the
+    external service had no data for this identifier.
+
+    String Representation:
+        <kind> <key>
+    """
+    kind = models.CharField(
+        max_length=max([len(t.value) for t in LookupKind]),
+        choices=[(t.name, t.value) for t in LookupKind],
+        verbose_name=_("Kind of identifier"),
+    )
+    key = models.CharField(
+        max_length=255,
+        verbose_name=_("Normalised identifier"),
+    )
+    data = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name=_("Retrieved data, empty if nothing was found"),
+    )
+    fetched = models.DateTimeField(
+        verbose_name=_("Time the data was retrieved"),
+    )
+
+    def __str__(self):
+        return '{} {}'.format(self.kind, self.key)
+
+    class Meta:
+        unique_together = ['kind', 'key']
+        verbose_name = _("Lookup cache entry")
+        verbose_name_plural = _("Lookup cache entries")
@@ -0,0 +1,129 @@
+"""
+This package contains the models used to queue outgoing mail, so that sending mail never has to
+happen within a request.
+"""
+import pickle
+from enum import Enum
+
+from django.core.mail import EmailMessage
+from django.db import models
+from django.utils import timezone
+from django.utils.translation import ugettext_lazy as _
+
+
+class OutboxStatus(Enum):
+    """
+    Enum of the states an outgoing message can be in
+    """
+    pending = 'PENDING'
+    sent = 'SENT'
+    dead = 'DEAD'
+
+
+class OutboxMessage(models.Model):
+    """
+    A serialised EmailMessage that is waiting to be sent by the mail worker. Messages that keep
+    failing are retried with a backoff, until they are marked as dead.
+
+    String Representation:
+        <subject> (<recipients>)
+    """
+    subject = models.CharField(
+        max_length=998,
+        verbose_name=_("Subject"),
+    )
+    recipients = models.TextField(
+        verbose_name=_("Recipients, comma separated"),
+    )
+    data = models.BinaryField(
+        verbose_name=_("Serialised message"),
+    )
+    status = models.CharField(
+        max_length=max([len(t.value) for t in OutboxStatus]),
+        choices=[(t.name, t.value) for t in OutboxStatus],
+        default=OutboxStatus.pending.name,
+        verbose_name=_("Status"),
+    )
+    attempts = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Number of failed send attempts"),
+    )
+    last_error = models.TextField(
+        blank=True,
+        default='',
+        verbose_name=_("Last error"),
+    )
+    created = models.DateTimeField(auto_now_add=True)
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_("Do not try to send before"),
+    )
+    sent = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Time of sending"),
+    )
+
+    @classmethod
+    def from_email_message(cls, message: EmailMessage) -> 'OutboxMessage':
+        """
+        Creates an (unsaved) outbox message for an EmailMessage.
+
+        :param message: The message that should be sent later on
+        :return: An unsaved OutboxMessage
+        """
+        # The connection can not be pickled, and should not be reused anyway.
+        message.connection = None
+
+        return cls(
+            subject=str(message.subject),
+            recipients=', '.join(message.recipients()),
+            data=pickle.dumps(message),
+        )
+
+    def to_email_message(self) -> EmailMessage:
+        """
+        :return: The EmailMessage that was stored in this outbox message
+        """
+        return pickle.loads(bytes(self.data))
+
+    def __str__(self):
+        return '{} ({})'.format(self.subject, self.recipients)
+
+    class Meta:
+        ordering = ['next_attempt']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+        verbose_name = _("Outbox message")
+        verbose_name_plural = _("Outbox messages")
+
+
+class MSPNotification(models.Model):
+    """
+    A lightweight event that is stored whenever an MSP line is added. Events are not mailed one by
+    one; a periodic job groups them per recipient in a single digest.
+
+    String Representation:
+        <MSP line> (<processed or pending>)
+    """
+    line = models.ForeignKey(
+        'MSPLine',
+        on_delete=models.CASCADE,
+        verbose_name=_("The MSP line that was added"),
+    )
+    created = models.DateTimeField(auto_now_add=True, db_index=True)
+    processed = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name=_("Time this event was included in a digest"),
+    )
+
+    def __str__(self):
+        return '{} ({})'.format(self.line_id, 'processed' if self.processed else 'pending')
+
+    class Meta:
+        ordering = ['created']
+        verbose_name = _("MSP notification")
+        verbose_name_plural = _("MSP notifications")
@@ -3,10 +3,14 @@ This package contains all definitions and setup needed regarding materials. It i
 considered the key point an MSP or MSP line is about
 """
 
+from django.core.exceptions import ValidationError
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
 from polymorphic.models import PolymorphicModel
+from polymorphic.query import PolymorphicModelIterable, PolymorphicQuerySet
+
+from steambird.util.identifiers import normalise_isbn
 
 
 class StudyMaterial(models.Model):
@@ -27,6 +31,24 @@ class StudyMaterial(models.Model):
         verbose_name_plural = _("Study Material Collections")
 
 
+class _MaterialIterable(PolymorphicModelIterable):
+    def _polymorphic_iterator(self, base_iter):
+        # pylint: disable=protected-access
+        return iter(self.queryset._get_real_instances(list(base_iter)))
+
+
+class StudyMaterialEditionQuerySet(PolymorphicQuerySet):
+    """
+    Retrieves the fields of the subclasses of all materials at once, with a query per subclass.
+    django-polymorphic does so per 100 materials, which makes the number of queries of a page grow
+    with the number of materials on it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._iterable_class = _MaterialIterable
+
+
 class StudyMaterialEdition(PolymorphicModel):
     """
     Polymorphic base definition. Contains the name and possibly the collection they belong to.
@@ -37,6 +59,8 @@ class StudyMaterialEdition(PolymorphicModel):
         String representation of sub-object
     """
 
+    objects = StudyMaterialEditionQuerySet.as_manager()
+
     name = models.CharField(null=False,
                             blank=False,
                             max_length=255,
@@ -95,6 +119,14 @@ class Book(StudyMaterialEdition):
                             unique=True,
                             verbose_name=_("ISBN 10 or ISBN 13"),
                             max_length=13)
+    # Canonical form of the ISBN, derived from ISBN on save. Used for lookups and to prevent
+    # duplicates that were entered as ISBN 10 and ISBN 13. Empty if ISBN is not a valid ISBN.
+    ISBN13 = models.CharField(null=True,
+                              blank=True,
+                              unique=True,
+                              editable=False,
+                              verbose_name=_("Normalised ISBN 13"),
+                              max_length=13)
     # Authors should be derived from the ISBN
     author = models.CharField(null=False,
                               blank=False,
@@ -124,6 +156,22 @@ class Book(StudyMaterialEdition):
 
         raise ValueError("ISBN does not match either known lengths")
 
+    def validate_unique(self, exclude=None):
+        """
+        Also rejects an ISBN of a book that already exists as the other kind of ISBN (10 or 13),
+        as ISBN13 is not part of any form.
+        """
+        super().validate_unique(exclude)
+
+        isbn13 = normalise_isbn(self.ISBN)
+        if isbn13 and (exclude is None or 'ISBN' not in exclude) and \
+                Book.objects.filter(ISBN13=isbn13).exclude(pk=self.pk).exists():
+            raise ValidationError({'ISBN': _('A book with this ISBN already exists')})
+
+    def save(self, *args, **kwargs):
+        self.ISBN13 = normalise_isbn(self.ISBN)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return "{}: {}, {} Edition".format(self.ISBN, self.name, self.edition)
 
@@ -1,9 +1,9 @@
 from enum import Enum
-from typing import List
+from typing import List, Optional
 
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models import Q
+from django.db.models import Prefetch
 from django.utils.translation import ugettext_lazy as _, ugettext as _t
 
 from steambird.models.materials import StudyMaterialEdition
@@ -102,7 +102,23 @@ class MSPLine(models.Model):
         return False
 
 
+class MSPQuerySet(models.QuerySet):
+    def with_lines(self):
+        """
+        Prefetches the lines of the MSPs, with their creator and materials. Use this when lines,
+        or properties like :py:attr:`MSP.last_line` and ``str(msp)``, are used for multiple MSPs.
+
+        :return: a QuerySet
+        """
+        return self.prefetch_related(Prefetch(
+            'mspline_set',
+            queryset=MSPLine.objects.select_related('created_by').prefetch_related('materials'),
+        ))
+
+
 class MSP(models.Model):
+    objects = MSPQuerySet.as_manager()
+
     teachers = models.ManyToManyField(
         Teacher,
         blank=True,
@@ -113,8 +129,23 @@ class MSP(models.Model):
         verbose_name=_('Is the material mandatory?')
     )
 
+    @property
+    def last_line(self) -> Optional[MSPLine]:
+        """
+        The most recent line of this MSP. When the lines were prefetched with
+        ``prefetch_related('mspline_set')``, they are used instead of querying again, so listing
+        MSPs does not take a query per MSP.
+
+        :return: The last MSPLine, or None if this MSP has no lines yet
+        """
+        if 'mspline_set' in getattr(self, '_prefetched_objects_cache', {}):
+            lines = list(self.mspline_set.all())
+            return lines[-1] if lines else None
+        return self.mspline_set.last()
+
     def resolved(self):
-        return self.mspline_set.last().type == MSPLineType.approve_material.name
+        last_line = self.last_line
+        return last_line is not None and last_line.type == MSPLineType.approve_material.name
 
     @property
     def all_teachers(self) -> List[Teacher]:
@@ -139,12 +170,12 @@ class MSP(models.Model):
         return association in self.associations
 
     def teacher_str(self):
-        last_line = self.mspline_set.filter(
-            Q(type=MSPLineType.request_material) |
-            Q(type=MSPLineType.approve_material)).last()
+        types = (MSPLineType.request_material.name, MSPLineType.approve_material.name)
+        last_line = next((line for line in reversed(list(self.mspline_set.all()))
+                          if line.type in types), None)
 
         if not last_line:
-            last_line = self.mspline_set.last()
+            last_line = self.last_line
 
         if not last_line:
             return _t("Empty MSP")
@@ -153,7 +184,7 @@ class MSP(models.Model):
             last_line.type, ', '.join(map(str, last_line.materials.all())))
 
     def __str__(self):
-        last_line: MSPLine = self.mspline_set.last()
+        last_line = self.last_line
         if not last_line:
             return _t("Empty MSP")
 
@@ -9,6 +9,7 @@ from django.contrib.auth.models import User
 from django.db import models
 from django.utils.translation import ugettext_lazy as _
 
+from steambird.cache import cached, CONFIG
 from steambird.models.coursetree import Period
 
 
@@ -26,6 +27,15 @@ class Config(models.Model):
         verbose_name=_("The period in the year you are working in"),
     )
 
+    @staticmethod
+    def current() -> 'Config':
+        """
+        Get the first DB config entry, which is cached until a config entry changes
+
+        :return: The Config
+        """
+        return _current_config()
+
     @staticmethod
     def get_system_value(name: str):
         """
@@ -34,7 +44,7 @@ class Config(models.Model):
         :param name: The database name you want the value for
         :return: Value of param
         """
-        return Config.objects.first().__dict__[name]
+        return Config.current().__dict__[name]
 
     # pylint: disable=unused-argument
     @staticmethod
@@ -47,3 +57,8 @@ class Config(models.Model):
         :return: Value of 'name' parameter for 'User'
         """
         return Config.get_system_value(name)
+
+
+@cached(CONFIG, timeout=None)
+def _current_config() -> Config:
+    return Config.objects.first()
@@ -3,9 +3,29 @@ Set of Permision Utilities, granting different users different levels of access
 """
 from django.contrib.auth.mixins import UserPassesTestMixin
 
+from steambird.cache import cached, ROLES
 from steambird.models.user import Teacher, StudyAssociation
 
 
+@cached(ROLES)
+def is_teacher(user_id: int) -> bool:
+    """
+    :param user_id: Primary key of a User
+    :return: Whether the user is a Teacher, cached until a Teacher changes
+    """
+    return Teacher.objects.filter(user=user_id).exists()
+
+
+@cached(ROLES)
+def is_study_association(user_id: int) -> bool:
+    """
+    :param user_id: Primary key of a User
+    :return: Whether the user is a member of a StudyAssociation, cached until an association or
+        its members change
+    """
+    return StudyAssociation.objects.filter(users=user_id).exists()
+
+
 class IsTeacherMixin(UserPassesTestMixin):
     """
     Checks if user has Teacher permissions, otherwise redirects to 404
@@ -17,7 +37,7 @@ class IsTeacherMixin(UserPassesTestMixin):
         :return: boolean. Used in Views
         """
         return self.request.user.is_authenticated and \
-               Teacher.objects.filter(user=self.request.user).exists()
+               is_teacher(self.request.user.pk)
 
 
 class IsStudyAssociationMixin(UserPassesTestMixin):
@@ -31,7 +51,7 @@ class IsStudyAssociationMixin(UserPassesTestMixin):
         :return: boolean. Used in Views
         """
         return self.request.user.is_authenticated and \
-               StudyAssociation.objects.filter(users=self.request.user).exists()
+               is_study_association(self.request.user.pk)
 
 
 class IsBoecieMixin(UserPassesTestMixin):
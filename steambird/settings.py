@@ -1,4 +1,5 @@
 import os
+import sys
 from importlib.util import find_spec
 
 from django.utils.translation import ugettext_lazy as _
@@ -16,6 +17,9 @@ SECRET_KEY = 'g+9hmm0y!48$_vaj=0&=mr%=pdd*c7&i&@8a)t=qow-!fh6vs!'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DEBUG", "True") in ["True", "1", "true"]
 
+# Whether the tests are run.
+TESTING = sys.argv[1:2] == ['test']
+
 INTERNAL_IPS = ('127.0.0.1',)
 ALLOWED_HOSTS = ([
     '127.0.0.1',
@@ -52,7 +56,25 @@ INSTALLED_APPS = [
 ] if DEBUG else [
 ])
 
-MIDDLEWARE = [
+# Statements that a request executes N_PLUS_ONE_THRESHOLD times or more with different parameters
+#  (N+1 queries, see steambird.util.n_plus_one) are logged in development, and fail the tests.
+N_PLUS_ONE_ACTION = 'raise' if TESTING else 'log' if DEBUG else None
+N_PLUS_ONE_THRESHOLD = 5
+
+# Fraction of the requests that is profiled (see steambird.util.profiling), between 0 and 1.
+#  Profiled requests get a Server-Timing header and are logged by the steambird.util.profiling
+#  logger. 0 disables profiling.
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '0'))
+
+# Middleware that the settings above disable is left out of MIDDLEWARE. It does not raise
+#  MiddlewareNotUsed: Django 3.1 then keeps the wrongly adapted handler of the middleware before
+#  it, which fails every request under ASGI.
+MIDDLEWARE = ([
+    'steambird.util.profiling.ProfilingMiddleware',
+] if PROFILING_SAMPLE_RATE else [
+]) + [
+    'steambird.util.metrics.MetricsMiddleware',
+    'steambird.cache.RequestMemoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.locale.LocaleMiddleware',
@@ -62,6 +84,9 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ] + ([
+    'steambird.util.n_plus_one.NPlusOneMiddleware',
+] if N_PLUS_ONE_ACTION else [
+]) + ([
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ] if DEBUG else [
 ])
@@ -70,7 +95,9 @@ ROOT_URLCONF = 'steambird.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # The Django backend, of which the rendering time is included in profiles.
+        'BACKEND': 'steambird.util.profiling.ProfilingTemplates',
+        'NAME': 'django',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -86,6 +113,27 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'steambird.wsgi.application'
 
+# The cache of template fragments and of values cached by steambird.cache is selected with
+#  CACHE_BACKEND and CACHE_LOCATION. Nothing is cached in development ('dummy'), so changes show
+#  at once; settings_production uses 'file' by default. 'locmem' is not shared between
+#  processes, so changes that one uWSGI worker makes are not seen by the others; use it for a
+#  single process only. 'database' needs a table named CACHE_LOCATION (manage.py
+#  createcachetable), 'memcached' the python-memcached package and a host:port location.
+CACHE_BACKENDS = {
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'database': 'django.core.cache.backends.db.DatabaseCache',
+    'memcached': 'django.core.cache.backends.memcached.MemcachedCache',
+}
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'dummy')],
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+        'TIMEOUT': 600,
+    }
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/2.1/ref/settings/#databases
@@ -101,6 +149,11 @@ DATABASES = {
     }
 }
 
+# Kept database connections (CONN_MAX_AGE, set in settings_production) that have been idle for
+#  this many seconds are checked at the start of a request, see steambird.util.db. None disables
+#  the checks.
+DB_HEALTH_CHECK_IDLE = 30
+
 # Password validation
 # https://docs.djangoproject.com/en/2.1/ref/settings/#auth-password-validators
 
@@ -145,6 +198,11 @@ LOCALE_PATHS = (os.path.join(BASE_DIR, 'locale'),)
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 
+# The Select2 that comes with the admin, instead of the one on a CDN.
+SELECT2_JS = 'admin/js/vendor/select2/select2.full.min.js'
+SELECT2_CSS = 'admin/css/vendor/select2/select2.min.css'
+SELECT2_I18N_PATH = 'admin/js/vendor/select2/i18n'
+
 # Login URL
 LOGIN_REDIRECT_URL = '/'
 LOGIN_URL = '/login/'
@@ -156,6 +214,90 @@ EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 # EMAIL_PORT = 587
 # EMAIL_USE_TLS = True
 
+# Lifetimes of looked up ISBN and DOI metadata, in seconds. Data is fresh for LOOKUP_CACHE_TTL,
+#  and is served while it is refreshed in the background for another LOOKUP_CACHE_STALE_TTL.
+#  Lookups without a result are cached for LOOKUP_CACHE_NEGATIVE_TTL.
+LOOKUP_CACHE_TTL = 7 * 24 * 3600
+LOOKUP_CACHE_STALE_TTL = 30 * 24 * 3600
+LOOKUP_CACHE_NEGATIVE_TTL = 24 * 3600
+
+# Timeouts of the ISBN metadata providers, and the deadline of a whole ISBN lookup, in seconds.
+#  The deadline must stay well below the uWSGI harakiri timeout of 20 seconds.
+ISBN_LOOKUP_TIMEOUTS = {
+    'meta': 8,
+    'desc': 5,
+    'cover': 5,
+}
+ISBN_LOOKUP_DEADLINE = 10
+# Timeout of the requests isbnlib makes itself, and of the services that merge the results of
+#  other services, in seconds.
+ISBN_SOCKETS_TIMEOUT = 8
+
+# Serve the async variants of the lookup views (see steambird.util.async_view), which only pays
+#  off when the site is served with ASGI (see entrypoint.sh).
+ASYNC_VIEWS = os.getenv('SERVER_MODE', 'wsgi') == 'asgi'
+
+# Outbound HTTP, per upstream (see steambird.util.http). Timeouts are in seconds; after
+#  failure_threshold consecutive failures an upstream is not called for reset_timeout seconds,
+#  and at most max_concurrency calls to an upstream are made at the same time per process, by
+#  sync code and by async code each.
+OUTBOUND_HTTP = {
+    'default': {
+        'connect_timeout': 3.05,
+        'read_timeout': 5,
+        'max_concurrency': 4,
+        'failure_threshold': 5,
+        'reset_timeout': 30,
+    },
+    'people': {
+        'max_concurrency': 8,
+    },
+    'crossref': {
+        'read_timeout': 8,
+    },
+    # isbnlib uses ISBN_SOCKETS_TIMEOUT; every ISBN lookup makes a call per ISBN provider.
+    'isbn': {
+        'max_concurrency': 8,
+    },
+}
+
+# vCards of people.utwente.nl are retrieved by at most PEOPLE_VCARD_WORKERS threads per process,
+#  and a people search waits at most PEOPLE_VCARD_DEADLINE seconds for them. Parsed vCards are
+#  kept for PEOPLE_VCARD_CACHE_TTL seconds, for at most PEOPLE_VCARD_CACHE_SIZE URLs.
+PEOPLE_VCARD_WORKERS = 6
+PEOPLE_VCARD_DEADLINE = 5
+PEOPLE_VCARD_CACHE_TTL = 24 * 3600
+PEOPLE_VCARD_CACHE_SIZE = 1024
+# Results of people searches are kept for PEOPLE_SEARCH_CACHE_TTL seconds. A query that extends a
+#  cached query is answered from its results, unless it had PEOPLE_SEARCH_PREFIX_MAX_RESULTS
+#  results or more, as people.utwente.nl may not return all results of broad queries.
+PEOPLE_SEARCH_CACHE_TTL = 10 * 60
+PEOPLE_SEARCH_PREFIX_MAX_RESULTS = 20
+
+# Metrics (see steambird.util.metrics) are shared between processes through files in METRICS_DIR,
+#  which are written every METRICS_FLUSH_INTERVAL seconds. Without METRICS_DIR, every process only
+#  exposes its own metrics. Scrapers authenticate with METRICS_TOKEN, staff can always see them.
+METRICS_DIR = os.getenv('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'steambird.util.profiling': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 try:
     # pylint: disable=wildcard-import, unused-wildcard-import
     from .local import *
@@ -0,0 +1,47 @@
+"""
+Settings for production, selected with DJANGO_SETTINGS_MODULE=steambird.settings_production (as
+the Docker image does): the settings of settings.py, with a shared cache, persistent database
+connections, hashed static files and cached templates.
+"""
+# pylint: disable=wildcard-import, unused-wildcard-import
+from .settings import *
+
+# Shared by all workers on a host by default, so a changed namespace version is seen by all of
+#  them.
+CACHES['default']['BACKEND'] = CACHE_BACKENDS[os.getenv('CACHE_BACKEND', 'file')]
+CACHES['default']['LOCATION'] = os.getenv('CACHE_LOCATION', '/var/tmp/steambird-cache')
+if CACHES['default']['BACKEND'] == CACHE_BACKENDS['file']:
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': 10000,
+    }
+
+# Workers keep their database connection for DB_CONN_MAX_AGE seconds ('none' keeps it forever)
+#  instead of connecting and authenticating for every request, see steambird.util.db.
+#  With DB_TRANSACTION_POOLING, the site connects to pgbouncer in transaction pooling mode, which
+#  shares the database connections of all workers; server-side cursors are not possible then.
+#  The database user should have the site's time zone set (ALTER ROLE ... SET timezone), so
+#  Django does not have to set it for every connection.
+DATABASES['default']['CONN_MAX_AGE'] = None \
+    if os.getenv('DB_CONN_MAX_AGE', '600').lower() == 'none' \
+    else int(os.getenv('DB_CONN_MAX_AGE', '600'))
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = \
+    os.getenv('DB_TRANSACTION_POOLING', 'False') in ['True', '1', 'true']
+
+# Static files get hashed names, so they can be cached forever, and are compressed in advance, see
+#  steambird.util.static.
+STATICFILES_STORAGE = 'steambird.util.static.CompressedManifestStaticFilesStorage'
+
+# Templates are compiled once per worker. The loaders replace APP_DIRS.
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+try:
+    # Local settings still take precedence.
+    from .local import *
+except ImportError:
+    pass
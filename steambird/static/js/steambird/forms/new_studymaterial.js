@@ -110,54 +110,17 @@ function searchDoi(doi) {
 
 /**
  * @param article : {{
- *      DOI: string
- *      ISSN: Array of strings
- *      URL: string
- *      'alternative-id': Array of strings
- *      author: {
- *          given: string
- *          family: string
- *      }
- *      'container-title': string Name of journal/book/conference
- *      issue: string
- *      issued: {
- *          'date-parts':{
- *              0:{
- *                  0 : number year
- *                  1 : number month
- *              }
- *          }
- *      }
- *      language: string
- *      page: string range of pages
- *      prefix: string DOI prefix
- *      'publish=print': Array
- *      publisher: string
- *      'short-container-title': string often abbreviated title of container
- *      subject: Array of strings
- *      title: Array of strings
- *      type: string type of DOI
- *      volume: string
+ *      doi: string
+ *      title: string
+ *      authors: string comma separated author names
+ *      year: number
+ *      url: string
  * }}
  */
 function updateArticle(article) {
-    const authors = article.author.map(author => {
-        if (author.given && author.family) {
-            return author.given + " " + author.family;
-        }
-
-        if (author.given) {
-            return author.given;
-        }
-
-        if (author.family) {
-            return author.family;
-        }
-    }).join(", ");
-
-    $("#paper-add-doi input").val(article.DOI);
+    $("#paper-add-doi input").val(article.doi);
     $("#paper-add-title input").val(article.title);
-    $("#paper-add-author input").val(authors);
-    $("#paper-add-year input").val(article.issued["date-parts"][0][0]);
-    $("#paper-add-url input").val(article.URL);
+    $("#paper-add-author input").val(article.authors);
+    $("#paper-add-year input").val(article.year);
+    $("#paper-add-url input").val(article.url);
 }
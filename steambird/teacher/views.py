@@ -5,6 +5,7 @@ is more a set of tools which aren't integrated into a fluid process yet
 import logging
 from typing import Union, Dict, Any
 
+from django.db.models import Prefetch, prefetch_related_objects
 from django.forms import Form
 from django.http import Http404, HttpRequest, HttpResponse, HttpResponseRedirect
 from django.shortcuts import render
@@ -13,7 +14,6 @@ from django.views import View
 from django.views.generic import FormView, TemplateView
 
 from steambird.models import Teacher, MSP, MSPLineType, Config
-from steambird.models.msp import MSPLine
 from steambird.perm_utils import IsTeacherMixin
 from .forms import PrefilledMSPLineForm, \
     PrefilledSuggestAnotherMSPLineForm
@@ -52,13 +52,18 @@ class CourseView(IsTeacherMixin, TemplateView):
 
         try:
             data['teacher'] = Teacher.objects.get(user=self.request.user)
-            data['courses'] = data["teacher"].all_courses_period(
+            data['courses'] = list(data["teacher"].all_courses_period(
                 year=data['year'],
                 period=data['period']
-            )
+            ))
         except Teacher.DoesNotExist as error:
             raise Http404 from error
 
+        # The MSPs of every course are shown with the materials of their last line. The courses
+        #  are a union, which cannot be prefetched on as a QuerySet.
+        prefetch_related_objects(
+            data['courses'], Prefetch('materials', queryset=MSP.objects.with_lines()))
+
         return data
 
 
@@ -130,8 +135,9 @@ class MSPDetail(IsTeacherMixin, FormView):
         :return: a context
         """
         try:
-            msp = MSP.objects.get(pk=self.kwargs.get("pk"))
-        except MSPLine.DoesNotExist as error:
+            # All lines are shown with their creator and materials.
+            msp = MSP.objects.with_lines().get(pk=self.kwargs.get("pk"))
+        except MSP.DoesNotExist as error:
             raise Http404 from error
 
         data = super().get_context_data(**kwargs)
@@ -163,8 +169,10 @@ class MSPDetail(IsTeacherMixin, FormView):
                 })
 
                 if line.type == 'set_available_materials':
+                    # Unbound, as a bound form would be validated, with queries, when it is
+                    #  rendered.
                     data["lines"][-1]["materials"][-1]["form"] = \
-                        PrefilledMSPLineForm({
+                        PrefilledMSPLineForm(initial={
                             "msp": msp.pk,
                             "comment": "",
                             "materials": [material.pk],
@@ -0,0 +1,26 @@
+"""
+Template tag for the versions of cached fragments, see :py:mod:`steambird.cache`.
+"""
+from django import template
+
+from steambird.cache import Namespace
+
+# pylint: disable=invalid-name
+register = template.Library()
+
+
+@register.simple_tag()
+def fragment_version(name: str) -> str:
+    """
+    Template tag for retrieving the version of a cache namespace, for example::
+
+        {% fragment_version 'courses' as courses_version %}
+        {% cache None course_row course.pk courses_version %}...{% endcache %}
+
+    The version changes whenever one of the models of the namespace changes, so such a fragment
+    never shows outdated objects, and does not need a timeout.
+
+    :param name: The name of a :py:class:`steambird.cache.Namespace`
+    :return: The current version, to add to the key of a cached fragment
+    """
+    return Namespace.registry[name].version()
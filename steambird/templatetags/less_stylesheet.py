@@ -0,0 +1,35 @@
+"""
+A template tag that links a LESS stylesheet, compiled to CSS when the Docker image is built.
+"""
+from functools import lru_cache
+from typing import Optional
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html
+
+# pylint: disable=invalid-name
+register = template.Library()
+
+
+@lru_cache(maxsize=None)
+def _compiled(path: str) -> Optional[str]:
+    css = path[:-len('.less')] + '.css'
+    return css if finders.find(css) else None
+
+
+@register.simple_tag()
+def less_stylesheet(path: str) -> str:
+    """
+    Template tag for linking a LESS stylesheet. The CSS that is compiled from it with lessc (see
+    the Dockerfile) is linked if it exists, otherwise the LESS file is, to be compiled in the
+    browser by less.js, as in development.
+
+    :param path: Static path of the LESS file
+    :return: The link element
+    """
+    css = _compiled(path)
+    if css is not None:
+        return format_html('<link href="{}" rel="stylesheet" type="text/css">', static(css))
+    return format_html('<link href="{}" rel="stylesheet/less" type="text/css">', static(path))
@@ -18,5 +18,5 @@ def period_retrieval() -> str:
 
     :return: string sentence for showing year and period
     """
-    result = Config.objects.first()
+    result = Config.current()
     return _("You are working in Year {}, {}").format(result.year, result.period)
@@ -1,2 +1,19 @@
+from .asgi import *
+from .cache import *
+from .dataset import *
+from .db import *
 from .homepage import *
+from .http import *
+from .importer import *
+from .lookups import *
+from .mail import *
+from .metrics import *
 from .models_coursetree import *
+from .models_materials import *
+from .n_plus_one import *
+from .people import *
+from .profiling import *
+from .query_budgets import *
+from .startup import *
+from .static import *
+from .teacher_sync import *
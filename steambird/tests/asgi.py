@@ -0,0 +1,69 @@
+import json
+import os
+import subprocess
+import sys
+from unittest import mock
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.test import override_settings, SimpleTestCase, tag
+
+# Sends requests through the ASGI application, concurrently, and prints the status of each. None
+#  of them uses the database.
+REQUESTS = '''
+import asyncio, json, sys
+from steambird.asgi import application
+
+async def request(path):
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    await application({
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'headers': [(b'host', b'localhost')], 'server': ('localhost', 80),
+        'client': ('127.0.0.1', 50000),
+    }, receive, send)
+    return messages[0]['status']
+
+async def main(paths):
+    return await asyncio.gather(*(request(path) for path in paths))
+
+print(json.dumps(asyncio.run(main(sys.argv[1:]))))
+'''
+
+
+@tag('unit')
+class AsgiTest(SimpleTestCase):
+    def test_productionSettingsServeRequests(self):
+        # A new interpreter, as the settings and URLconf are loaded once per process.
+        environment = dict(os.environ, DJANGO_SETTINGS_MODULE='steambird.settings_production',
+                           SERVER_MODE='asgi', DEBUG='False')
+        process = subprocess.run(
+            [sys.executable, '-c', REQUESTS, '/boecie/', '/api/doi/search',
+             '/boecie/api/find_teacher'],
+            cwd=settings.BASE_DIR, env=environment, stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE, universal_newlines=True, check=False)
+
+        self.assertEqual(process.returncode, 0, process.stderr[-2000:])
+        # A sync view, and async views, which redirect to the login page or need a query.
+        self.assertEqual(json.loads(process.stdout.splitlines()[-1]), [302, 302, 400],
+                         process.stderr[-2000:])
+
+    def test_middlewareIsNotAdapted(self):
+        # Sync-only middleware would run in a thread under ASGI, with all middleware and views
+        #  after it, one request at a time. The debug toolbar is only used in development. Django
+        #  only logs adaptations with DEBUG.
+        middleware = ['steambird.util.profiling.ProfilingMiddleware'] + [
+            name for name in settings.MIDDLEWARE if not name.startswith('debug_toolbar.')]
+
+        with override_settings(DEBUG=True, MIDDLEWARE=middleware), \
+                mock.patch('django.core.handlers.base.logger') as logger:
+            ASGIHandler()
+
+        logger.debug.assert_not_called()
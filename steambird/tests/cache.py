@@ -0,0 +1,162 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import override_settings, tag, TestCase
+from django.urls import reverse
+
+from steambird.boecie.views import study_progress
+from steambird.cache import CONFIG, COURSES, Key, request_memo, ROLES
+from steambird.models import Config, Teacher
+from steambird.perm_utils import is_teacher
+from steambird.tests.helpers.fixtures import build_fixture, PERIOD, YEAR
+from steambird.util.metrics import CACHE_REQUESTS, Registry
+
+
+@tag('unit')
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class CacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.computed = []
+        self.key = Key('test.double', self._double, (COURSES,))
+
+        patcher = mock.patch('steambird.util.metrics._registry', Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _double(self, number):
+        self.computed.append(number)
+        return number * 2
+
+    def _requests(self, result):
+        return self.registry.snapshot().get((CACHE_REQUESTS.name, ('test.double', result)))
+
+    def test_valueIsComputedOnce(self):
+        self.assertEqual(self.key(2), 4)
+        self.assertEqual(self.key(2), 4)
+        self.assertEqual(self.key(3), 6)
+
+        self.assertEqual(self.computed, [2, 3])
+        self.assertEqual(self._requests('miss'), [2])
+        self.assertEqual(self._requests('hit'), [1])
+
+    def test_valueIsMemoisedPerRequest(self):
+        with request_memo():
+            self.key(2)
+            cache.clear()
+            self.key(2)
+        self.key(2)
+
+        self.assertEqual(self.computed, [2, 2])
+        self.assertEqual(self._requests('memo'), [1])
+
+    def test_namespaceChangeAndInvalidateRecompute(self):
+        self.key(2)
+        COURSES.bump()
+        self.key(2)
+        self.key.invalidate(2)
+        self.key(2)
+
+        self.assertEqual(self.computed, [2, 2, 2])
+
+    def test_valueIsRecomputedEarlyByOneProcess(self):
+        cache.set(self.key.key(2), (5, 1.0, 0), None)
+
+        cache.add(self.key.key(2) + ':lock', True)
+        self.assertEqual(self.key(2), 5)
+        self.assertEqual(self.computed, [])
+
+        cache.delete(self.key.key(2) + ':lock')
+        self.assertEqual(self.key(2), 4)
+        self.assertEqual(self._requests('early'), [2])
+
+    def test_missingValueIsWaitedFor(self):
+        cache.add(self.key.key(2) + ':lock', True)
+
+        def computed_elsewhere(_seconds):
+            cache.set(self.key.key(2), (7, 1.0, None), None)
+
+        with mock.patch('steambird.cache.time.sleep', side_effect=computed_elsewhere):
+            self.assertEqual(self.key(2), 7)
+        self.assertEqual(self.computed, [])
+
+
+@tag('unit')
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+})
+class CachedModelsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.fixture = build_fixture()
+
+    def test_changesBumpTheirNamespaces(self):
+        courses, roles, config = COURSES.version(), ROLES.version(), CONFIG.version()
+
+        self.fixture.teacher.save()
+        self.assertNotEqual(COURSES.version(), courses)
+        self.assertNotEqual(ROLES.version(), roles)
+        self.assertEqual(CONFIG.version(), config)
+
+        courses = COURSES.version()
+        self.fixture.course.teachers.remove(self.fixture.teacher)
+        self.assertNotEqual(COURSES.version(), courses)
+
+        Config.objects.first().save()
+        self.assertNotEqual(CONFIG.version(), config)
+
+    def test_configIsCachedUntilChanged(self):
+        self.assertEqual(Config.get_system_value('period'), PERIOD)
+        with self.assertNumQueries(0):
+            Config.current()
+
+        config = Config.objects.first()
+        config.period = 'Q3'
+        config.save()
+
+        self.assertEqual(Config.get_system_value('period'), 'Q3')
+
+    def test_rolesAreCachedUntilChanged(self):
+        user = self.fixture.association_user
+        self.assertFalse(is_teacher(user.pk))
+
+        Teacher.objects.create(titles='', initials='B.', first_name='Bob', last_name='Teacher',
+                               email='bob@example.com', user=user)
+
+        self.assertTrue(is_teacher(user.pk))
+
+    def test_studyProgressShowsUpdatedCourses(self):
+        def updated(progress):
+            return sum(study['courses_updated_association']
+                       for studies in progress.values() for study in studies)
+
+        user, course = self.fixture.association_user, self.fixture.course
+        before = updated(study_progress(user.pk, YEAR, PERIOD))
+
+        course.updated_associations = not course.updated_associations
+        course.save()
+
+        self.assertEqual(updated(study_progress(user.pk, YEAR, PERIOD)),
+                         before + (1 if course.updated_associations else -1))
+
+    def test_cachedCourseRowsShowChanges(self):
+        self.client.force_login(self.fixture.association_user)
+        url = reverse('boecie:study.list', args=(self.fixture.study.pk,))
+        self.assertContains(self.client.get(url), self.fixture.course.name)
+
+        self.fixture.course.name = 'Renamed course'
+        self.fixture.course.save()
+
+        self.assertContains(self.client.get(url), 'Renamed course')
+
+    def test_cachedFooterShowsChangedPeriod(self):
+        self.client.force_login(self.fixture.association_user)
+        self.assertContains(self.client.get(reverse('boecie:index')), 'Q1')
+
+        config = Config.objects.first()
+        config.period = 'Q3'
+        config.save()
+
+        self.assertContains(self.client.get(reverse('boecie:index')), 'Q3')
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.test import tag, TestCase
+
+from steambird.models import Course, CourseStudy, MSP, MSPLine, MSPLineType, Study, \
+    StudyMaterialEdition, Teacher
+from steambird.models.coursetree import Period
+from steambird.util.dataset import generate_dataset, isbn13, MODULE_SIZE, YEARS
+from steambird.util.identifiers import normalise_isbn
+
+
+def _snapshot():
+    return (
+        list(Course.objects.order_by('course_code').values_list(
+            'course_code', 'period', 'calendar_year', 'coordinator__email',
+            'updated_associations', 'updated_teacher')),
+        list(CourseStudy.objects.order_by('course__course_code', 'study__slug').values_list(
+            'course__course_code', 'study__slug', 'study_year')),
+        list(MSPLine.objects.order_by('msp__course__course_code', 'time').values_list(
+            'msp__course__course_code', 'type', 'time', 'created_by__username')),
+    )
+
+
+@tag('unit')
+class GenerateDatasetTest(TestCase):
+    def test_sameSeedGivesSameDataset(self):
+        with transaction.atomic():
+            generate_dataset(1, seed=3, year=2020)
+            first = _snapshot()
+            transaction.set_rollback(True)
+
+        generate_dataset(1, seed=3, year=2020)
+        self.assertEqual(_snapshot(), first)
+
+    def test_reportMatchesDatabase(self):
+        report = generate_dataset(2, year=2020)
+
+        self.assertEqual(report.studies, Study.objects.count())
+        self.assertEqual(report.teachers, Teacher.objects.count())
+        self.assertEqual(report.materials, StudyMaterialEdition.objects.count())
+        self.assertEqual(report.courses, Course.objects.count())
+        self.assertEqual(report.course_studies, CourseStudy.objects.count())
+        self.assertEqual(report.msps, MSP.objects.count())
+        self.assertEqual(report.msp_lines, MSPLine.objects.count())
+        self.assertEqual(set(Course.objects.values_list('calendar_year', flat=True)),
+                         set(range(2020 - YEARS + 1, 2021)))
+
+    def test_modulesHaveSubCoursesInTheSamePeriod(self):
+        generate_dataset(1, year=2020)
+        modules = Course.objects.exclude(sub_courses=None).prefetch_related('sub_courses')
+
+        self.assertTrue(modules)
+        for module in modules:
+            self.assertTrue(Period[module.period].is_quartile())
+            self.assertEqual(len(module.sub_courses.all()), MODULE_SIZE)
+            for course in module.sub_courses.all():
+                self.assertEqual((course.period, course.calendar_year),
+                                 (module.period, module.calendar_year))
+
+    def test_pastMspsAreResolved(self):
+        generate_dataset(1, year=2020)
+
+        for msp in MSP.objects.filter(course__calendar_year__lt=2020).with_lines():
+            self.assertTrue(msp.resolved())
+            self.assertEqual([line.type for line in msp.mspline_set.all()],
+                             [MSPLineType.request_material.name,
+                              MSPLineType.set_available_materials.name,
+                              MSPLineType.approve_material.name])
+
+    def test_isbnsAreValid(self):
+        self.assertEqual(isbn13(30640615), '9780306406157')
+        self.assertEqual(normalise_isbn(isbn13(12345)), isbn13(12345))
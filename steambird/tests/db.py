@@ -0,0 +1,67 @@
+from unittest import mock
+
+from django.core.signals import request_finished, request_started
+from django.db import connection, transaction
+from django.test import override_settings, tag, TransactionTestCase
+
+from steambird.util.db import check_connections
+from steambird.util.metrics import DB_CONNECTIONS, Registry
+
+
+@tag('unit')
+@override_settings(DB_HEALTH_CHECK_IDLE=30)
+class ConnectionHealthTest(TransactionTestCase):
+    def setUp(self):
+        # Keep the connection, as in production.
+        connection.close()
+        patcher = mock.patch.dict(connection.settings_dict, CONN_MAX_AGE=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        connection.ensure_connection()
+
+        patcher = mock.patch('steambird.util.metrics._registry', Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _events(self, event):
+        return self.registry.snapshot().get((DB_CONNECTIONS.name, (connection.alias, event)))
+
+    @override_settings(DB_HEALTH_CHECK_IDLE=0)
+    def test_unusableConnectionIsClosed(self):
+        with mock.patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+
+        self.assertIsNone(connection.connection)
+        self.assertEqual(self._events('unusable'), [1])
+
+        connection.ensure_connection()
+        self.assertEqual(self._events('opened'), [1])
+
+    def test_recentlyUsedConnectionIsNotChecked(self):
+        request_finished.send(sender=None)
+
+        with mock.patch.object(connection, 'is_usable') as is_usable:
+            request_started.send(sender=None)
+
+        is_usable.assert_not_called()
+        self.assertIsNotNone(connection.connection)
+        self.assertEqual(self._events('reused'), [1])
+
+    @override_settings(DB_HEALTH_CHECK_IDLE=0)
+    def test_idleConnectionIsChecked(self):
+        request_finished.send(sender=None)
+
+        with mock.patch.object(connection, 'is_usable', return_value=True) as is_usable:
+            check_connections()
+
+        is_usable.assert_called_once_with()
+        self.assertEqual(self._events('reused'), [1])
+
+    @override_settings(DB_HEALTH_CHECK_IDLE=0)
+    def test_connectionInTransactionIsLeftAlone(self):
+        with transaction.atomic(), \
+                mock.patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+            self.assertIsNotNone(connection.connection)
+
+        self.assertIsNone(self._events('unusable'))
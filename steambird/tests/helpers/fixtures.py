@@ -0,0 +1,124 @@
+"""
+A realistic data set for view tests: a generated data set, see :py:mod:`steambird.util.dataset`,
+with known objects for the views to show. Everything that a view lists grows with the scale of the
+fixture, so tests can check that the number of queries of a view does not.
+"""
+from typing import NamedTuple
+
+from django.contrib.auth.models import User
+
+from steambird.models import Book, Config, Course, CourseStudy, MSP, MSPLine, MSPLineType, \
+    OtherMaterial, ScientificArticle, Study, StudyAssociation, Teacher
+from steambird.models.coursetree import StudyType
+from steambird.util.dataset import generate_dataset, isbn13
+
+YEAR = 2020
+PERIOD = 'Q1'
+
+
+class Fixture(NamedTuple):
+    config: Config
+    association_user: User
+    superuser: User
+    teacher: Teacher
+    study: Study
+    course: Course
+    coursestudy: CourseStudy
+    msp: MSP
+    book: Book
+    article: ScientificArticle
+    other: OtherMaterial
+
+
+def _add_line(msp: MSP, line_type: MSPLineType, materials, user: User, side: str) -> MSPLine:
+    line = MSPLine.objects.create(msp=msp, type=line_type.name, comment=line_type.value,
+                                  created_by=user, created_by_side=side)
+    line.materials.set(materials)
+    return line
+
+
+def build_fixture(scale: int = 1) -> Fixture:
+    """
+    Generates a data set of the given scale, and creates `scale` studies and teachers, with two
+    courses per teacher in the current period, one of which is updated by the association. Every
+    course has a resolved MSP for a book of its own. The first course also has all these MSPs, and
+    an unresolved MSP with two lines per scale, of which the last one offers all materials.
+
+    :param scale: The number of times the data set is repeated
+    :return: The objects that the views are about
+    """
+    config = Config.objects.first()
+    config.year = YEAR
+    config.period = PERIOD
+    config.save()
+    # The generated ISBNs start at 10^6 for seed 1, the ones below are used here.
+    generate_dataset(scale, seed=1, year=YEAR, progress=lambda _message: None)
+
+    association_user = User.objects.create_user('association')
+    superuser = User.objects.create_superuser('boecie', 'boecie@example.com', None)
+    association = StudyAssociation.objects.create(name='Association')
+    association.users.add(association_user)
+
+    study_types = list(StudyType)
+    teachers, studies, courses, coursestudies, msps = [], [], [], [], []
+    books, articles, others = [], [], []
+
+    for i in range(scale):
+        user = User.objects.create_user('teacher{}'.format(i))
+        teachers.append(Teacher.objects.create(
+            initials='A.', first_name='Ann', last_name='Teacher{}'.format(i),
+            email='teacher{}@example.com'.format(i), user=user))
+        studies.append(Study.objects.create(
+            type=study_types[i % len(study_types)].name, name='Study {}'.format(i),
+            slug='S{}'.format(i)))
+
+        books.append(Book.objects.create(
+            name='Book {}'.format(i), ISBN=isbn13(i), author='A. Author',
+            year_of_publishing=YEAR, edition='1st'))
+        articles.append(ScientificArticle.objects.create(
+            name='Article {}'.format(i), DOI='10.1000/{}'.format(i), author='A. Author',
+            year_of_publishing=YEAR))
+        others.append(OtherMaterial.objects.create(name='Reader {}'.format(i)))
+
+        for updated in (False, True):
+            course = Course.objects.create(
+                name='Course {}{}'.format(i, 'b' if updated else 'a'),
+                course_code='{:09d}'.format(len(courses)), period=PERIOD, calendar_year=YEAR,
+                coordinator=teachers[i], updated_associations=updated)
+            course.teachers.set([teachers[0], teachers[i]])
+            courses.append(course)
+            coursestudies.append(CourseStudy.objects.create(
+                study=studies[0], course=course, study_year=1))
+
+            msp = MSP.objects.create()
+            _add_line(msp, MSPLineType.request_material, [books[i]], user, 'TEACHER')
+            _add_line(msp, MSPLineType.set_available_materials, [books[i], articles[i]],
+                      association_user, 'BOECIE')
+            _add_line(msp, MSPLineType.approve_material, [books[i]], user, 'TEACHER')
+            course.materials.add(msp)
+            msps.append(msp)
+
+    association.studies.set(studies)
+
+    msp = MSP.objects.create()
+    msp.teachers.add(teachers[0])
+    for i in range(scale):
+        _add_line(msp, MSPLineType.request_material, [books[i], others[i]], teachers[0].user,
+                  'TEACHER')
+        _add_line(msp, MSPLineType.set_available_materials, books + articles + others,
+                  association_user, 'BOECIE')
+    courses[0].materials.add(msp, *msps)
+
+    return Fixture(
+        config=config,
+        association_user=association_user,
+        superuser=superuser,
+        teacher=teachers[0],
+        study=studies[0],
+        course=courses[0],
+        coursestudy=coursestudies[0],
+        msp=msp,
+        book=books[0],
+        article=articles[0],
+        other=others[0],
+    )
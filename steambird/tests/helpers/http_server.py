@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from typing import Dict, NamedTuple
+
+
+class Route(NamedTuple):
+    body: str
+    status: int = 200
+    delay: float = 0
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+    block_on_close = False
+
+    def handle_error(self, request, client_address):
+        # Clients that give up on a slow route are expected.
+        pass
+
+
+class LocalHTTPServer:
+    """
+    Local stand-in for an external service. Serves the given routes (path -> Route), responds
+    with a 404 to any other path, and counts the requests per path in `hits`.
+    """
+
+    def __init__(self, routes: Dict[str, Route]):
+        self.routes = routes
+        self.hits = Counter()
+        self.server = None
+        self.url = None
+
+    def __enter__(self):
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):  # pylint: disable=invalid-name
+                stand_in.hits[self.path] += 1
+                route = stand_in.routes.get(self.path, Route('', status=404))
+                time.sleep(route.delay)
+
+                body = route.body.encode()
+                self.send_response(route.status)
+                self.send_header('Content-Type', 'text/plain')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # pylint: disable=arguments-differ
+                pass
+
+        self.server = _Server(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server.server_address[1])
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase, tag
+
+from steambird.material_management import tools
+from steambird.material_management.tools import LookupUnavailable
+from steambird.tests.helpers.http_server import LocalHTTPServer, Route
+from steambird.util.http import CircuitBreaker, Upstream, UpstreamUnavailable
+
+
+ROUTES = {
+    '/': Route('ok'),
+    '/slow': Route('ok', delay=0.5),
+    '/error': Route('error', status=500),
+}
+
+
+@tag('unit')
+class CircuitBreakerTest(SimpleTestCase):
+    def test_opensAfterThreshold(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+
+    def test_successResetsFailures(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        self.assertTrue(breaker.allow())
+
+    def test_singleTrialAfterResetTimeout(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+        breaker.failure()
+        time.sleep(0.1)
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.failure()
+        self.assertFalse(breaker.allow())
+
+
+@tag('unit')
+class UpstreamTest(SimpleTestCase):
+    def test_responseIsReturned(self):
+        with LocalHTTPServer(ROUTES) as server:
+            response = Upstream('test').get(server.url + '/')
+
+        self.assertEqual(response.text, 'ok')
+
+    def test_timeoutIsUnavailable(self):
+        upstream = Upstream('test', read_timeout=0.1)
+
+        with LocalHTTPServer(ROUTES) as server:
+            start = time.monotonic()
+            with self.assertRaises(UpstreamUnavailable):
+                upstream.get(server.url + '/slow')
+
+            self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_circuitOpensOnServerErrors(self):
+        upstream = Upstream('test', failure_threshold=2)
+
+        with LocalHTTPServer(ROUTES) as server:
+            for _ in range(2):
+                with self.assertRaises(UpstreamUnavailable):
+                    upstream.get(server.url + '/error')
+
+            with mock.patch.object(upstream.session, 'request') as request:
+                with self.assertRaises(UpstreamUnavailable):
+                    upstream.get(server.url + '/')
+                request.assert_not_called()
+
+    def test_concurrencyIsCapped(self):
+        upstream = Upstream('test', max_concurrency=1)
+
+        with upstream.guard():
+            with self.assertRaises(UpstreamUnavailable):
+                with upstream.guard():
+                    pass
+
+        with upstream.guard():
+            pass
+
+    def test_asyncCallsWaitForASlot(self):
+        upstream = Upstream('test', max_concurrency=1, connect_timeout=0.2)
+        calls = []
+
+        async def call(name, duration):
+            async with upstream.aguard():
+                calls.append(name)
+                await asyncio.sleep(duration)
+
+        async def run():
+            return await asyncio.gather(call('first', 0.1), call('second', 0),
+                                        call('long', 0.5), call('too late', 0),
+                                        return_exceptions=True)
+
+        results = async_to_sync(run)()
+
+        self.assertEqual(calls, ['first', 'second', 'long'])
+        self.assertIsInstance(results[3], UpstreamUnavailable)
+
+    def test_asyncClientIsClosed(self):
+        upstream = Upstream('test')
+
+        async def run():
+            try:
+                return (await upstream.aget(server.url + '/')).text
+            finally:
+                await upstream.aclose()
+
+        with LocalHTTPServer(ROUTES) as server:
+            self.assertEqual(async_to_sync(run)(), 'ok')
+
+        self.assertEqual(len(upstream._async_clients), 0)
+
+    def test_ignoredExceptionsAreNoFailure(self):
+        upstream = Upstream('test', failure_threshold=1)
+
+        with self.assertRaises(KeyError):
+            with upstream.guard(ignore=(KeyError,)):
+                raise KeyError()
+
+        self.assertFalse(upstream.breaker.is_open)
+
+
+@tag('unit')
+class DOIFetchTest(SimpleTestCase):
+    def test_unavailableCrossref(self):
+        upstream = mock.Mock()
+        upstream.get.side_effect = UpstreamUnavailable()
+
+        with mock.patch.object(tools, 'get_upstream', return_value=upstream):
+            with self.assertRaises(LookupUnavailable):
+                tools._fetch_doi('10.1000/abc')
+
+    def test_unknownDOI(self):
+        upstream = mock.Mock()
+        upstream.get.return_value.status_code = 404
+
+        with mock.patch.object(tools, 'get_upstream', return_value=upstream):
+            self.assertIsNone(tools._fetch_doi('10.1000/abc'))
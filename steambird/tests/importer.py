@@ -0,0 +1,72 @@
+import os
+import tempfile
+from unittest import mock
+
+from django.test import tag, SimpleTestCase, TestCase
+
+from steambird.material_management.importer import import_materials, read_rows
+from steambird.models import Book, ScientificArticle
+
+
+def _isbn_lookup(isbn):
+    return {'meta': {'Title': 'Looked up', 'Authors': ['An Author'], 'Year': '2001',
+                     'img': None}}
+
+
+@tag('unit')
+@mock.patch('steambird.material_management.importer.isbn_lookup', _isbn_lookup)
+@mock.patch('steambird.material_management.importer.connection')
+class ImportMaterialsTest(TestCase):
+    rows = [
+        {'isbn': '0-306-40615-2', 'name': '', 'author': '', 'year': ''},
+        {'isbn': '9780306406157', 'name': 'Duplicate', 'author': 'A', 'year': '2000'},
+        {'isbn': '9781861972712', 'name': 'Complete', 'author': 'B', 'year': '1999'},
+        {'doi': 'https://doi.org/10.1000/ABC', 'title': 'Article', 'authors': 'C',
+         'year': '2010'},
+        {'isbn': 'not an isbn'},
+    ]
+
+    def test_rowsAreDedupedAndEnriched(self, _connection):
+        report = import_materials(self.rows, workers=2)
+
+        self.assertEqual(report.duplicates, [3])
+        self.assertEqual(report.invalid, [6])
+        self.assertEqual(report.enriched, 1)
+        self.assertEqual(Book.objects.get(ISBN13='9780306406157').name, 'Looked up')
+        self.assertEqual(ScientificArticle.objects.get().DOI, '10.1000/abc')
+
+    def test_existingMaterialsAreSkipped(self, _connection):
+        import_materials(self.rows, workers=2)
+        report = import_materials(self.rows, workers=2)
+
+        self.assertEqual(report.existing, [2, 4, 5])
+        self.assertEqual(Book.objects.count(), 2)
+
+    def test_dryRunStoresNothing(self, _connection):
+        report = import_materials(self.rows, workers=2, dry_run=True)
+
+        self.assertEqual(report.books, 2)
+        self.assertFalse(Book.objects.exists())
+
+
+@tag('unit')
+class ReadRowsTest(SimpleTestCase):
+    def _read(self, content, suffix='.csv'):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+        return list(read_rows(file.name))
+
+    def test_csvColumnsAreCaseInsensitive(self):
+        self.assertEqual(self._read('ISBN;Name\n0306406152; Book \n'),
+                         [{'isbn': '0306406152', 'name': 'Book'}])
+
+    def test_emptyCsvHasNoRows(self):
+        self.assertEqual(self._read(''), [])
+
+    def test_emptyXlsxHasNoRows(self):
+        openpyxl = mock.Mock()
+        openpyxl.load_workbook.return_value.active.iter_rows.return_value = iter([])
+
+        with mock.patch.dict('sys.modules', {'openpyxl': openpyxl}):
+            self.assertEqual(self._read('', suffix='.xlsx'), [])
@@ -0,0 +1,327 @@
+import gzip
+import json
+import time
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import tag, RequestFactory, TestCase, SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from isbnlib import NotValidISBNError
+from isbnlib.dev import NoDataForSelectorError
+
+from steambird.material_management import lookup_cache
+from steambird.material_management import tools
+from steambird.material_management.forms import BookForm
+from steambird.material_management.lookup_cache import cached_lookup
+from steambird.material_management.tools import LookupUnavailable, project_doi
+from steambird.material_management.views import aisbn_search_api_view
+from steambird.models import Book, LookupCacheEntry, LookupKind
+from steambird.util.http import Upstream
+from steambird.util.identifiers import normalise_isbn, normalise_doi
+
+
+class _Fetcher:
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def __call__(self, key):
+        self.calls += 1
+        return self.result
+
+
+@tag('unit')
+class NormaliseTest(TestCase):
+    def test_isbn10And13AreNormalisedToTheSameKey(self):
+        self.assertEqual(normalise_isbn('0-306-40615-2'), '9780306406157')
+        self.assertEqual(normalise_isbn('978-0-306-40615-7'), '9780306406157')
+
+    def test_invalidIsbnIsNotNormalised(self):
+        self.assertIsNone(normalise_isbn('1234'))
+
+    def test_doiUrlsAreNormalised(self):
+        self.assertEqual(normalise_doi('https://doi.org/10.1000/ABC'), '10.1000/abc')
+
+
+@tag('unit')
+class LookupCacheTest(TestCase):
+    def test_repeatedLookupsAreCached(self):
+        fetch = _Fetcher({'title': 'Book'})
+
+        self.assertEqual(cached_lookup(LookupKind.isbn, '9780306406157', fetch), {'title': 'Book'})
+        self.assertEqual(cached_lookup(LookupKind.isbn, '9780306406157', fetch), {'title': 'Book'})
+        self.assertEqual(fetch.calls, 1)
+
+    def test_missingDataIsCached(self):
+        fetch = _Fetcher(None)
+
+        self.assertIsNone(cached_lookup(LookupKind.doi, '10.1000/abc', fetch))
+        self.assertIsNone(cached_lookup(LookupKind.doi, '10.1000/abc', fetch))
+        self.assertEqual(fetch.calls, 1)
+
+    def test_expiredMissingDataIsFetchedAgain(self):
+        fetch = _Fetcher(None)
+        cached_lookup(LookupKind.doi, '10.1000/abc', fetch)
+        LookupCacheEntry.objects.update(fetched=timezone.now() - timedelta(days=2))
+
+        cached_lookup(LookupKind.doi, '10.1000/abc', fetch)
+        self.assertEqual(fetch.calls, 2)
+
+    def test_staleDataIsServedWhileRefreshing(self):
+        fetch = _Fetcher({'title': 'Old'})
+        cached_lookup(LookupKind.isbn, '9780306406157', fetch)
+        LookupCacheEntry.objects.update(fetched=timezone.now() - timedelta(days=8))
+
+        with mock.patch.object(lookup_cache, '_refresh_in_background') as refresh:
+            self.assertEqual(cached_lookup(LookupKind.isbn, '9780306406157', _Fetcher({})),
+                             {'title': 'Old'})
+            refresh.assert_called_once()
+
+
+def _slow(result, delay):
+    def provider(_isbn):
+        time.sleep(delay)
+        return result
+    return provider
+
+
+def _no_data(_isbn):
+    raise NoDataForSelectorError('test')
+
+
+def _rejected(isbn):
+    raise NotValidISBNError(isbn)
+
+
+@tag('unit')
+class ISBNLibTest(SimpleTestCase):
+    def test_isbnlibIsConfigured(self):
+        tools._isbnlib.cache_clear()
+        self.addCleanup(tools._isbnlib.cache_clear)
+
+        isbnlib = tools._isbnlib()
+
+        self.assertEqual(isbnlib.config.options['URLOPEN_TIMEOUT'],
+                         settings.ISBN_SOCKETS_TIMEOUT)
+        self.assertEqual(isbnlib.config.options['THREADS_TIMEOUT'],
+                         settings.ISBN_SOCKETS_TIMEOUT)
+        self.assertIs(isbnlib.dev.NoDataForSelectorError, NoDataForSelectorError)
+
+
+@tag('unit')
+@override_settings(ISBN_LOOKUP_TIMEOUTS={'meta': 0.5, 'desc': 0.5, 'cover': 0.2},
+                   ISBN_LOOKUP_DEADLINE=1)
+class ISBNFanOutTest(SimpleTestCase):
+    def _fetch(self, **providers):
+        with mock.patch.dict(tools.ISBN_PROVIDERS, providers, clear=True):
+            return tools._fetch_isbn('9780306406157')
+
+    def test_providersAreCalledConcurrently(self):
+        start = time.monotonic()
+        result = self._fetch(meta=_slow({'Title': 'Book'}, 0.15),
+                             desc=_slow('Description', 0.15),
+                             cover=_slow({'thumbnail': 'http://cover'}, 0.15))
+
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(result['desc'], 'Description')
+        self.assertEqual(result['meta']['img'], 'http://cover')
+
+    def test_slowCoverGivesPartialResult(self):
+        result = self._fetch(meta=_slow({'Title': 'Book'}, 0),
+                             desc=_slow('Description', 0),
+                             cover=_slow({'thumbnail': 'http://cover'}, 0.5))
+
+        self.assertEqual(result['meta']['Title'], 'Book')
+        self.assertIsNone(result['cover'])
+        self.assertIsNone(result['meta']['img'])
+
+    def test_noMetadataMeansNoResult(self):
+        self.assertIsNone(self._fetch(meta=_no_data, desc=_slow('Description', 0)))
+
+    def test_slowMetadataIsUnavailable(self):
+        with self.assertRaises(LookupUnavailable):
+            self._fetch(meta=_slow({'Title': 'Book'}, 0.8))
+
+    def test_isbnlibIsCalledOnFirstUse(self):
+        upstream = Upstream('isbn', failure_threshold=1)
+
+        with mock.patch.object(tools, 'get_upstream', return_value=upstream), \
+                mock.patch('isbnlib.meta', return_value={'Title': 'Book'}) as meta, \
+                mock.patch('isbnlib.desc', side_effect=NoDataForSelectorError('test')), \
+                mock.patch('isbnlib.cover', return_value={'thumbnail': 'http://cover'}):
+            result = tools._fetch_isbn('9780306406157')
+
+        meta.assert_called_once_with('9780306406157')
+        self.assertEqual(result['meta']['img'], 'http://cover')
+        self.assertIsNone(result['desc'])
+        self.assertFalse(upstream.breaker.is_open)
+
+    def test_invalidIsbnIsNotLookedUp(self):
+        meta = mock.Mock()
+
+        with mock.patch.dict(tools.ISBN_PROVIDERS, {'meta': meta}, clear=True):
+            self.assertIsNone(tools.isbn_lookup('not-an-isbn'))
+
+        meta.assert_not_called()
+        self.assertFalse(tools.get_upstream('isbn').breaker.is_open)
+
+    def test_rejectedIsbnIsNoUpstreamFailure(self):
+        upstream = Upstream('isbn', failure_threshold=1)
+
+        with mock.patch.object(tools, 'get_upstream', return_value=upstream):
+            self.assertIsNone(self._fetch(meta=_rejected))
+
+        self.assertFalse(upstream.breaker.is_open)
+
+
+@tag('unit')
+class DOIProjectionTest(SimpleTestCase):
+    record = {
+        'DOI': '10.1000/abc',
+        'URL': 'http://dx.doi.org/10.1000/abc',
+        'title': ['An article'],
+        'author': [{'given': 'Ada', 'family': 'Lovelace'}, {'family': 'Babbage'}],
+        'issued': {'date-parts': [[1843, 10]]},
+        'reference': [{'key': str(i)} for i in range(500)],
+    }
+
+    def test_defaultProjectionIsCompact(self):
+        self.assertEqual(project_doi(self.record), {
+            'doi': '10.1000/abc',
+            'title': 'An article',
+            'authors': 'Ada Lovelace, Babbage',
+            'year': 1843,
+            'url': 'http://dx.doi.org/10.1000/abc',
+        })
+
+    def test_otherFieldsAreCopied(self):
+        self.assertEqual(project_doi(self.record, ['title', 'reference'])['reference'],
+                         self.record['reference'])
+
+    def test_missingFieldsAreEmpty(self):
+        self.assertEqual(project_doi({}), {
+            'doi': None, 'title': None, 'authors': '', 'year': None, 'url': None,
+        })
+
+
+@tag('unit')
+class DOISearchApiViewTest(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('user'))
+
+    def _search(self, **params):
+        with mock.patch('steambird.material_management.views.doi_lookup',
+                        return_value=DOIProjectionTest.record):
+            return self.client.get(reverse('material_management:doi.search'),
+                                   {'doi': '10.1000/abc', **params},
+                                   HTTP_ACCEPT_ENCODING='gzip')
+
+    @staticmethod
+    def _json(response):
+        content = response.content
+        if response.get('Content-Encoding') == 'gzip':
+            content = gzip.decompress(content)
+        return json.loads(content)
+
+    def test_defaultFieldsAreReturned(self):
+        self.assertEqual(set(self._json(self._search())),
+                         {'doi', 'title', 'authors', 'year', 'url'})
+
+    def test_requestedFieldsAreReturned(self):
+        self.assertEqual(self._json(self._search(fields='title, reference'))['reference'],
+                         DOIProjectionTest.record['reference'])
+        self.assertEqual(self._json(self._search(fields='*')), DOIProjectionTest.record)
+
+    def test_responseIsCompressed(self):
+        response = self._search(fields='*')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertLess(len(response.content), len(json.dumps(DOIProjectionTest.record)))
+
+    def test_unknownDOIIsNotFound(self):
+        with mock.patch('steambird.material_management.views.doi_lookup', return_value=None):
+            response = self.client.get(reverse('material_management:doi.search'),
+                                       {'doi': '10.1000/unknown'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@tag('unit')
+class BookISBNTest(TestCase):
+    def setUp(self) -> None:
+        self.book = Book.objects.create(
+            name='Book', ISBN='0306406152', author='A. Author, B. Author',
+            year_of_publishing=1984, edition='1st')
+
+    def test_isbn13IsFilledOnSave(self):
+        self.assertEqual(self.book.ISBN13, '9780306406157')
+
+    def test_duplicateIsbnIsRejected(self):
+        form = BookForm({
+            'name': 'Book', 'ISBN': '9780306406157', 'author': 'A. Author',
+            'year_of_publishing': 1984, 'edition': '1st',
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('ISBN', form.errors)
+
+    def test_adminRejectsDuplicateIsbn(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'x'))
+
+        response = self.client.post(reverse('admin:steambird_book_add'), {
+            'name': 'Book', 'ISBN': '978-0-306-40615-7', 'author': 'A. Author',
+            'year_of_publishing': 1984, 'edition': '2nd',
+        })
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ISBN', response.context['adminform'].form.errors)
+        self.assertEqual(Book.objects.count(), 1)
+
+    def test_detailViewAcceptsBothForms(self):
+        self.client.force_login(User.objects.create_user('user'))
+
+        for isbn in ('0306406152', '978-0-306-40615-7'):
+            response = self.client.get(
+                reverse('material_management:isbndetail', kwargs={'isbn': isbn}))
+            self.assertEqual(response.context['object'], self.book)
+
+    def test_searchReturnsLocalBookWithoutLookup(self):
+        self.client.force_login(User.objects.create_user('user'))
+
+        with mock.patch('steambird.material_management.views.isbn_lookup') as lookup:
+            response = self.client.get(reverse('material_management:isbn.search'),
+                                       {'isbn': '978-0-306-40615-7'})
+
+        lookup.assert_not_called()
+        self.assertEqual(response.json()['meta']['Authors'], ['A. Author', 'B. Author'])
+
+    def test_searchForInvalidIsbnIsNotFound(self):
+        self.client.force_login(User.objects.create_user('user'))
+
+        with mock.patch.dict(tools.ISBN_PROVIDERS, {'meta': mock.Mock()}, clear=True):
+            response = self.client.get(reverse('material_management:isbn.search'),
+                                       {'isbn': 'not-an-isbn'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_asyncSearchReturnsLocalBookWithoutLookup(self):
+        request = RequestFactory().get('/', {'isbn': '978-0-306-40615-7'})
+        request.user = User.objects.create_user('user')
+
+        with mock.patch('steambird.material_management.views.aisbn_lookup') as lookup:
+            response = async_to_sync(aisbn_search_api_view)(request)
+
+        lookup.assert_not_called()
+        self.assertEqual(json.loads(response.content)['meta']['Authors'],
+                         ['A. Author', 'B. Author'])
+
+    def test_asyncSearchRequiresLogin(self):
+        request = RequestFactory().get('/', {'isbn': '978-0-306-40615-7'})
+        request.user = AnonymousUser()
+
+        response = async_to_sync(aisbn_search_api_view)(request)
+
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,256 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.core import mail
+from django.core.mail import get_connection
+from django.db import connection
+from django.test import tag, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from steambird.mail.mailsender import registry, reload_templates, create_email, \
+    create_multilingual_mail, MultiTemplatableEmailMessage, queue_mimemessages, \
+    send_mimemessages
+from steambird.mail.outbox import OutboxWorker
+from steambird.mail.notifications import create_digests
+from steambird.mail.reminders import create_reminders
+from steambird.models import OutboxMessage, OutboxStatus, Config, Course, MSP, MSPLine, \
+    MSPLineType, MSPNotification, Teacher
+from steambird.util.smtp_sink import SMTPSink
+
+
+@tag('unit')
+class MailTemplateRegistryTest(SimpleTestCase):
+    def test_registryIsLoadedOnReady(self):
+        self.assertTrue(registry.loaded)
+        self.assertIn('steambird/test', registry.templates)
+
+    def test_registryContainsAllSubtypes(self):
+        subtypes = {t.subtype for t in registry.get('steambird/test')['nl']}
+        self.assertEqual(subtypes, {'html', 'plain'})
+
+    def test_reloadKeepsTemplates(self):
+        reload_templates()
+        self.assertIn('nl', registry.get('steambird/test'))
+
+    def test_headerIsCopied(self):
+        self.assertIsNot(registry.get_header(), registry.get_header())
+
+    def test_singleLanguageMail(self):
+        msg = create_multilingual_mail(
+            'steambird/test', 'Test', {}, to=['test@example.com'])
+        self.assertIsInstance(msg, MultiTemplatableEmailMessage)
+        self.assertIn('Dutch plaintext', msg.message().as_string())
+
+    def test_createEmailFallsBackToAvailableLanguage(self):
+        msg = create_email('steambird/test', 'Test', {}, to=['test@example.com'])
+        self.assertIn('Dutch plaintext', msg.message().as_string())
+
+
+@tag('unit')
+class OutboxTest(TestCase):
+    def _queue(self, count=1):
+        queue_mimemessages([
+            create_email('steambird/test', 'Test', {}, to=['test@example.com'])
+            for _ in range(count)
+        ])
+
+    def test_queueOnlyStoresMessages(self):
+        self._queue(3)
+        self.assertEqual(OutboxMessage.objects.count(), 3)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_workerSendsQueuedMessages(self):
+        self._queue(3)
+        self.assertEqual(OutboxWorker(batch_size=2).run(once=True), 3)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertFalse(OutboxMessage.objects.filter(
+            status=OutboxStatus.pending.name).exists())
+
+    def test_failingMessagesAreRetriedThenDead(self):
+        self._queue()
+        worker = OutboxWorker(max_attempts=2)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.send_messages',
+                        side_effect=ConnectionError):
+            worker.process_batch()
+            message = OutboxMessage.objects.get()
+            self.assertEqual(message.status, OutboxStatus.pending.name)
+            self.assertEqual(message.attempts, 1)
+
+            OutboxMessage.objects.update(next_attempt=message.created)
+            worker.process_batch()
+            self.assertEqual(OutboxMessage.objects.get().status, OutboxStatus.dead.name)
+
+    def test_sentMessagesSurviveAStoppedWorker(self):
+        self._queue(2)
+        worker = OutboxWorker()
+        send = worker._send
+        sent = []
+
+        def send_once(message):
+            if sent:
+                raise KeyboardInterrupt
+            sent.append(message)
+            send(message)
+
+        with mock.patch.object(worker, '_send', side_effect=send_once):
+            with self.assertRaises(KeyboardInterrupt):
+                worker.process_batch()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(OutboxMessage.objects.get(pk=sent[0].pk).status, OutboxStatus.sent.name)
+
+        # The unsent message is claimed again once the lease ends, not before.
+        self.assertEqual(OutboxWorker().process_batch(), 0)
+        OutboxMessage.objects.filter(status=OutboxStatus.pending.name) \
+            .update(next_attempt=timezone.now())
+        self.assertEqual(OutboxWorker().process_batch(), 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_slowBatchesKeepTheirLease(self):
+        self._queue(2)
+        worker = OutboxWorker(lease=timedelta(minutes=1))
+        other = OutboxWorker(lease=timedelta(minutes=1))
+        send = worker._send
+        clock = [timezone.now()]
+
+        def send_slowly(message):
+            send(message)
+            # Every message takes most of the lease, so the batch takes longer than the lease.
+            clock[0] += timedelta(seconds=40)
+            self.assertEqual(other.process_batch(), 0)
+
+        with mock.patch('django.utils.timezone.now', side_effect=lambda: clock[0]), \
+                mock.patch.object(worker, '_send', side_effect=send_slowly):
+            self.assertEqual(worker.process_batch(), 2)
+
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_messagesClaimedByAnotherWorkerAreSkipped(self):
+        self._queue(2)
+        worker = OutboxWorker(lease=timedelta(minutes=1))
+        send = worker._send
+        sent = []
+
+        def send_and_lose_lease(message):
+            sent.append(message)
+            send(message)
+            # The lease ends, and another worker claims the other message.
+            OutboxMessage.objects.exclude(pk=message.pk).update(next_attempt=timezone.now())
+            OutboxWorker().process_batch()
+
+        with mock.patch.object(worker, '_send', side_effect=send_and_lose_lease):
+            worker.process_batch()
+
+        self.assertEqual(len(sent), 1)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboxMessage.objects.filter(
+            status=OutboxStatus.pending.name).exists())
+
+
+@tag('unit')
+class ReminderTest(TestCase):
+    def setUp(self) -> None:
+        config = Config.objects.first()
+        self.coordinator = Teacher.objects.create(
+            initials='A.', first_name='Anna', last_name='Coordinator', email='anna@example.com')
+        self.parent_coordinator = Teacher.objects.create(
+            initials='B.', first_name='Bert', last_name='Parent', email='bert@example.com')
+
+        parent = Course.objects.create(
+            name='Module', course_code='1', period=config.period,
+            calendar_year=config.year, coordinator=self.parent_coordinator)
+
+        for i in range(3):
+            course = Course.objects.create(
+                name='Course {}'.format(i), course_code='2{}'.format(i), period=config.period,
+                calendar_year=config.year, coordinator=self.coordinator)
+            parent.sub_courses.add(course)
+
+            msp = MSP.objects.create()
+            course.materials.add(msp)
+            MSPLine.objects.create(
+                msp=msp, type=MSPLineType.request_material.name, created_by_side='BOECIE')
+
+        MSPLine.objects.update(time=timezone.now() - timedelta(days=30))
+
+    def test_oneDigestPerCoordinator(self):
+        msgs = create_reminders(timezone.now() - timedelta(days=14))
+        self.assertEqual(sorted(msg.to[0] for msg in msgs),
+                         ['anna@example.com', 'bert@example.com'])
+
+    def test_queryCountDoesNotDependOnMSPs(self):
+        threshold = timezone.now() - timedelta(days=14)
+
+        with CaptureQueriesContext(connection) as before:
+            create_reminders(threshold)
+
+        for msp in MSP.objects.all():
+            MSPLine.objects.create(
+                msp=msp, type=MSPLineType.set_available_materials.name,
+                created_by_side='BOECIE')
+        MSPLine.objects.update(time=timezone.now() - timedelta(days=30))
+
+        with CaptureQueriesContext(connection) as after:
+            create_reminders(threshold)
+
+        self.assertEqual(len(before), len(after))
+
+    def test_resolvedMSPsAreSkipped(self):
+        for msp in MSP.objects.all():
+            MSPLine.objects.create(
+                msp=msp, type=MSPLineType.approve_material.name, created_by_side='TEACHER',
+            )
+        MSPLine.objects.filter(type=MSPLineType.approve_material.name)\
+            .update(time=timezone.now() - timedelta(days=20))
+
+        self.assertEqual(create_reminders(timezone.now() - timedelta(days=14)), [])
+
+
+@tag('unit')
+class DigestTest(TestCase):
+    def setUp(self) -> None:
+        config = Config.objects.first()
+        self.teacher = Teacher.objects.create(
+            initials='A.', first_name='Anna', last_name='Teacher', email='anna@example.com')
+        self.course = Course.objects.create(
+            name='Course', course_code='1', period=config.period,
+            calendar_year=config.year, coordinator=self.teacher)
+        self.msp = MSP.objects.create()
+        self.course.materials.add(self.msp)
+
+    def _add_lines(self, count):
+        for _ in range(count):
+            MSPLine.objects.create(
+                msp=self.msp, type=MSPLineType.request_material.name, created_by_side='BOECIE')
+
+    def test_addingLinesEnqueuesEvents(self):
+        self._add_lines(3)
+        self.assertEqual(MSPNotification.objects.filter(processed__isnull=True).count(), 3)
+
+    def test_eventsAreGroupedPerRecipient(self):
+        self._add_lines(5)
+
+        msgs = create_digests(timezone.now())
+
+        self.assertEqual(len(msgs), 1)
+        self.assertEqual(msgs[0].to, ['anna@example.com'])
+        self.assertFalse(MSPNotification.objects.filter(processed__isnull=True).exists())
+        self.assertEqual(create_digests(timezone.now()), [])
+
+
+@tag('unit')
+class SMTPSinkTest(SimpleTestCase):
+    def test_messagesAreSentOverOneConnection(self):
+        with SMTPSink(keep=True) as sink:
+            smtp = get_connection('django.core.mail.backends.smtp.EmailBackend',
+                                  host=sink.host, port=sink.port, use_tls=False,
+                                  use_ssl=False, username='', password='')
+            send_mimemessages([
+                create_email('steambird/test', 'Test', {}, to=['test@example.com'])
+                for _ in range(3)
+            ], smtp)
+
+        self.assertEqual(sink.count, 3)
+        self.assertIn(b'Dutch plaintext', sink.messages[0])
@@ -0,0 +1,150 @@
+import asyncio
+import atexit
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage
+from django.http import HttpResponse
+from django.test import override_settings, RequestFactory, SimpleTestCase, tag, TestCase
+from django.urls import reverse
+
+from steambird.mail.mailsender import send_mimemessages
+from steambird.util.metrics import exposition, lookup_timer, LOOKUP_DURATION, MAILS, \
+    MetricsMiddleware, record, Registry, REQUEST_DURATION, REQUEST_QUERIES
+
+
+def _key(metric, *labels):
+    return metric.name, labels
+
+
+@tag('unit')
+class RegistryTest(SimpleTestCase):
+    def setUp(self):
+        self.registry = Registry()
+
+    def test_histogramCountsPerBucket(self):
+        for value in (0.001, 0.005, 0.3, 60):
+            self.registry.record(REQUEST_DURATION, value, ('boecie:index', 'GET'))
+
+        values = self.registry.snapshot()[_key(REQUEST_DURATION, 'boecie:index', 'GET')]
+        self.assertEqual(values[:-1], [2, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 1])
+        self.assertAlmostEqual(values[-1], 60.306)
+
+    def test_exposition(self):
+        self.registry.record(REQUEST_QUERIES, 3, ('boecie:index',))
+        self.registry.record(MAILS, 2, ('sent',))
+
+        text = exposition(self.registry.collect())
+
+        self.assertIn('# TYPE steambird_request_queries histogram\n', text)
+        self.assertIn('steambird_request_queries_bucket{view="boecie:index",le="2.0"} 0.0\n',
+                      text)
+        self.assertIn('steambird_request_queries_bucket{view="boecie:index",le="5.0"} 1.0\n',
+                      text)
+        self.assertIn('steambird_request_queries_bucket{view="boecie:index",le="+Inf"} 1.0\n',
+                      text)
+        self.assertIn('steambird_request_queries_count{view="boecie:index"} 1.0\n', text)
+        self.assertIn('steambird_request_queries_sum{view="boecie:index"} 3.0\n', text)
+        self.assertIn('# TYPE steambird_mails_total counter\n', text)
+        self.assertIn('steambird_mails_total{result="sent"} 2.0\n', text)
+
+    def test_processesAreCombined(self):
+        with tempfile.TemporaryDirectory() as directory:
+            other = Registry(directory, flush_interval=60)
+            with mock.patch('steambird.util.metrics.os.getpid', return_value=1):
+                other.record(MAILS, 2, ('sent',))
+                other.flush()
+
+            own = Registry(directory, flush_interval=60)
+            own.record(MAILS, 1, ('sent',))
+            self.addCleanup(atexit.unregister, own.flush)
+            own.record(MAILS, 1, ('failed',))
+
+            self.assertEqual(own.collect(), {
+                _key(MAILS, 'sent'): [3],
+                _key(MAILS, 'failed'): [1],
+            })
+
+    def test_startsOverAfterFork(self):
+        self.registry.record(MAILS, 1, ('sent',))
+
+        with mock.patch('steambird.util.metrics.os.getpid', return_value=1):
+            self.assertEqual(self.registry.snapshot(), {})
+
+
+@tag('unit')
+class MetricsRecordingTest(TestCase):
+    def setUp(self):
+        patcher = mock.patch('steambird.util.metrics._registry', Registry())
+        self.registry = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_middlewareRecordsViewAndQueries(self):
+        def view(request):
+            request.resolver_match = mock.Mock(view_name='boecie:index')
+            User.objects.count()
+            User.objects.exists()
+            return HttpResponse()
+
+        MetricsMiddleware(view)(RequestFactory().get('/boecie/'))
+
+        values = self.registry.snapshot()
+        self.assertEqual(sum(values[_key(REQUEST_DURATION, 'boecie:index', 'GET')][:-1]), 1)
+        self.assertEqual(values[_key(REQUEST_QUERIES, 'boecie:index')][-1], 2)
+
+    def test_asyncMiddlewareRecordsQueriesOfThreads(self):
+        async def view(request):
+            request.resolver_match = mock.Mock(view_name='boecie:index')
+            await sync_to_async(User.objects.count)()
+            return HttpResponse()
+
+        middleware = MetricsMiddleware(view)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        async_to_sync(middleware)(RequestFactory().get('/boecie/'))
+
+        values = self.registry.snapshot()
+        self.assertEqual(values[_key(REQUEST_QUERIES, 'boecie:index')][-1], 1)
+
+    def test_unmatchedRequestsShareASeries(self):
+        middleware = MetricsMiddleware(lambda request: HttpResponse(status=404))
+        middleware(RequestFactory().get('/a'))
+        middleware(RequestFactory().generic('BREW', '/b'))
+
+        self.assertEqual(set(self.registry.snapshot()), {
+            _key(REQUEST_DURATION, 'unmatched', 'GET'),
+            _key(REQUEST_DURATION, 'unmatched', 'other'),
+            _key(REQUEST_QUERIES, 'unmatched'),
+        })
+
+    def test_lookupTimerRecordsErrors(self):
+        with self.assertRaises(ValueError), lookup_timer('isbn'):
+            raise ValueError()
+        with lookup_timer('isbn'):
+            pass
+
+        values = self.registry.snapshot()
+        self.assertEqual(sum(values[_key(LOOKUP_DURATION, 'isbn', 'error')][:-1]), 1)
+        self.assertEqual(sum(values[_key(LOOKUP_DURATION, 'isbn', 'ok')][:-1]), 1)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpointNeedsStaffOrToken(self):
+        record(MAILS, result='queued')
+        url = reverse('metrics')
+
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code,
+                         401)
+
+        response = self.client.get(url, HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'steambird_mails_total{result="queued"} 1.0', response.content)
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_mailsAreCounted(self):
+        send_mimemessages([EmailMessage('Subject', 'Body', to=['a@example.com'])] * 2)
+
+        self.assertEqual(self.registry.snapshot()[_key(MAILS, 'sent')], [2])
@@ -1,6 +1,9 @@
+from django.contrib.auth.models import User
 from django.test import tag, TestCase
+from django.urls import reverse
 
-from steambird.models.coursetree import Period
+from steambird.models import Config, CourseStudy, Study, StudyAssociation, Teacher
+from steambird.models.coursetree import Course, Period
 
 
 # pylint: disable=invalid-name
@@ -87,3 +90,47 @@ class PeriodTest(TestCase):
         self.assertEqual(Period.FULL_YEAR.all_children(),
                          [Period.Q1, Period.Q2, Period.Q3, Period.Q4, Period.Q5,
                           Period.S1, Period.S2, Period.S3, Period.YEAR])
+
+
+@tag('unit')
+class CourseQuerySetTest(TestCase):
+    def setUp(self):
+        Course.objects.create(name='Course', course_code='1', period=Period.Q1.name,
+                              calendar_year=2018)
+
+    def test_withAllPeriods(self):
+        course = Course.objects.with_all_periods().get()
+        self.assertEqual(course.period_all, ['Q1', 'S1', 'YEAR', 'FULL_YEAR'])
+        self.assertTrue(course.falls_in(Period.S1))
+        self.assertFalse(course.falls_in(Period.Q2))
+
+    def test_withSelfAndParents(self):
+        course = Course.objects.with_self_and_parents().get()
+        self.assertEqual(course.period_parents_and_self, ['Q1', 'S1', 'YEAR', 'FULL_YEAR'])
+
+
+@tag('unit')
+class CoursesOverviewTest(TestCase):
+    def setUp(self):
+        year = Config.get_system_value('year')
+        self.bachelor = Study.objects.create(type='bachelor', name='Bachelor', slug='B')
+        master = Study.objects.create(type='master', name='Master', slug='M')
+        coordinator = Teacher.objects.create(initials='A.', first_name='Anna',
+                                             last_name='Coordinator', email='anna@example.com')
+        self.course = Course.objects.create(name='Course', course_code='1', period=Period.Q1.name,
+                                            calendar_year=year, coordinator=coordinator)
+        CourseStudy.objects.create(study=self.bachelor, course=self.course, study_year=1)
+        CourseStudy.objects.create(study=master, course=self.course, study_year=2)
+
+        user = User.objects.create_user('association')
+        association = StudyAssociation.objects.create(name='Association')
+        association.users.add(user)
+        association.studies.add(self.bachelor)
+        self.client.force_login(user)
+
+    def test_coursesAreShownForTheYearOfThisStudy(self):
+        response = self.client.get(reverse('boecie:courses.overview', args=(self.bachelor.pk,)))
+
+        self.assertEqual(response.context['periods'], [
+            {'quartile': Period.Q1, 'year': 1, 'courses': [self.course]},
+        ])
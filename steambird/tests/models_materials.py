@@ -0,0 +1,38 @@
+from django.test import tag, TestCase
+
+from steambird.models import Book, MSP, MSPLine, MSPLineType, OtherMaterial, StudyMaterialEdition
+
+
+# pylint: disable=invalid-name
+@tag('unit')
+class StudyMaterialEditionTest(TestCase):
+    def setUp(self) -> None:
+        for i in range(250):
+            OtherMaterial.objects.create(name='Reader {}'.format(i))
+        Book.objects.create(name='Book', ISBN='9780306406157', author='A. Author',
+                            year_of_publishing=2020, edition='1st')
+
+    def test_subclassesAreRetrievedOnce(self):
+        # One query for the materials, and one for each subclass.
+        with self.assertNumQueries(3):
+            materials = list(StudyMaterialEdition.objects.all())
+
+        self.assertEqual(len(materials), 251)
+        self.assertEqual(sum(isinstance(material, Book) for material in materials), 1)
+
+    def test_prefetchedSubclassesAreRetrievedOnce(self):
+        line = MSPLine.objects.create(msp=MSP.objects.create(),
+                                      type=MSPLineType.set_available_materials.name,
+                                      created_by_side='BOECIE')
+        line.materials.set(StudyMaterialEdition.objects.non_polymorphic())
+
+        with self.assertNumQueries(4):
+            line = MSPLine.objects.prefetch_related('materials').get(pk=line.pk)
+
+        self.assertEqual(len(line.materials.all()), 251)
+
+    def test_nonPolymorphicQueriesAreLeftAlone(self):
+        with self.assertNumQueries(1):
+            materials = list(StudyMaterialEdition.objects.non_polymorphic())
+
+        self.assertEqual({type(material) for material in materials}, {StudyMaterialEdition})
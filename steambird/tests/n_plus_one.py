@@ -0,0 +1,59 @@
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.test import override_settings, RequestFactory, tag, TestCase
+
+from steambird.util.n_plus_one import detect_n_plus_one, fingerprint, NPlusOneMiddleware, \
+    RepeatedQueries
+
+
+def _usernames(users):
+    return [User.objects.get(pk=user.pk).username for user in users]
+
+
+def _view(_request):
+    _usernames(User.objects.all())
+    return HttpResponse()
+
+
+@tag('unit')
+class NPlusOneTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user('user{}'.format(i)) for i in range(5)]
+
+    def test_repeatedStatementIsReportedWithCallSite(self):
+        with detect_n_plus_one(threshold=5) as repetitions:
+            _usernames(self.users)
+
+        problems = repetitions.problems()
+        self.assertEqual(len(problems), 1)
+        self.assertTrue(problems[0].startswith('5 times: SELECT'))
+        self.assertIn('at _usernames (steambird/tests/n_plus_one.py:', problems[0])
+        self.assertIn('called from NPlusOneTest.test_repeatedStatementIsReportedWithCallSite',
+                      problems[0])
+
+    def test_fewerRepetitionsAreNotReported(self):
+        with detect_n_plus_one(threshold=6) as repetitions:
+            _usernames(self.users)
+
+        self.assertEqual(repetitions.problems(), [])
+
+    def test_listsOfParametersHaveOneFingerprint(self):
+        self.assertEqual(fingerprint('SELECT 1 WHERE "a"."id" IN (%s, %s, %s)'),
+                         fingerprint('SELECT 1 WHERE "a"."id" IN (%s)'))
+        self.assertNotEqual(fingerprint('SELECT 1 WHERE "a"."id" = %s'),
+                            fingerprint('SELECT 1 WHERE "a"."id" IN (%s)'))
+
+    @override_settings(N_PLUS_ONE_ACTION='raise')
+    def test_middlewareRaises(self):
+        with self.assertRaisesMessage(RepeatedQueries, 'Repeated queries in GET /users/'):
+            NPlusOneMiddleware(_view)(RequestFactory().get('/users/'))
+
+    @override_settings(N_PLUS_ONE_ACTION='log')
+    def test_middlewareLogs(self):
+        with self.assertLogs('steambird.util.n_plus_one', 'WARNING') as logs:
+            response = NPlusOneMiddleware(_view)(RequestFactory().get('/users/'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('at _usernames', logs.output[0])
+        self.assertIn('called from _view', logs.output[0])
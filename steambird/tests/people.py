@@ -0,0 +1,236 @@
+import json
+import threading
+import time
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase, tag
+
+from steambird.boecie import api_views
+from steambird.boecie.api_views import FindPeopleView, afind_people_view
+from steambird.tests.helpers.http_server import LocalHTTPServer, Route
+from steambird.util import import_from_ut_people
+from steambird.util.http import UpstreamUnavailable, aclose_clients
+from steambird.util.import_from_ut_people import read_vcard, read_vcards, aread_vcards
+from steambird.util.query_cache import QueryCache
+
+VCARD = """BEGIN:VCARD
+VERSION:3.0
+N:Lovelace;A.A.;;;
+FN:dr. A.A. Lovelace
+END:VCARD
+"""
+
+ROUTES = {
+    '/fast/{}'.format(i): Route(VCARD, delay=0.2) for i in range(6)
+}
+ROUTES['/slow'] = Route(VCARD, delay=1)
+ROUTES['/broken'] = Route('Not a vCard')
+
+
+def _run_async(function, *args, **kwargs):
+    """
+    Runs an async function in an event loop of its own, and closes the clients it used in there.
+    """
+    async def run():
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            await aclose_clients()
+
+    return async_to_sync(run)()
+
+
+@tag('unit')
+class ReadVCardsTest(SimpleTestCase):
+    def setUp(self):
+        import_from_ut_people._vcard_cache.clear()
+
+    def test_vcardsAreFetchedConcurrently(self):
+        with LocalHTTPServer(ROUTES) as server:
+            urls = [server.url + '/fast/{}'.format(i) for i in range(6)]
+            start = time.monotonic()
+            vcards = read_vcards(urls)
+
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertTrue(all(vcards[url].n.value.family == 'Lovelace' for url in urls))
+
+    def test_deadlineGivesPartialResult(self):
+        with LocalHTTPServer(ROUTES) as server:
+            vcards = read_vcards([server.url + '/fast/0', server.url + '/slow'], deadline=0.5)
+
+            self.assertIsNotNone(vcards[server.url + '/fast/0'])
+            self.assertIsNone(vcards[server.url + '/slow'])
+
+    def test_vcardsAreCachedByUrl(self):
+        with LocalHTTPServer(ROUTES) as server:
+            read_vcard(server.url + '/fast/0')
+            read_vcard(server.url + '/fast/0')
+
+            self.assertEqual(server.hits['/fast/0'], 1)
+
+    def test_failuresAreNotCached(self):
+        with LocalHTTPServer(ROUTES) as server:
+            self.assertIsNone(read_vcard(server.url + '/broken'))
+            self.assertIsNone(read_vcard(server.url + '/broken'))
+
+            self.assertEqual(server.hits['/broken'], 2)
+
+    def test_asyncVcardsAreFetchedConcurrently(self):
+        with LocalHTTPServer(ROUTES) as server:
+            urls = [server.url + '/fast/{}'.format(i) for i in range(6)]
+            start = time.monotonic()
+            vcards = _run_async(aread_vcards, urls)
+
+        self.assertLess(time.monotonic() - start, 0.8)
+        self.assertTrue(all(vcards[url].n.value.family == 'Lovelace' for url in urls))
+
+    def test_asyncDeadlineGivesPartialResult(self):
+        with LocalHTTPServer(ROUTES) as server:
+            vcards = _run_async(aread_vcards, [server.url + '/fast/0', server.url + '/slow'],
+                                deadline=0.5)
+
+            self.assertIsNotNone(vcards[server.url + '/fast/0'])
+            self.assertIsNone(vcards[server.url + '/slow'])
+
+
+@tag('unit')
+class FindPeopleViewTest(SimpleTestCase):
+    def setUp(self):
+        import_from_ut_people._vcard_cache.clear()
+        api_views.people_cache.clear()
+
+    @staticmethod
+    def _people(server):
+        return [
+            {'type': 'person', 'name': 'Lovelace, A.A. (Ada)',
+             'vcard': server.url + '/fast/{}'.format(i)}
+            for i in range(3)
+        ] + [{'type': 'organisation', 'name': 'EEMCS', 'vcard': server.url + '/slow'}]
+
+    def _assertPeople(self, response):
+        result = json.loads(response.content)
+        self.assertEqual(len(result), 3)
+        self.assertEqual(result[0]['first_name'], 'Ada')
+        self.assertEqual(result[0]['family_name'], 'Lovelace')
+
+    def test_peopleAreCombinedWithTheirVCard(self):
+        with LocalHTTPServer(ROUTES) as server:
+            with mock.patch.object(api_views, 'search_people', return_value=self._people(server)):
+                response = FindPeopleView.as_view()(
+                    RequestFactory().get('/api/find_teacher', {'query': 'lovelace'}))
+
+            self.assertEqual(server.hits['/slow'], 0)
+
+        self._assertPeople(response)
+
+    def test_asyncPeopleAreCombinedWithTheirVCard(self):
+        with LocalHTTPServer(ROUTES) as server:
+            people = self._people(server)
+
+            async def search(_query):
+                return people
+
+            with mock.patch.object(api_views, 'asearch_people', search):
+                response = _run_async(afind_people_view,
+                                      RequestFactory().get('/api/find_teacher',
+                                                           {'query': 'lovelace'}))
+
+            self.assertEqual(server.hits['/slow'], 0)
+
+        self._assertPeople(response)
+
+
+class _Search:
+    def __init__(self, results, delay=0):
+        self.results = results
+        self.delay = delay
+        self.calls = []
+
+    def __call__(self, query):
+        self.calls.append(query)
+        time.sleep(self.delay)
+        return [result for result in self.results if query.lower() in result]
+
+
+def _contains(query, result):
+    return query in result
+
+
+@tag('unit')
+class QueryCacheTest(SimpleTestCase):
+    def test_queriesAreNormalised(self):
+        cache = QueryCache(ttl=60)
+        search = _Search(['lovelace'])
+
+        cache.get('Lovelace', search)
+        self.assertEqual(cache.get('  lovelace ', search), ['lovelace'])
+        self.assertEqual(len(search.calls), 1)
+
+    def test_resultsExpire(self):
+        cache = QueryCache(ttl=0.05)
+        search = _Search(['lovelace'])
+
+        cache.get('lovelace', search)
+        time.sleep(0.1)
+        cache.get('lovelace', search)
+        self.assertEqual(len(search.calls), 2)
+
+    def test_concurrentQueriesAreCoalesced(self):
+        cache = QueryCache(ttl=60)
+        search = _Search(['lovelace'], delay=0.2)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get('lovelace', search)))
+                   for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(search.calls), 1)
+        self.assertEqual(results, [['lovelace']] * 5)
+
+    def test_longerQueryIsFilteredFromShorterQuery(self):
+        cache = QueryCache(ttl=60, matches=_contains)
+        search = _Search(['lovelace', 'lorentz'])
+
+        cache.get('lo', search)
+        self.assertEqual(cache.get('Lov', search), ['lovelace'])
+        self.assertEqual(search.calls, ['lo'])
+
+    def test_broadQueryIsNotFiltered(self):
+        cache = QueryCache(ttl=60, matches=_contains, prefix_max_results=2)
+        search = _Search(['lovelace', 'lorentz'])
+
+        cache.get('lo', search)
+        cache.get('lov', search)
+        self.assertEqual(search.calls, ['lo', 'lov'])
+
+    def test_asyncQueriesAreCoalescedWithSyncQueries(self):
+        cache = QueryCache(ttl=60)
+        search = _Search(['lovelace'], delay=0.2)
+        results = []
+
+        async def asearch(query):
+            return search(query)
+
+        thread = threading.Thread(target=lambda: results.append(cache.get('lovelace', search)))
+        thread.start()
+        time.sleep(0.05)
+        results.append(async_to_sync(cache.aget)('lovelace', asearch))
+        thread.join()
+
+        self.assertEqual(len(search.calls), 1)
+        self.assertEqual(results, [['lovelace']] * 2)
+
+    def test_failuresAreNotCached(self):
+        cache = QueryCache(ttl=60)
+
+        def failing(_query):
+            raise UpstreamUnavailable()
+
+        with self.assertRaises(UpstreamUnavailable):
+            cache.get('lovelace', failing)
+
+        self.assertEqual(cache.get('lovelace', _Search(['lovelace'])), ['lovelace'])
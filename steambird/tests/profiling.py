@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.http import HttpResponse
+from django.template import engines
+from django.test import override_settings, RequestFactory, tag, TestCase
+
+from steambird.util.http import Upstream
+from steambird.util.profiling import current_profile, ProfilingMiddleware
+
+
+def _view(_request):
+    User.objects.count()
+    User.objects.exists()
+    with Upstream('test').guard():
+        pass
+    return HttpResponse(engines['django'].from_string('{{ value }}').render({'value': 1}))
+
+
+@tag('unit')
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/')
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_profiledRequestHasServerTiming(self):
+        with self.assertLogs('steambird.util.profiling', 'INFO') as logs:
+            response = ProfilingMiddleware(_view)(self.request)
+
+        timing = response['Server-Timing']
+        self.assertIn('sql;desc="2 queries"', timing)
+        self.assertIn('http;desc="1 calls"', timing)
+        self.assertIn('total;dur=', timing)
+        self.assertIn('template;dur=', timing)
+
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].profile['sql_count'], 2)
+        self.assertEqual(logs.records[0].status, 200)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_profileEndsWithRequest(self):
+        profiles = []
+
+        def view(_request):
+            profiles.append(current_profile())
+            return HttpResponse()
+
+        with self.assertLogs('steambird.util.profiling', 'INFO'):
+            ProfilingMiddleware(view)(self.request)
+
+        self.assertIsNotNone(profiles[0])
+        self.assertIsNone(current_profile())
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.5)
+    def test_requestsOutsideSampleAreNotProfiled(self):
+        middleware = ProfilingMiddleware(_view)
+
+        with mock.patch('steambird.util.profiling.random.random', return_value=0.7):
+            response = middleware(self.request)
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_templatesAreOnlyTimedInProfiledRequests(self):
+        template = engines['django'].from_string('{{ value }}')
+
+        with mock.patch('steambird.util.profiling.time.perf_counter') as perf_counter:
+            self.assertEqual(template.render({'value': 1}), '1')
+
+        perf_counter.assert_not_called()
@@ -0,0 +1,197 @@
+from typing import Dict, List, NamedTuple, Optional
+from unittest import mock
+from urllib.parse import quote
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import tag, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from steambird.boecie import urls as boecie_urls
+from steambird.boecie.api_views import people_cache
+from steambird.material_management import urls as material_management_urls
+from steambird.teacher import urls as teacher_urls
+from steambird.tests.helpers.fixtures import build_fixture, Fixture, PERIOD
+
+SCALES = (1, 10)
+
+URL_NAMES = {
+    '{}:{}'.format(urls.app_name, pattern.name)
+    for urls in (boecie_urls, teacher_urls, material_management_urls)
+    for pattern in urls.urlpatterns
+}
+
+# The maximum number of queries per view, at any scale, which is the number they were measured to
+#  take. These include loading the session and user, the permission check and the period in the
+#  footer. Lower a budget when a view gets cheaper; raising one needs a good reason.
+BUDGETS = {
+    'boecie:index': 6,
+    'boecie:study.list': 9,
+    'boecie:course.create': 4,
+    'boecie:course.detail': 17,
+    'boecie:courses.overview': 8,
+    'boecie:teacher.list': 5,
+    'boecie:teacher.create': 4,
+    'boecie:teacher.detail': 7,
+    'boecie:teacher.delete': 5,
+    'boecie:msp.detail': 10,
+    'boecie:msp.create': 4,
+    'boecie:coursestudy.list': 7,
+    'boecie:coursestudy.delete': 6,
+    'boecie:materials.list': 8,
+    'boecie:config': 4,
+    'boecie:lml_export': 4,
+    'boecie:lml_export POST': 12,
+    'boecie:api_find_teacher': 0,
+    'teacher:index': 3,
+    'teacher:courseview.list': 12,
+    'teacher:msp.detail': 9,
+    'material_management:isbnlookup': 2,
+    'material_management:isbn': 2,
+    'material_management:isbndetail': 3,
+    'material_management:articledetail': 3,
+    'material_management:otherdetail': 3,
+    'material_management:isbn.search': 3,
+    'material_management:doi.search': 2,
+    'material_management:material.create': 2,
+}
+
+
+class Case(NamedTuple):
+    name: str
+    user: Optional[User]
+    args: tuple = ()
+    data: Optional[dict] = None
+    method: str = 'get'
+
+    @property
+    def label(self) -> str:
+        return self.name if self.method == 'get' else '{} {}'.format(self.name, self.method.upper())
+
+
+class Measurement(NamedTuple):
+    status: int
+    queries: List[str]
+
+
+def _cases(fixture: Fixture) -> List[Case]:
+    association, boecie, teacher = \
+        fixture.association_user, fixture.superuser, fixture.teacher.user
+    study, course = fixture.study.pk, fixture.course.pk
+
+    return [
+        Case('boecie:index', association),
+        Case('boecie:study.list', association, (study,)),
+        Case('boecie:course.create', association, (study,)),
+        Case('boecie:course.detail', association, (study, course)),
+        Case('boecie:courses.overview', association, (study,)),
+        Case('boecie:teacher.list', association),
+        Case('boecie:teacher.create', association),
+        Case('boecie:teacher.detail', association, (fixture.teacher.pk,)),
+        Case('boecie:teacher.delete', association, (fixture.teacher.pk,)),
+        Case('boecie:msp.detail', association, (fixture.msp.pk,)),
+        Case('boecie:msp.create', association, (course,)),
+        Case('boecie:coursestudy.list', association),
+        Case('boecie:coursestudy.delete', boecie, (fixture.coursestudy.pk,)),
+        Case('boecie:materials.list', association),
+        Case('boecie:config', boecie, (fixture.config.pk,)),
+        Case('boecie:lml_export', association),
+        Case('boecie:lml_export', association, data={'option': 1, 'period': PERIOD},
+             method='post'),
+        Case('boecie:api_find_teacher', None, data={'query': 'teacher'}),
+        Case('teacher:index', teacher),
+        Case('teacher:courseview.list', teacher),
+        Case('teacher:msp.detail', teacher, (fixture.msp.pk,)),
+        Case('material_management:isbnlookup', association, (fixture.book.ISBN13,)),
+        Case('material_management:isbn', association),
+        Case('material_management:isbndetail', association, (fixture.book.ISBN13,)),
+        Case('material_management:articledetail', association,
+             (quote(fixture.article.DOI, safe=''),)),
+        Case('material_management:otherdetail', association, (fixture.other.pk,)),
+        Case('material_management:isbn.search', association,
+             data={'isbn': fixture.book.ISBN13}),
+        Case('material_management:doi.search', association, data={'doi': fixture.article.DOI}),
+        Case('material_management:material.create', association),
+    ]
+
+
+def _isbn_lookup(isbn):
+    return {'meta': {'ISBN-13': isbn, 'Title': 'Book', 'img': None}, 'desc': '', 'cover': None}
+
+
+def _doi_lookup(doi):
+    return {'DOI': doi, 'title': ['Article']}
+
+
+def _search_people(_query):
+    return []
+
+
+@tag('unit')
+class QueryBudgetTest(TestCase):
+    """
+    Requests every page with a small and a large fixture, to catch views of which the number of
+    queries grows with the data (N+1 queries), or exceeds its budget.
+    """
+
+    measurements: Dict[int, Dict[str, Measurement]]
+    cases: Dict[str, Case]
+
+    @classmethod
+    def setUpTestData(cls):
+        # Measured here rather than in setUpClass, so the class transaction is rolled back when a
+        #  measurement fails.
+        with mock.patch('steambird.material_management.views.isbn_lookup', _isbn_lookup), \
+                mock.patch('steambird.material_management.views.doi_lookup', _doi_lookup), \
+                mock.patch('steambird.boecie.api_views.search_people', _search_people):
+            cls.measurements = {scale: cls._measure(scale) for scale in SCALES}
+
+    @classmethod
+    def _measure(cls, scale: int) -> Dict[str, Measurement]:
+        client = cls.client_class()
+        result = {}
+
+        with transaction.atomic():
+            cls.cases = {case.label: case for case in _cases(build_fixture(scale))}
+
+            for label, case in cls.cases.items():
+                people_cache.clear()
+                if case.user is None:
+                    client.logout()
+                else:
+                    client.force_login(case.user)
+
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(client, case.method)(reverse(case.name, args=case.args),
+                                                            case.data)
+
+                result[label] = Measurement(
+                    response.status_code, [query['sql'] for query in queries.captured_queries])
+
+            transaction.set_rollback(True)
+
+        return result
+
+    def test_everyUrlHasABudget(self):
+        self.assertEqual({case.name for case in self.cases.values()}, URL_NAMES)
+        self.assertEqual(set(self.cases), set(BUDGETS))
+
+    def test_pagesAreShown(self):
+        for label, measurement in self.measurements[max(SCALES)].items():
+            with self.subTest(label):
+                self.assertEqual(measurement.status, 200)
+
+    def test_queriesStayWithinBudget(self):
+        for label, measurement in self.measurements[max(SCALES)].items():
+            with self.subTest(label):
+                self.assertLessEqual(len(measurement.queries), BUDGETS[label],
+                                     '\n'.join(measurement.queries))
+
+    def test_queriesDoNotGrowWithData(self):
+        small, large = self.measurements[min(SCALES)], self.measurements[max(SCALES)]
+
+        for label, measurement in large.items():
+            with self.subTest(label):
+                self.assertEqual(len(measurement.queries), len(small[label].queries),
+                                 '\n'.join(measurement.queries))
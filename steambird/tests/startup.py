@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase, tag
+
+from steambird.management.commands.benchmark_startup import _import_time_per_package, \
+    _start_worker
+
+
+@tag('unit')
+class StartupTest(SimpleTestCase):
+    def test_lookupLibrariesAreImportedOnFirstUse(self):
+        _duration, _stderr, modules = _start_worker(importtime=False)
+
+        # requests may be imported by other packages, so it is not checked here.
+        self.assertNotIn('isbnlib', modules)
+        self.assertNotIn('vobject', modules)
+
+    def test_importTimeIsSummedPerPackage(self):
+        stderr = 'import time: self [us] | cumulative | imported package\n' \
+                 'import time:       100 |        100 |     django.utils\n' \
+                 'import time:        50 |        150 |   django\n' \
+                 'import time:        20 |        20 | steambird\n'
+
+        self.assertEqual(_import_time_per_package(stderr), {'django': 150, 'steambird': 20})
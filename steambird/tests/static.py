@@ -0,0 +1,83 @@
+import gzip
+import os
+import tempfile
+from unittest import mock
+
+from django.core.files.storage import FileSystemStorage
+from django.template import Context, Template
+from django.test import SimpleTestCase, tag
+
+from steambird.templatetags import less_stylesheet
+from steambird.util.static import CompressedManifestStaticFilesStorage
+
+
+@tag('unit')
+class CompressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        source = tempfile.TemporaryDirectory()
+        target = tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(target.cleanup)
+
+        self.source = FileSystemStorage(location=source.name)
+        self.storage = CompressedManifestStaticFilesStorage(location=target.name,
+                                                            base_url='/static/')
+
+    def _collect(self, files):
+        for name, content in files.items():
+            os.makedirs(os.path.dirname(self.source.path(name)), exist_ok=True)
+            with open(self.source.path(name), 'w', encoding='utf-8') as file:
+                file.write(content)
+            os.makedirs(os.path.dirname(self.storage.path(name)), exist_ok=True)
+            with open(self.storage.path(name), 'w', encoding='utf-8') as file:
+                file.write(content)
+
+        return list(self.storage.post_process({name: (self.source, name) for name in files}))
+
+    def test_hashedFilesAreCompressed(self):
+        css = '.steambird { color: red; }\n' * 100
+        self._collect({'css/steambird.css': css, 'js/small.js': 'var a;'})
+
+        hashed_css = self.storage.stored_name('css/steambird.css')
+        self.assertNotEqual(hashed_css, 'css/steambird.css')
+        with gzip.open(self.storage.path(hashed_css + '.gz'), 'rt', encoding='utf-8') as file:
+            self.assertEqual(file.read(), css)
+
+        self.assertFalse(self.storage.exists(self.storage.stored_name('js/small.js') + '.gz'))
+
+    def test_filesThatReferToOtherFilesAreCompressed(self):
+        # The name of base.css changes once the name of logo.png is filled in, so the name of
+        #  steambird.css changes in a second pass.
+        css = '@import url("base.css");\n' + '.steambird { color: red; }\n' * 100
+        self._collect({'css/steambird.css': css,
+                       'css/base.css': '.base { background: url("../img/logo.png"); }',
+                       'img/logo.png': 'png'})
+
+        hashed_css = self.storage.stored_name('css/steambird.css')
+        with gzip.open(self.storage.path(hashed_css + '.gz'), 'rt', encoding='utf-8') as file:
+            self.assertIn(os.path.basename(self.storage.stored_name('css/base.css')), file.read())
+
+    def test_missingFilesFail(self):
+        self._collect({'css/steambird.css': ''})
+
+        with self.assertRaises(ValueError):
+            self.storage.url('css/other.less')
+
+
+@tag('unit')
+class LessStylesheetTest(SimpleTestCase):
+    def _render(self):
+        less_stylesheet._compiled.cache_clear()
+        self.addCleanup(less_stylesheet._compiled.cache_clear)
+        return Template('{% load less_stylesheet %}{% less_stylesheet "css/steambird.less" %}') \
+            .render(Context())
+
+    def test_compiledStylesheetIsLinked(self):
+        with mock.patch.object(less_stylesheet.finders, 'find', return_value='/steambird.css'):
+            self.assertEqual(self._render(), '<link href="/static/css/steambird.css" '
+                                             'rel="stylesheet" type="text/css">')
+
+    def test_lessIsLinkedWithoutCompiledStylesheet(self):
+        with mock.patch.object(less_stylesheet.finders, 'find', return_value=None):
+            self.assertEqual(self._render(), '<link href="/static/css/steambird.less" '
+                                             'rel="stylesheet/less" type="text/css">')
@@ -0,0 +1,98 @@
+from unittest import mock
+
+import vobject
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import tag, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from steambird.boecie.teacher_sync import sync_teachers
+from steambird.models import Teacher, AuthToken
+from steambird.util.http import UpstreamUnavailable
+
+VCARD = """BEGIN:VCARD
+VERSION:3.0
+N:{last};A.{initial}.;;;
+FN:dr. A.{initial}. {last}
+END:VCARD
+"""
+
+
+def _person(last, initial='B', email=None):
+    return {
+        'type': 'person',
+        'name': '{}, A.{}. (Ann)'.format(last, initial),
+        'email': email or '{}@utwente.nl'.format(last.lower()),
+        'vcard': VCARD.format(last=last, initial=initial),
+    }
+
+
+PEOPLE = [_person('Lovelace'), _person('Babbage', 'C'), _person('Babbage', 'D',
+                                                               'd.babbage@utwente.nl')]
+PEOPLE += [_person('Teacher{}'.format(i)) for i in range(10)]
+
+
+def _search(query):
+    if query == 'unavailable':
+        raise UpstreamUnavailable()
+    return [person for person in PEOPLE
+            if query.lower() in person['name'].lower() or query.lower() == person['email']]
+
+
+@tag('unit')
+@mock.patch('steambird.boecie.teacher_sync.search_people', _search)
+@mock.patch('steambird.boecie.teacher_sync.read_vcard', vobject.readOne)
+class SyncTeachersTest(TestCase):
+    def test_teachersAreCreatedWithUserAndToken(self):
+        report = sync_teachers(['lovelace@utwente.nl', 'd.babbage@utwente.nl'], workers=2)
+
+        self.assertEqual(sorted(report.created), ['d.babbage@utwente.nl', 'lovelace@utwente.nl'])
+        teacher = Teacher.objects.get(email='lovelace@utwente.nl')
+        self.assertEqual(teacher.last_name, 'Lovelace')
+        self.assertEqual(teacher.first_name, 'Ann')
+        self.assertTrue(AuthToken.objects.filter(user=teacher.user).exists())
+        self.assertFalse(teacher.user.has_usable_password())
+
+    def test_namesMustMatchOnePerson(self):
+        report = sync_teachers(['Lovelace', 'Babbage', 'Nobody', 'unavailable'], workers=2)
+
+        self.assertEqual(report.created, ['lovelace@utwente.nl'])
+        self.assertEqual(report.ambiguous, ['Babbage'])
+        self.assertEqual(report.not_found, ['Nobody'])
+        self.assertEqual(report.failed, ['unavailable'])
+
+    def test_existingTeachersAreMatchedByEmail(self):
+        Teacher.objects.create(initials='X.', first_name='Old', last_name='Lovelace',
+                               email='Lovelace@utwente.nl')
+
+        report = sync_teachers(['lovelace@utwente.nl'], workers=2)
+        self.assertEqual(report.updated, ['Lovelace@utwente.nl'])
+        self.assertEqual(Teacher.objects.get().first_name, 'Ann')
+
+        report = sync_teachers(['lovelace@utwente.nl'], workers=2)
+        self.assertEqual(report.unchanged, ['Lovelace@utwente.nl'])
+
+    def test_usernamesAreUnique(self):
+        User.objects.create(username='BLovelace')
+
+        sync_teachers(['lovelace@utwente.nl', 'teacher1@utwente.nl', 'teacher2@utwente.nl'],
+                      workers=2)
+
+        self.assertEqual(Teacher.objects.get(email='lovelace@utwente.nl').user.username,
+                         'BLovelace2')
+        self.assertEqual(User.objects.count(), len(set(
+            User.objects.values_list('username', flat=True))))
+
+    def test_queriesDoNotGrowWithTeachers(self):
+        with CaptureQueriesContext(connection) as few:
+            sync_teachers(['teacher{}@utwente.nl'.format(i) for i in range(2)], workers=2)
+        with CaptureQueriesContext(connection) as many:
+            sync_teachers(['teacher{}@utwente.nl'.format(i) for i in range(2, 10)], workers=2)
+
+        self.assertEqual(len(many), len(few))
+
+    def test_dryRunStoresNothing(self):
+        report = sync_teachers(['lovelace@utwente.nl'], workers=2, dry_run=True)
+
+        self.assertEqual(report.created, ['lovelace@utwente.nl'])
+        self.assertFalse(Teacher.objects.exists())
@@ -8,12 +8,13 @@ from pysidian_core.urls import urls as pysidian_core_urls
 
 from steambird import settings
 
-from steambird.views import IndexView, TokenLogin
+from steambird.views import IndexView, MetricsView, TokenLogin
 
 
 # pylint: disable=invalid-name
 urlpatterns = [
     path('select2/', include('django_select2.urls')),
+    path('admin/metrics/', MetricsView.as_view(), name='metrics'),
     path('admin/', admin.site.urls),
     path('admin',
          RedirectView.as_view(pattern_name='admin:index', permanent=False)),
@@ -1 +1,2 @@
 from .multi_form_view import MultiFormView
+from .async_view import async_login_required, sync_or_async
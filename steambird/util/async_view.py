@@ -0,0 +1,40 @@
+"""
+Async function views, for views that mostly wait for external services. Django 3.1 recognises
+async function views, and under ASGI (``SERVER_MODE=asgi``, see entrypoint.sh) serves them on the
+event loop, without tying up a thread per request.
+
+Under WSGI, Django runs every async view in an event loop of its own, so nothing that is kept per
+event loop, such as the pooled connections of :py:meth:`steambird.util.http.Upstream.aget`, would
+ever be reused. Views that have an async variant therefore also have a sync one, and
+:py:func:`sync_or_async` picks the one that fits the server.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+
+
+def async_login_required(view):
+    """
+    login_required for async function views. The user is loaded from the session in a thread, as
+    that uses the database.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if not await sync_to_async(lambda: request.user.is_authenticated)():
+            return redirect_to_login(request.get_full_path())
+
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def sync_or_async(sync_view, async_view):
+    """
+    :param sync_view: The view to serve under WSGI
+    :param async_view: The async variant of that view, to serve under ASGI
+    :return: async_view if the ``ASYNC_VIEWS`` setting is on, sync_view otherwise
+    """
+    return async_view if settings.ASYNC_VIEWS else sync_view
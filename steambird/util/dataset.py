@@ -0,0 +1,366 @@
+"""
+Generation of a synthetic, production-shaped data set, for load tests, benchmarks and query budget
+tests. Every unit of scale adds a bachelor, a master and a premaster study with an association,
+teachers, materials and several calendar years of courses, including modules with sub-courses, and
+MSPs with histories of multiple lines. The same scale and seed always give the same data set.
+"""
+import datetime
+import logging
+import random
+from dataclasses import dataclass
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from steambird.cache import COURSES, ROLES
+from steambird.models import Book, Config, Course, CourseStudy, MSP, MSPLine, MSPLineType, \
+    OtherMaterial, ScientificArticle, Study, StudyAssociation, StudyMaterialEdition, Teacher
+from steambird.models.coursetree import Period, StudyType
+
+
+LOGGER = logging.getLogger(__name__)
+
+YEARS = 3
+TEACHERS_PER_STUDY = 10
+COURSES_PER_STUDY = 12
+MODULE_SIZE = 3
+BOOKS_PER_STUDY = 12
+ARTICLES_PER_STUDY = 6
+OTHERS_PER_STUDY = 2
+SHARED_COURSES = 0.1
+BATCH_SIZE = 1000
+
+STUDY_YEARS = {
+    StudyType.bachelor: (1, 2, 3),
+    StudyType.master: (1, 2),
+    StudyType.premaster: (1,),
+}
+
+PERIOD_WEIGHTS = {
+    Period.Q1: 4,
+    Period.Q2: 4,
+    Period.Q3: 4,
+    Period.Q4: 4,
+    Period.S1: 1,
+    Period.S2: 1,
+    Period.YEAR: 1,
+}
+
+# The MSP process: the teacher requests a material, the association offers the available ones,
+#  and the teacher approves one of them.
+LINE_FLOW = (
+    (MSPLineType.request_material, 'TEACHER'),
+    (MSPLineType.set_available_materials, 'BOECIE'),
+    (MSPLineType.approve_material, 'TEACHER'),
+)
+
+
+@dataclass
+class DatasetReport:
+    """
+    Numbers of generated objects
+    """
+    studies: int = 0
+    teachers: int = 0
+    materials: int = 0
+    courses: int = 0
+    course_studies: int = 0
+    msps: int = 0
+    msp_lines: int = 0
+
+
+class _Group(NamedTuple):
+    """
+    A module with its sub-courses, or a single course
+    """
+    study: Study
+    study_year: int
+    courses: List[Course]
+
+
+def isbn13(number: int) -> str:
+    """
+    Creates a valid ISBN 13 from a number.
+
+    :param number: Number below 10^9
+    :return: ISBN 13 with a correct check digit
+    """
+    digits = '978{:09d}'.format(number)
+    check = -sum(int(digit) * (3 if i % 2 else 1) for i, digit in enumerate(digits)) % 10
+    return digits + str(check)
+
+
+class _Generator:
+    """
+    Creates the data set in stages, every stage with a few bulk inserts. All randomness comes from
+    a single generator that is used in a fixed order, which makes the data set reproducible.
+    """
+
+    def __init__(self, scale: int, seed: int, year: int):
+        self.rng = random.Random(seed)
+        self.scale = scale
+        self.seed = seed
+        self.year = year
+        self.report = DatasetReport()
+
+        self.studies: List[Study] = []
+        self.teachers: Dict[int, List[Teacher]] = {}
+        self.association_users: Dict[int, User] = {}
+        self.materials: Dict[int, List[StudyMaterialEdition]] = {}
+        self.groups: List[_Group] = []
+
+    def _name(self, kind: str, number: int) -> str:
+        # Unique per seed, so data sets with different seeds can be generated in one database.
+        return 'ds{}-{}{}'.format(self.seed, kind, number)
+
+    def create_studies(self):
+        self.studies = Study.objects.bulk_create([
+            Study(type=study_type.name, slug=self._name('s', len(StudyType) * unit + i),
+                  name='{} study {}'.format(study_type.value.capitalize(), unit))
+            for unit in range(self.scale)
+            for i, study_type in enumerate(StudyType)
+        ])
+        self.report.studies = len(self.studies)
+
+        associations = StudyAssociation.objects.bulk_create([
+            StudyAssociation(name='Association {}'.format(unit)) for unit in range(self.scale)
+        ])
+        users = User.objects.bulk_create([
+            User(username=self._name('association', unit), password=make_password(None))
+            for unit in range(self.scale)
+        ])
+        StudyAssociation.users.through.objects.bulk_create([
+            StudyAssociation.users.through(studyassociation=association, user=user)
+            for association, user in zip(associations, users)
+        ])
+        StudyAssociation.studies.through.objects.bulk_create([
+            StudyAssociation.studies.through(
+                studyassociation=associations[i // len(StudyType)], study=study)
+            for i, study in enumerate(self.studies)
+        ], batch_size=BATCH_SIZE)
+
+        for i, study in enumerate(self.studies):
+            self.association_users[study.pk] = users[i // len(StudyType)]
+
+    def create_teachers(self):
+        count = len(self.studies) * TEACHERS_PER_STUDY
+        users = User.objects.bulk_create([
+            User(username=self._name('teacher', i), password=make_password(None))
+            for i in range(count)
+        ], batch_size=BATCH_SIZE)
+        teachers = Teacher.objects.bulk_create([
+            Teacher(initials='{}.'.format(chr(ord('A') + i % 26)), first_name='Teacher',
+                    last_name='Number {}'.format(i), user=user,
+                    email='{}@example.com'.format(self._name('teacher', i)))
+            for i, user in enumerate(users)
+        ], batch_size=BATCH_SIZE)
+        self.report.teachers = len(teachers)
+
+        for i, study in enumerate(self.studies):
+            self.teachers[study.pk] = \
+                teachers[i * TEACHERS_PER_STUDY:(i + 1) * TEACHERS_PER_STUDY]
+
+    def create_materials(self):
+        number = 0
+
+        for study in self.studies:
+            materials = []
+            for _ in range(BOOKS_PER_STUDY):
+                materials.append(Book(
+                    name='Book {}'.format(number),
+                    ISBN=isbn13(self.seed % 1000 * 10 ** 6 + number),
+                    author='A. Author, B. Author',
+                    year_of_publishing=self.year - self.rng.randint(0, 20),
+                    edition='{}th'.format(self.rng.randint(4, 9))))
+                number += 1
+            for _ in range(ARTICLES_PER_STUDY):
+                materials.append(ScientificArticle(
+                    name='Article {}'.format(number),
+                    DOI='10.5555/{}'.format(self._name('article', number)),
+                    author='A. Author',
+                    year_of_publishing=self.year - self.rng.randint(0, 20)))
+                number += 1
+            for _ in range(OTHERS_PER_STUDY):
+                materials.append(OtherMaterial(name='Reader {}'.format(number)))
+                number += 1
+            self.materials[study.pk] = materials
+
+        # Multi-table inherited models can not be bulk created, so they are saved one by one, in
+        #  the transaction of the whole data set.
+        for materials in self.materials.values():
+            for material in materials:
+                material.save()
+        self.report.materials = number
+
+    def _course(self, study: Study, year: int, period: Period) -> Course:
+        number = self.report.courses
+        self.report.courses += 1
+        updated = year < self.year or self.rng.random() < 0.5
+
+        return Course(
+            name='Course {}'.format(number),
+            course_code=self._name('c', number),
+            period=period.name,
+            calendar_year=year,
+            coordinator=self.rng.choice(self.teachers[study.pk]),
+            updated_associations=updated,
+            updated_teacher=updated and (year < self.year or self.rng.random() < 0.5),
+        )
+
+    def create_courses(self):
+        periods, weights = list(PERIOD_WEIGHTS), list(PERIOD_WEIGHTS.values())
+
+        for year in range(self.year - YEARS + 1, self.year + 1):
+            for study in self.studies:
+                study_type = StudyType[study.type]
+                count = 0
+                while count < COURSES_PER_STUDY:
+                    period = self.rng.choices(periods, weights)[0]
+                    # Bachelor quartiles are modules, which consist of a few sub-courses.
+                    size = 1 + (MODULE_SIZE if study_type == StudyType.bachelor and
+                                period.is_quartile() else 0)
+                    self.groups.append(_Group(
+                        study, self.rng.choice(STUDY_YEARS[study_type]),
+                        [self._course(study, year, period) for _ in range(size)]))
+                    count += size
+
+        Course.objects.bulk_create(
+            [course for group in self.groups for course in group.courses],
+            batch_size=BATCH_SIZE)
+
+        links = []
+        for group in self.groups:
+            links.extend(CourseStudy(study=group.study, course=course,
+                                     study_year=group.study_year)
+                         for course in group.courses)
+            other = self.rng.choice(self.studies)
+            if self.rng.random() < SHARED_COURSES and other != group.study:
+                links.extend(CourseStudy(study=other, course=course, study_year=1)
+                             for course in group.courses)
+        CourseStudy.objects.bulk_create(links, batch_size=BATCH_SIZE)
+        self.report.course_studies = len(links)
+
+        Course.sub_courses.through.objects.bulk_create([
+            Course.sub_courses.through(from_course=group.courses[0], to_course=course)
+            for group in self.groups
+            for course in group.courses[1:]
+        ], batch_size=BATCH_SIZE)
+        Course.teachers.through.objects.bulk_create([
+            Course.teachers.through(course=course, teacher=teacher)
+            for group in self.groups
+            for course in group.courses
+            for teacher in self.rng.sample(self.teachers[group.study.pk], self.rng.randint(1, 3))
+        ], batch_size=BATCH_SIZE)
+
+    def _history(self, group: _Group, course: Course) -> List[tuple]:
+        """
+        Decides the lines of a new MSP, as (type, side, time, materials) tuples. MSPs of past years
+        are resolved, MSPs of the current year may still be in progress.
+        """
+        count = len(LINE_FLOW) if course.calendar_year < self.year \
+            else self.rng.randint(1, len(LINE_FLOW))
+        time = datetime.datetime(course.calendar_year - 1, 12, 1, tzinfo=timezone.utc) + \
+            datetime.timedelta(days=self.rng.randint(0, 60))
+        offered = self.rng.sample(self.materials[group.study.pk], self.rng.randint(1, 3))
+
+        history = []
+        for line_type, side in LINE_FLOW[:count]:
+            time += datetime.timedelta(days=self.rng.randint(1, 21),
+                                       seconds=self.rng.randint(0, 24 * 3600 - 1))
+            if line_type == MSPLineType.request_material:
+                materials = offered[:1]
+            elif line_type == MSPLineType.set_available_materials:
+                materials = offered
+            else:
+                materials = [self.rng.choice(offered)]
+            history.append((line_type, side, time, materials))
+
+        return history
+
+    def create_msps(self):
+        planned = [
+            (group, course, self.rng.random() < 0.8, self._history(group, course))
+            for group in self.groups
+            for course in group.courses
+            for _ in range(self.rng.choice((0, 1, 1, 2)))
+        ]
+
+        msps = MSP.objects.bulk_create([MSP(mandatory=mandatory)
+                                        for _group, _course, mandatory, _history in planned],
+                                       batch_size=BATCH_SIZE)
+        self.report.msps = len(msps)
+
+        Course.materials.through.objects.bulk_create([
+            Course.materials.through(course=course, msp=msp)
+            for msp, (_group, course, _mandatory, _history) in zip(msps, planned)
+        ], batch_size=BATCH_SIZE)
+        MSP.teachers.through.objects.bulk_create([
+            MSP.teachers.through(msp=msp, teacher=course.coordinator)
+            for msp, (_group, course, _mandatory, _history) in zip(msps, planned)
+        ], batch_size=BATCH_SIZE)
+
+        self._create_msp_lines(msps, planned)
+
+    def _plan_lines(self, msps: List[MSP], planned: List[tuple]) -> List[tuple]:
+        """
+        :return: A new line for every line of the history that was planned for the MSPs, as
+            (line, time, materials) tuples
+        """
+        result = []
+        for msp, (group, course, _mandatory, history) in zip(msps, planned):
+            for line_type, side, time, materials in history:
+                result.append((MSPLine(
+                    msp=msp, type=line_type.name, created_by_side=side,
+                    created_by=course.coordinator.user if side == 'TEACHER'
+                    else self.association_users[group.study.pk]), time, materials))
+        return result
+
+    def _create_msp_lines(self, msps: List[MSP], planned: List[tuple]):
+        planned_lines = self._plan_lines(msps, planned)
+        lines = [line for line, _time, _materials in planned_lines]
+
+        MSPLine.objects.bulk_create(lines, batch_size=BATCH_SIZE)
+        # The time is set on creation, so the history is written afterwards.
+        for line, time, _materials in planned_lines:
+            line.time = time
+        MSPLine.objects.bulk_update(lines, ['time'], batch_size=BATCH_SIZE)
+        self.report.msp_lines = len(lines)
+
+        MSPLine.materials.through.objects.bulk_create([
+            MSPLine.materials.through(mspline=line, studymaterialedition=material)
+            for line, _time, materials in planned_lines
+            for material in materials
+        ], batch_size=BATCH_SIZE)
+
+
+def _log_progress(message: str) -> None:
+    LOGGER.info('%s', message)
+
+
+def generate_dataset(scale: int = 1, seed: int = 0, year: Optional[int] = None,
+                     progress: Callable[[str], None] = _log_progress) -> DatasetReport:
+    """
+    Generates a data set in a single transaction. A data set with the same seed can only be
+    generated once per database, as names, e-mail addresses, ISBNs and DOIs are unique per seed.
+
+    :param scale: Number of associations, each with a bachelor, master and premaster study
+    :param seed: Seed of the random choices
+    :param year: The last calendar year with courses, the configured year by default
+    :param progress: Called with progress messages, which are logged by default
+    :return: A report with the numbers of generated objects
+    """
+    generator = _Generator(scale, seed, year or Config.get_system_value('year'))
+
+    with transaction.atomic():
+        for stage in ('studies', 'teachers', 'materials', 'courses', 'msps'):
+            getattr(generator, 'create_{}'.format(stage))()
+            progress('Created {}'.format(stage))
+
+        # Bulk creates do not send the signals that invalidate cached values.
+        COURSES.bump()
+        ROLES.bump()
+
+    return generator.report
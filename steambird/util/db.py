@@ -0,0 +1,68 @@
+"""
+Health checks of persistent database connections.
+
+With ``CONN_MAX_AGE`` (``DB_CONN_MAX_AGE`` in settings_production), a worker keeps its database
+connection between requests, instead of connecting and authenticating for every request. A kept
+connection may have been closed on the other side in the meantime, for example by a restart of
+Postgres or pgbouncer, which Django only notices when a query of the next request fails. So at the
+start of a request, a kept connection that has been idle for ``DB_HEALTH_CHECK_IDLE`` seconds or
+more is checked first, and closed if it is not usable, so the request opens a new one. Connections
+that are in use all the time are not checked, and cost nothing extra.
+
+The connections are counted in ``steambird_db_connections_total`` (see
+:py:mod:`steambird.util.metrics`), per database and event: ``opened``, ``reused`` (after a check, if
+any) and ``unusable``. The ratio of reused to opened connections shows how well they are kept.
+"""
+import time
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from steambird.util.metrics import DB_CONNECTIONS, record
+
+
+# Connection -> time.monotonic() at the end of the last request that used it.
+_last_used: WeakKeyDictionary = WeakKeyDictionary()
+
+
+@receiver(connection_created)
+def _connection_opened(connection, **_kwargs) -> None:
+    record(DB_CONNECTIONS, database=connection.alias, event='opened')
+
+
+# Receivers of request_started and request_finished are connected after Django's
+#  close_old_connections, so they run after it.
+@receiver(request_started, dispatch_uid='steambird-check-connections')
+def check_connections(**_kwargs) -> None:
+    """
+    Closes the kept connections of this thread that have been idle for ``DB_HEALTH_CHECK_IDLE``
+    seconds or more, and are not usable. Connections in a transaction are left alone. Runs at
+    the start of every request, after Django closed the connections that are too old; long-running
+    commands should call it between units of work.
+    """
+    idle = getattr(settings, 'DB_HEALTH_CHECK_IDLE', 30)
+    now = time.monotonic()
+
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+
+        last_used = _last_used.get(connection)
+        if idle is not None and (last_used is None or now - last_used >= idle) \
+                and not connection.is_usable():
+            record(DB_CONNECTIONS, database=connection.alias, event='unusable')
+            connection.close()
+        else:
+            record(DB_CONNECTIONS, database=connection.alias, event='reused')
+
+
+@receiver(request_finished, dispatch_uid='steambird-mark-connections-used')
+def _mark_used(**_kwargs) -> None:
+    now = time.monotonic()
+    for connection in connections.all():
+        if connection.connection is not None:
+            _last_used[connection] = now
@@ -0,0 +1,313 @@
+"""
+Shared layer for all outbound HTTP calls. Every external service ("upstream") gets:
+
+- default connect and read timeouts,
+- a pooled :py:class:`requests.Session`, so connections are kept alive,
+- a circuit breaker, which stops calling an upstream for a while after repeated failures,
+- a concurrency cap (bulkhead), so a slow upstream can not occupy all workers.
+
+Async views use the same upstreams through :py:meth:`Upstream.aget`, which uses a pooled
+``httpx.AsyncClient`` per event loop, and a concurrency cap per event loop. Under ASGI a worker has
+a single event loop, and its clients are closed by :py:func:`aclose_clients` when the worker shuts
+down. requests and httpx are imported on first use, so they do not slow down the start of every
+worker.
+
+When an upstream can not be used, :py:class:`UpstreamUnavailable` is raised immediately, so only
+the views that depend on that upstream degrade. Upstreams are configured with the
+``OUTBOUND_HTTP`` setting.
+"""
+import asyncio
+import logging
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+from typing import Callable, Dict, Optional, TYPE_CHECKING
+from weakref import WeakKeyDictionary
+
+from django.conf import settings
+
+from steambird.util.profiling import outbound_call
+
+if TYPE_CHECKING:
+    import requests
+
+
+LOGGER = logging.getLogger(__name__)
+
+USER_AGENT = 'steambird/0.1 (+https://github.com/StichtingIAPC/SteamBird)'
+
+
+class UpstreamUnavailable(Exception):
+    """
+    Raised when an upstream failed, timed out, or is not called because its circuit is open or
+    its concurrency cap is reached.
+    """
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures. While open, calls are refused; after
+    `reset_timeout` seconds a single trial call is let through, which closes the circuit again if
+    it succeeds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self.trial and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.trial = True
+                return True
+            return False
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self.trial = False
+
+
+class Upstream:
+    """
+    An external service, with its own session, timeouts, circuit breaker and concurrency cap.
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, name: str, connect_timeout: float = 3.05, read_timeout: float = 5,
+                 max_concurrency: int = 4, failure_threshold: int = 5,
+                 reset_timeout: float = 30):
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_concurrency = max_concurrency
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._session: Optional['requests.Session'] = None
+        self._session_lock = threading.Lock()
+        self._async_clients = WeakKeyDictionary()
+        self._async_slots = WeakKeyDictionary()
+
+    @property
+    def session(self) -> 'requests.Session':
+        # pylint: disable=import-outside-toplevel, redefined-outer-name
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                session.headers['User-Agent'] = USER_AGENT
+                self._session = session
+            return self._session
+
+    def _async_client(self):
+        """
+        The httpx.AsyncClient of the running event loop, as a client can not be shared between
+        event loops.
+        """
+        # pylint: disable=import-outside-toplevel
+        import httpx
+
+        loop = asyncio.get_event_loop()
+        client = self._async_clients.get(loop)
+
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout[1], connect=self.timeout[0]),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+                headers={'User-Agent': USER_AGENT},
+            )
+            self._async_clients[loop] = client
+
+        return client
+
+    async def aclose(self) -> None:
+        """
+        Closes the httpx.AsyncClient of the running event loop, if it has one.
+        """
+        client = self._async_clients.pop(asyncio.get_event_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def _async_semaphore(self) -> asyncio.Semaphore:
+        """
+        The concurrency cap of the running event loop. An asyncio.Semaphore belongs to the event
+        loop it was made in.
+        """
+        loop = asyncio.get_event_loop()
+        slots = self._async_slots.get(loop)
+
+        if slots is None:
+            slots = asyncio.Semaphore(self.max_concurrency)
+            self._async_slots[loop] = slots
+
+        return slots
+
+    def _enter(self, release: Callable[[], None]) -> None:
+        """
+        Asks the circuit breaker for permission, once a slot is taken. Asking first would waste
+        the single trial call of a half-open circuit when there is no slot.
+
+        :param release: Gives the slot back
+        """
+        if not self.breaker.allow():
+            release()
+            raise UpstreamUnavailable('Circuit of {} is open'.format(self.name))
+
+    @contextmanager
+    def _track(self, release: Callable[[], None], ignore=()):
+        try:
+            with outbound_call():
+                yield
+        except ignore:
+            self.breaker.success()
+            raise
+        except Exception as error:
+            # A cancelled call (an Exception before Python 3.8) is no longer waited for, which
+            #  says nothing about the upstream.
+            if not isinstance(error, asyncio.CancelledError):
+                self.breaker.failure()
+            raise
+        else:
+            self.breaker.success()
+        finally:
+            release()
+
+    @contextmanager
+    def guard(self, ignore=()):
+        """
+        Wraps a call to this upstream, for calls that do not go through :py:meth:`request`, such
+        as calls made by third party libraries.
+
+        :param ignore: Exception types that are an answer of the upstream, rather than a failure.
+            Any other exception counts as a failure.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise UpstreamUnavailable('Too many concurrent calls to {}'.format(self.name))
+        self._enter(self._slots.release)
+
+        with self._track(self._slots.release, ignore):
+            yield
+
+    def request(self, method: str, url: str, **kwargs) -> 'requests.Response':
+        """
+        Performs a request. Connection errors, timeouts and 5xx responses count as failures and
+        are raised as UpstreamUnavailable; other responses are returned as is.
+        """
+        # pylint: disable=import-outside-toplevel, redefined-outer-name
+        import requests
+
+        kwargs.setdefault('timeout', self.timeout)
+
+        with self.guard():
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except requests.RequestException as error:
+                LOGGER.warning('Request to %s failed: %r', self.name, error)
+                raise UpstreamUnavailable('{} did not respond'.format(self.name)) from error
+
+            if response.status_code >= 500:
+                raise UpstreamUnavailable('{} responded with {}'.format(
+                    self.name, response.status_code))
+
+        return response
+
+    def get(self, url: str, **kwargs) -> 'requests.Response':
+        return self.request('GET', url, **kwargs)
+
+    @asynccontextmanager
+    async def aguard(self):
+        """
+        Like :py:meth:`guard`, but waits up to the connect timeout for a free slot instead of
+        failing immediately, as an event loop serves many more requests at once than a worker.
+        """
+        slots = self._async_semaphore()
+        try:
+            await asyncio.wait_for(slots.acquire(), self.timeout[0])
+        except asyncio.TimeoutError as error:
+            raise UpstreamUnavailable('Too many concurrent calls to {}'.format(self.name)) \
+                from error
+        self._enter(slots.release)
+
+        with self._track(slots.release):
+            yield
+
+    async def arequest(self, method: str, url: str, **kwargs):
+        """
+        Async version of :py:meth:`request`, which returns an httpx.Response.
+        """
+        # pylint: disable=import-outside-toplevel
+        import httpx
+
+        async with self.aguard():
+            try:
+                client = self._async_client()
+                response = await client.request(method, url, **kwargs)
+            except httpx.HTTPError as error:
+                LOGGER.warning('Request to %s failed: %r', self.name, error)
+                raise UpstreamUnavailable('{} did not respond'.format(self.name)) from error
+
+            if response.status_code >= 500:
+                raise UpstreamUnavailable('{} responded with {}'.format(
+                    self.name, response.status_code))
+
+        return response
+
+    async def aget(self, url: str, **kwargs):
+        return await self.arequest('GET', url, **kwargs)
+
+
+_upstreams: Dict[str, Upstream] = {}
+_upstreams_lock = threading.Lock()
+
+
+def get_upstream(name: str) -> Upstream:
+    """
+    Returns the upstream with the given name, configured from ``OUTBOUND_HTTP[name]`` on top of
+    ``OUTBOUND_HTTP['default']``.
+
+    :param name: Name of the upstream
+    :return: The (shared) upstream
+    """
+    with _upstreams_lock:
+        if name not in _upstreams:
+            config = getattr(settings, 'OUTBOUND_HTTP', {})
+            _upstreams[name] = Upstream(name, **{
+                **config.get('default', {}),
+                **config.get(name, {}),
+            })
+        return _upstreams[name]
+
+
+async def aclose_clients() -> None:
+    """
+    Closes the httpx.AsyncClients of all upstreams in the running event loop, see
+    :py:mod:`steambird.asgi`.
+    """
+    with _upstreams_lock:
+        upstreams = list(_upstreams.values())
+
+    for upstream in upstreams:
+        await upstream.aclose()
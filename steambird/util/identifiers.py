@@ -0,0 +1,46 @@
+"""
+Normalisation of identifiers of study materials, so that the different ways in which the same
+identifier can be written compare equal.
+"""
+from typing import Optional
+
+
+DOI_PREFIXES = ('https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/',
+                'http://dx.doi.org/', 'doi:')
+
+
+def normalise_isbn(isbn: str) -> Optional[str]:
+    """
+    Normalises an ISBN to its ISBN-13 form, without dashes.
+
+    :param isbn: ISBN-10 or ISBN-13, possibly with dashes
+    :return: The ISBN-13, or None if the ISBN is not valid
+    """
+    # isbnlib is imported on first use, as it slows down the start of every worker.
+    # pylint: disable=import-outside-toplevel
+    import isbnlib
+
+    canonical = isbnlib.canonical(isbn or '')
+
+    if isbnlib.is_isbn13(canonical):
+        return canonical
+    if isbnlib.is_isbn10(canonical):
+        return isbnlib.to_isbn13(canonical)
+    return None
+
+
+def normalise_doi(doi: str) -> str:
+    """
+    Normalises a DOI. DOI's are case insensitive, and are often given as URL.
+
+    :param doi: The DOI, optionally as doi.org URL
+    :return: The bare, lower case DOI
+    """
+    doi = doi.strip()
+
+    for prefix in DOI_PREFIXES:
+        if doi.lower().startswith(prefix):
+            doi = doi[len(prefix):]
+            break
+
+    return doi.lower()
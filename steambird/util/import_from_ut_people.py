@@ -1,25 +1,234 @@
-from typing import Union
+import asyncio
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextvars import copy_context
+from typing import Dict, Iterable, Optional, Tuple, TYPE_CHECKING, Union
 from urllib.parse import quote
 
-import requests
-import vobject
-from vobject.base import Component
+from django.conf import settings
 
+from steambird.util.http import get_upstream
+from steambird.util.metrics import lookup_timer
+
+if TYPE_CHECKING:
+    from vobject.base import Component
+
+
+# Shared by all requests, so the number of outstanding vCard requests stays bounded.
+_vcard_executor = ThreadPoolExecutor(max_workers=settings.PEOPLE_VCARD_WORKERS,
+                                     thread_name_prefix='vcard')
+
+# vCard URL -> (time of retrieval, parsed vCard), least recently used first.
+_vcard_cache: 'OrderedDict[str, Tuple[float, Component]]' = OrderedDict()
+_vcard_cache_lock = threading.Lock()
+
+
+def _get_first_name(name):
+    search = re.search(r"\(([^\\]*)\)", name)
+
+    return None if search is None else search.group(1)
+
+
+def _get_surname_prefix(full_name, family_name):
+    search = re.search(r"\.([^.]*)$", full_name)
+
+    return None if search is None else search.group(1)[1:-(len(family_name) + 3)]
+
+
+def _get_initials(given_name):
+    search = re.search(r"^.*\.", given_name)
+
+    return None if search is None else search.group(0)[1:]
+
+
+def _get_acedemic_title(full_name, initials):
+    return full_name.split(initials)[0][:-1]
+
+
+def describe_person(person: dict, vcard: Optional['Component']) -> dict:
+    """
+    Combines a result of the people search with the details from its vCard, in the fields of a
+    Teacher.
+
+    :param person: A result of :py:func:`search_people`
+    :param vcard: Its vCard, if it could be retrieved
+    :return: The person, with first_name, and if there is a vCard, surname_prefix, family_name,
+        initials and acedemic_title
+    """
+    result = {
+        **person,
+        'first_name': _get_first_name(person['name']),
+    }
+
+    if vcard is not None:
+        initials = _get_initials(vcard.n.value.given)
+        result = {
+            **result,
+            'surname_prefix': _get_surname_prefix(str(vcard.n.value), vcard.n.value.family),
+            'family_name': vcard.n.value.family,
+            'initials': initials,
+            'acedemic_title': _get_acedemic_title(vcard.fn.value, initials)
+        }
+
+    return result
+
+
+def _cached_vcard(vcard_url) -> Optional['Component']:
+    with _vcard_cache_lock:
+        entry = _vcard_cache.get(vcard_url)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > settings.PEOPLE_VCARD_CACHE_TTL:
+            del _vcard_cache[vcard_url]
+            return None
+        _vcard_cache.move_to_end(vcard_url)
+        return entry[1]
+
+
+def _cache_vcard(vcard_url, vcard: 'Component') -> None:
+    with _vcard_cache_lock:
+        _vcard_cache[vcard_url] = (time.monotonic(), vcard)
+        _vcard_cache.move_to_end(vcard_url)
+        while len(_vcard_cache) > settings.PEOPLE_VCARD_CACHE_SIZE:
+            _vcard_cache.popitem(last=False)
+
+
+def _parse_vcard(text: str) -> 'Component':
+    # vobject is imported when the first vCard is parsed, as it slows down the start of every
+    #  worker.
+    # pylint: disable=import-outside-toplevel
+    import vobject
+
+    return vobject.readOne(text)
+
+
+def read_vcard(vcard_url) -> Union['Component', None]:
+    """
+    Retrieves and parses a vCard. Parsed vCards are cached by URL; failures are not cached.
+
+    :param vcard_url: URL of the vCard
+    :return: The vCard, or None if it could not be retrieved or parsed
+    """
+    vcard = _cached_vcard(vcard_url)
+    if vcard is not None:
+        return vcard
+
+    try:
+        vcard = _parse_vcard(get_upstream('people').get(vcard_url).text)
+    # pylint: disable=bare-except
+    except:
+        return None
+
+    _cache_vcard(vcard_url, vcard)
+    return vcard
+
+
+def read_vcards(vcard_urls: Iterable[str],
+                deadline: Optional[float] = None) -> Dict[str, Optional['Component']]:
+    """
+    Retrieves vCards concurrently. vCards that are not retrieved before the deadline are left
+    out, so a slow people.utwente.nl gives partial results instead of a slow response.
+
+    :param vcard_urls: URLs of the vCards
+    :param deadline: Seconds to wait for all vCards, PEOPLE_VCARD_DEADLINE by default
+    :return: Dict of URL -> vCard, or None if it could not be retrieved in time
+    """
+    if deadline is None:
+        deadline = settings.PEOPLE_VCARD_DEADLINE
+
+    # Run in the context of the request, so the calls are part of its profile.
+    futures = {url: _vcard_executor.submit(copy_context().run, read_vcard, url)
+               for url in set(vcard_urls)}
+    wait(futures.values(), timeout=deadline)
+
+    result = {}
+    for url, future in futures.items():
+        if future.done():
+            result[url] = future.result()
+        else:
+            future.cancel()
+            result[url] = None
+
+    return result
+
+
+async def aread_vcard(vcard_url) -> Union['Component', None]:
+    """
+    Async version of :py:func:`read_vcard`.
+    """
+    vcard = _cached_vcard(vcard_url)
+    if vcard is not None:
+        return vcard
 
-def read_vcard(vcard_url) -> Union[Component, None]:
     try:
-        vcard = requests.get(vcard_url).text
-        return vobject.readOne(vcard)
+        vcard = _parse_vcard((await get_upstream('people').aget(vcard_url)).text)
+    except asyncio.CancelledError:
+        raise
     # pylint: disable=bare-except
     except:
         return None
 
+    _cache_vcard(vcard_url, vcard)
+    return vcard
 
+
+async def aread_vcards(vcard_urls: Iterable[str],
+                       deadline: Optional[float] = None) -> Dict[str, Optional['Component']]:
+    """
+    Async version of :py:func:`read_vcards`.
+    """
+    if deadline is None:
+        deadline = settings.PEOPLE_VCARD_DEADLINE
+
+    tasks = {url: asyncio.ensure_future(aread_vcard(url)) for url in set(vcard_urls)}
+    if tasks:
+        await asyncio.wait(tasks.values(), timeout=deadline)
+
+    result = {}
+    for url, task in tasks.items():
+        if task.done():
+            result[url] = task.result()
+        else:
+            task.cancel()
+            result[url] = None
+
+    return result
+
+
+def _search_url(search_query) -> str:
+    return "https://people.utwente.nl/data/search?query={}".format(quote(search_query))
+
+
+SEARCH_HEADERS = {
+    'Accept': 'application/json',
+    'Referer': 'https://people.utwente.nl/',
+}
+
+
+@lookup_timer('people')
 def search_people(search_query):
-    url = "https://people.utwente.nl/data/search?query={}".format(quote(search_query))
-    people = requests.get(url, headers={
-        'Accept': 'application/json',
-        'Referer': 'https://people.utwente.nl/',
-    }).json()['data']
+    """
+    Searches people.utwente.nl.
+
+    :param search_query: Name or e-mail address to search for
+    :return: The people found
+    :raises steambird.util.http.UpstreamUnavailable: When the people search is unavailable
+    """
+    people = get_upstream('people').get(_search_url(search_query),
+                                        headers=SEARCH_HEADERS).json()['data']
 
     return people
+
+
+async def asearch_people(search_query):
+    """
+    Async version of :py:func:`search_people`.
+    """
+    with lookup_timer('people'):
+        response = await get_upstream('people').aget(_search_url(search_query),
+                                                     headers=SEARCH_HEADERS)
+
+    return response.json()['data']
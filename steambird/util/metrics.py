@@ -0,0 +1,322 @@
+"""
+Metrics of the running site, exposed in the Prometheus text format by
+:py:class:`steambird.views.MetricsView`.
+
+Every process records its metrics in memory. When ``METRICS_DIR`` is set, a background thread
+writes them to a file per process in that directory every ``METRICS_FLUSH_INTERVAL`` seconds (and
+when the process exits), and the metrics of all processes are summed when they are exposed. This
+way the metrics of all uWSGI workers and management commands are combined, no matter which worker
+is scraped. Files of processes that are gone are kept, so counters do not go down when a worker is
+replaced; the directory should be emptied when the site is (re)started.
+
+Histograms have cumulative ``_bucket`` series, so quantiles can be calculated with Prometheus'
+``histogram_quantile``, for example the 95th percentile of the latency per view::
+
+    histogram_quantile(0.95,
+        sum by (view, le) (rate(steambird_request_duration_seconds_bucket[5m])))
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+
+from steambird.util.middleware import HybridMiddleware
+from steambird.util.queries import observe_queries
+
+
+LOGGER = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+METHODS = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+
+class Metric(NamedTuple):
+    """
+    A counter, or a histogram if it has buckets.
+    """
+    name: str
+    description: str
+    labels: Tuple[str, ...]
+    buckets: Tuple[float, ...] = ()
+
+    @property
+    def type(self) -> str:
+        return 'histogram' if self.buckets else 'counter'
+
+
+REQUEST_DURATION = Metric('steambird_request_duration_seconds',
+                          'Time to handle a request, per URL name.', ('view', 'method'),
+                          LATENCY_BUCKETS)
+REQUEST_QUERIES = Metric('steambird_request_queries',
+                         'Number of SQL queries of a request, per URL name.', ('view',),
+                         QUERY_BUCKETS)
+LOOKUP_DURATION = Metric('steambird_lookup_duration_seconds',
+                         'Time of lookups at external services.', ('kind', 'result'),
+                         LATENCY_BUCKETS)
+MAILS = Metric('steambird_mails_total',
+               'Mails that are queued, sent, or failed to send.', ('result',))
+CACHE_REQUESTS = Metric('steambird_cache_requests_total',
+                        'Retrievals of cached values, per key, by where the value came from.',
+                        ('key', 'result'))
+DB_CONNECTIONS = Metric('steambird_db_connections_total',
+                        'Database connections that are opened, reused by a request, or found '
+                        'unusable.', ('database', 'event'))
+
+METRICS = (REQUEST_DURATION, REQUEST_QUERIES, LOOKUP_DURATION, MAILS, CACHE_REQUESTS,
+           DB_CONNECTIONS)
+
+# (metric name, label values) -> values. A counter has a single value; a histogram has the
+#  count per bucket (not cumulative), the count above the last bucket and the sum.
+Values = Dict[Tuple[str, Tuple[str, ...]], List[float]]
+
+
+def _add(target: Values, source: Values) -> None:
+    for key, values in source.items():
+        if key in target:
+            target[key] = [a + b for a, b in zip(target[key], values)]
+        else:
+            target[key] = list(values)
+
+
+class Registry:
+    """
+    The metrics of this process, see the module documentation.
+
+    :param directory: Directory that the metrics of all processes are written to, or None to
+        only expose the metrics of this process
+    :param flush_interval: Seconds between writes of the metrics of this process
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_interval: float = 5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._values: Values = {}
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, 'metrics-{}.json'.format(self._pid))
+
+    def _check_process(self) -> None:
+        """
+        Starts over after a fork, as the values that were recorded before belong to the parent,
+        and threads do not survive a fork. Must be called with the lock held.
+        """
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+
+        self._pid = pid
+        self._values = {}
+
+        if self.directory is not None:
+            os.makedirs(self.directory, exist_ok=True)
+            threading.Thread(target=self._flush_periodically, daemon=True,
+                             name='metrics-flush').start()
+            atexit.register(self.flush)
+
+    def _flush_periodically(self) -> None:
+        pid = os.getpid()
+        while pid == self._pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def record(self, metric: Metric, value: float, labels: Tuple[str, ...]) -> None:
+        with self._lock:
+            self._check_process()
+            key = (metric.name, labels)
+
+            if metric.buckets:
+                values = self._values.setdefault(key, [0] * (len(metric.buckets) + 2))
+                values[bisect_left(metric.buckets, value)] += 1
+                values[-1] += value
+            else:
+                self._values.setdefault(key, [0])[0] += value
+
+    def snapshot(self) -> Values:
+        with self._lock:
+            self._check_process()
+            return {key: list(values) for key, values in self._values.items()}
+
+    def flush(self) -> None:
+        """
+        Writes the metrics of this process to its file, replacing it at once, so a file is never
+        read half written.
+        """
+        if self.directory is None or self._pid != os.getpid():
+            return
+
+        values = self.snapshot()
+        path = self.path
+        # The periodic flush and the one at exit may run at the same time.
+        temporary = '{}.{}.tmp'.format(path, threading.get_ident())
+        try:
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump([[name, labels, value] for (name, labels), value in values.items()],
+                          file)
+            os.replace(temporary, path)
+        except OSError as error:
+            LOGGER.warning('Could not write metrics to %s: %r', path, error)
+
+    def collect(self) -> Values:
+        """
+        :return: The metrics of this process, and those of the other processes if there is a
+            directory
+        """
+        result = self.snapshot()
+        if self.directory is None:
+            return result
+
+        own = os.path.basename(self.path)
+        for name in os.listdir(self.directory):
+            if name == own or not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as file:
+                    other = {(metric, tuple(labels)): value
+                             for metric, labels, value in json.load(file)}
+            except (OSError, ValueError) as error:
+                LOGGER.warning('Could not read metrics from %s: %r', name, error)
+                continue
+            _add(result, other)
+
+        return result
+
+
+_registry: Optional[Registry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> Registry:
+    """
+    :return: The registry of this process, configured with the ``METRICS_DIR`` and
+        ``METRICS_FLUSH_INTERVAL`` settings
+    """
+    global _registry  # pylint: disable=global-statement
+    with _registry_lock:
+        if _registry is None:
+            _registry = Registry(getattr(settings, 'METRICS_DIR', None),
+                                 getattr(settings, 'METRICS_FLUSH_INTERVAL', 5))
+        return _registry
+
+
+def record(metric: Metric, value: float = 1, **labels) -> None:
+    """
+    Observes a value of a histogram, or adds a value to a counter.
+
+    :param metric: One of METRICS
+    :param value: The value, 1 by default
+    :param labels: A value for every label of the metric
+    """
+    get_registry().record(metric, value, tuple(str(labels[name]) for name in metric.labels))
+
+
+@contextmanager
+def lookup_timer(kind: str):
+    """
+    Records the duration of a lookup at an external service, and whether it raised.
+
+    :param kind: The kind of lookup, such as 'isbn', 'doi' or 'people'
+    """
+    start = time.perf_counter()
+    result = 'error'
+    try:
+        yield
+        result = 'ok'
+    finally:
+        record(LOOKUP_DURATION, time.perf_counter() - start, kind=kind, result=result)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _series(name: str, labels: List[Tuple[str, str]], value: float) -> str:
+    if not labels:
+        return '{} {}'.format(name, repr(float(value)))
+    return '{}{{{}}} {}'.format(
+        name, ','.join('{}="{}"'.format(label, _escape(label_value))
+                       for label, label_value in labels), repr(float(value)))
+
+
+def exposition(values: Optional[Values] = None) -> str:
+    """
+    :param values: The values to expose, the metrics of all processes by default
+    :return: The metrics in the Prometheus text format
+    """
+    if values is None:
+        values = get_registry().collect()
+
+    lines = []
+    for metric in METRICS:
+        lines.append('# HELP {} {}'.format(metric.name, metric.description))
+        lines.append('# TYPE {} {}'.format(metric.name, metric.type))
+
+        for (name, label_values), value in sorted(values.items()):
+            if name != metric.name:
+                continue
+            labels = list(zip(metric.labels, label_values))
+
+            if not metric.buckets:
+                lines.append(_series(metric.name, labels, value[0]))
+                continue
+
+            count = 0
+            for bound, bucket in zip(metric.buckets + (float('inf'),), value):
+                count += bucket
+                le = '+Inf' if bound == float('inf') else repr(float(bound))
+                lines.append(_series(metric.name + '_bucket', labels + [('le', le)], count))
+            lines.append(_series(metric.name + '_sum', labels, value[-1]))
+            lines.append(_series(metric.name + '_count', labels, count))
+
+    return '\n'.join(lines) + '\n'
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Records the duration and number of queries of every request, by URL name. Requests that do
+    not match a URL are recorded as 'unmatched', so the number of series stays bounded.
+    """
+
+    def handle(self, request):
+        queries = _QueryCounter()
+        start = time.perf_counter()
+        with observe_queries(queries):
+            response = self.get_response(request)
+        self._record(request, time.perf_counter() - start, queries.count)
+        return response
+
+    async def ahandle(self, request):
+        queries = _QueryCounter()
+        start = time.perf_counter()
+        with observe_queries(queries):
+            response = await self.get_response(request)
+        self._record(request, time.perf_counter() - start, queries.count)
+        return response
+
+    @staticmethod
+    def _record(request, duration: float, queries: int) -> None:
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        record(REQUEST_DURATION, duration, view=view,
+               method=request.method if request.method in METHODS else 'other')
+        record(REQUEST_QUERIES, queries, view=view)
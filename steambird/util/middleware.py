@@ -0,0 +1,37 @@
+"""
+Base of the middleware of the project.
+
+Under ASGI, Django runs middleware that only supports sync code in a thread, and all middleware
+and views after it too, as it cannot switch back to async. Sync code of requests runs in a single
+thread, one request at a time, so that would also serve async views one at a time. The middleware
+of the project therefore supports both, and runs in the mode of the server.
+"""
+import asyncio
+
+
+class HybridMiddleware:
+    """
+    Middleware that supports both sync and async requests. It is async when the handler after it
+    is, which Django makes so under ASGI if all middleware after it supports that. Subclasses
+    implement :py:meth:`handle` and :py:meth:`ahandle`, which call ``self.get_response``.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Makes asyncio.iscoroutinefunction(self) true, as Django's MiddlewareMixin does.
+            # pylint: disable=protected-access
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.ahandle(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def ahandle(self, request):
+        raise NotImplementedError
@@ -0,0 +1,174 @@
+"""
+Detection of N+1 queries: the same SQL statement executed over and over with different
+parameters, typically once per object of a list, where a single ``select_related``,
+``prefetch_related`` or ``IN`` query would do.
+
+:py:class:`NPlusOneMiddleware` watches every request, and logs or raises
+(``N_PLUS_ONE_ACTION``) when a statement is executed ``N_PLUS_ONE_THRESHOLD`` times or more. It
+reports the Python code that executed the statement, for example::
+
+    12 times: SELECT ... FROM "steambird_mspline" WHERE "steambird_mspline"."msp_id" = %s ...
+      at MSP.resolved (steambird/models/msp.py:67)
+      called from LmlExport.form_valid (steambird/boecie/views.py:412)
+
+In development the middleware logs, in tests it raises, so the test that requests the page fails.
+:py:func:`detect_n_plus_one` does the same for code outside of requests.
+"""
+import logging
+import os
+import re
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, List
+
+from django import db
+from django.conf import settings
+
+from steambird.util.middleware import HybridMiddleware
+from steambird.util.queries import observe_queries
+
+
+LOGGER = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DJANGO_DB_DIR = os.path.dirname(os.path.abspath(db.__file__))
+
+_COMPREHENSIONS = {'<listcomp>', '<dictcomp>', '<setcomp>', '<genexpr>'}
+
+# Prefetches and filters on lists result in IN clauses with a varying number of parameters.
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+class RepeatedQueries(Exception):
+    """
+    Raised when a statement is executed more often than the threshold, if that is configured.
+    """
+
+
+def fingerprint(sql: str) -> str:
+    """
+    :param sql: A statement, with placeholders for its parameters
+    :return: The statement, with lists of parameters collapsed, so statements that only differ in
+        their parameters have the same fingerprint
+    """
+    return _IN_LIST.sub('IN (...)', sql)
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    name = code.co_name
+    owner = frame.f_locals.get('self', frame.f_locals.get('cls'))
+    if owner is not None:
+        name = '{}.{}'.format((owner if isinstance(owner, type) else type(owner)).__name__, name)
+
+    return '{} ({}:{})'.format(name, os.path.relpath(code.co_filename, os.path.dirname(
+        PROJECT_DIR)), frame.f_lineno)
+
+
+def call_site(depth: int = 2) -> List[str]:
+    """
+    :param depth: Number of frames to return
+    :return: The innermost frames of project code that led to the statement that is executed,
+        innermost first. Frames of execute wrappers, which run before Django's database layer,
+        of middleware, which is on the stack of every request, and of comprehensions are
+        skipped.
+    """
+    frame = sys._getframe(1)  # pylint: disable=protected-access
+    in_database_layer = False
+    result = []
+
+    while frame is not None and len(result) < depth:
+        filename = frame.f_code.co_filename
+        if filename.startswith(DJANGO_DB_DIR):
+            in_database_layer = True
+        elif in_database_layer and filename.startswith(PROJECT_DIR) and \
+                frame.f_code.co_name not in _COMPREHENSIONS and \
+                not hasattr(frame.f_locals.get('self'), 'get_response'):
+            result.append(_describe(frame))
+        frame = frame.f_back
+
+    return result
+
+
+class QueryRepetitions:
+    """
+    Execute wrapper that counts statements by fingerprint. Statements without parameters, and
+    executemany, are not counted. The call site of a statement is found when it is repeated for
+    the first time, so statements that are executed once cost almost nothing.
+    """
+
+    def __init__(self, threshold: int):
+        self.threshold = threshold
+        self.counts: Counter = Counter()
+        self.call_sites: Dict[str, List[str]] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        if params and not many:
+            key = fingerprint(sql)
+            self.counts[key] += 1
+            if self.counts[key] == 2:
+                self.call_sites[key] = call_site()
+
+        return execute(sql, params, many, context)
+
+    def problems(self) -> List[str]:
+        """
+        :return: A description of every statement that was executed threshold times or more,
+            most executed first
+        """
+        return [
+            '{} times: {}\n{}'.format(count, sql, '\n'.join(
+                '  {} {}'.format('at' if i == 0 else 'called from', frame)
+                for i, frame in enumerate(self.call_sites[sql] or ['unknown code'])))
+            for sql, count in self.counts.most_common()
+            if count >= self.threshold
+        ]
+
+
+@contextmanager
+def detect_n_plus_one(threshold: int = 5):
+    """
+    Counts the statements that are executed within the block, on all databases and in all
+    threads that run in its context.
+
+    :param threshold: Number of executions of a statement from which it is reported
+    :return: The :py:class:`QueryRepetitions`, of which the problems can be retrieved after the
+        block
+    """
+    repetitions = QueryRepetitions(threshold)
+    with observe_queries(repetitions):
+        yield repetitions
+
+
+class NPlusOneMiddleware(HybridMiddleware):
+    """
+    Reports repeated statements per request, see the module documentation. Only in
+    ``MIDDLEWARE`` when ``N_PLUS_ONE_ACTION`` is set, which it is not in production.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.action = getattr(settings, 'N_PLUS_ONE_ACTION', None)
+        self.threshold = getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5)
+
+    def handle(self, request):
+        with detect_n_plus_one(self.threshold) as repetitions:
+            response = self.get_response(request)
+        self._report(request, repetitions)
+        return response
+
+    async def ahandle(self, request):
+        with detect_n_plus_one(self.threshold) as repetitions:
+            response = await self.get_response(request)
+        self._report(request, repetitions)
+        return response
+
+    def _report(self, request, repetitions: QueryRepetitions) -> None:
+        problems = repetitions.problems()
+        if problems:
+            message = 'Repeated queries in {} {}:\n{}'.format(
+                request.method, request.path, '\n'.join(problems))
+            if self.action == 'raise':
+                raise RepeatedQueries(message)
+            LOGGER.warning(message)
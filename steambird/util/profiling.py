@@ -0,0 +1,209 @@
+"""
+Opt-in profiling of requests. For a sample of the requests, :py:class:`ProfilingMiddleware`
+measures the total time, the number and time of SQL queries, the time spent rendering templates
+and the number and time of outbound HTTP calls. These are added to the response as a
+``Server-Timing`` header, which browsers show in their developer tools, and logged as one line.
+
+Profiling is enabled by setting ``PROFILING_SAMPLE_RATE`` to the fraction of the requests that is
+profiled. Requests that are not sampled only cost a random number, and when the sample rate is 0
+the middleware is left out of ``MIDDLEWARE`` altogether. Template time is measured by the
+:py:class:`ProfilingTemplates` template backend, only while a request is profiled.
+
+Measurements are kept in a context variable, so every request (and every thread or task that runs
+in its context) has its own :py:class:`Profile`. Outbound HTTP calls are summed, also when they are
+made concurrently, and template time includes the queries that templates make while rendering.
+"""
+import contextvars
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, reraise, Template
+
+from steambird.util.middleware import HybridMiddleware
+from steambird.util.queries import observe_queries
+
+
+LOGGER = logging.getLogger(__name__)
+
+_current_profile: 'contextvars.ContextVar[Optional[Profile]]' = \
+    contextvars.ContextVar('steambird_profile', default=None)
+
+
+class Profile:
+    """
+    The measurements of a single request, in seconds.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.total = 0.0
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.http_count = 0
+        self.http_time = 0.0
+        self.rendering = False
+        self._http_lock = threading.Lock()
+
+    def stop(self) -> None:
+        self.total = time.perf_counter() - self.start
+
+    def execute(self, execute, sql, params, many, context):
+        """
+        Counts and times a query; used with :py:func:`steambird.util.queries.observe_queries`.
+        """
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_count += 1
+            self.sql_time += time.perf_counter() - start
+
+    def add_http(self, duration: float) -> None:
+        # Calls may be made from other threads at the same time.
+        with self._http_lock:
+            self.http_count += 1
+            self.http_time += duration
+
+    def server_timing(self) -> str:
+        """
+        :return: The value of the Server-Timing header, with durations in milliseconds
+        """
+        return ', '.join([
+            'total;dur={:.1f}'.format(self.total * 1000),
+            'sql;desc="{} queries";dur={:.1f}'.format(self.sql_count, self.sql_time * 1000),
+            'template;dur={:.1f}'.format(self.template_time * 1000),
+            'http;desc="{} calls";dur={:.1f}'.format(self.http_count, self.http_time * 1000),
+        ])
+
+    def as_dict(self) -> dict:
+        return {
+            'total_ms': round(self.total * 1000, 1),
+            'sql_count': self.sql_count,
+            'sql_ms': round(self.sql_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'http_count': self.http_count,
+            'http_ms': round(self.http_time * 1000, 1),
+        }
+
+
+def current_profile() -> Optional[Profile]:
+    """
+    :return: The profile of the request that is handled, if it is profiled
+    """
+    return _current_profile.get()
+
+
+@contextmanager
+def outbound_call():
+    """
+    Measures an outbound HTTP call for the profile of the current request, if there is one.
+    """
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_http(time.perf_counter() - start)
+
+
+class _ProfiledTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current_profile.get()
+        # Templates that are rendered while rendering another template are already measured.
+        if profile is None or profile.rendering:
+            return super().render(context, request)
+
+        profile.rendering = True
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            profile.template_time += time.perf_counter() - start
+            profile.rendering = False
+
+
+class ProfilingTemplates(DjangoTemplates):
+    """
+    The Django template backend, of which the templates add their rendering time to the profile
+    of the current request, if it is profiled.
+    """
+
+    def from_string(self, template_code):
+        return _ProfiledTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return _ProfiledTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Profiles a sample of the requests, see the module documentation. Should be the first
+    middleware, so the time of all other middleware is included.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+
+    def handle(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = Profile()
+        token = _current_profile.set(profile)
+        try:
+            with observe_queries(profile.execute):
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._report(request, response, profile)
+
+    async def ahandle(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        profile = Profile()
+        token = _current_profile.set(profile)
+        try:
+            with observe_queries(profile.execute):
+                response = await self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        return self._report(request, response, profile)
+
+    @staticmethod
+    def _report(request, response, profile: Profile):
+        profile.stop()
+        response['Server-Timing'] = ', '.join(
+            filter(None, [response.get('Server-Timing'), profile.server_timing()]))
+
+        match = request.resolver_match
+        LOGGER.info(
+            '%s %s %s view=%s total=%.1fms sql=%d/%.1fms template=%.1fms http=%d/%.1fms',
+            request.method, request.path, response.status_code,
+            match.view_name if match else '-', profile.total * 1000, profile.sql_count,
+            profile.sql_time * 1000, profile.template_time * 1000, profile.http_count,
+            profile.http_time * 1000,
+            extra={
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'view': match.view_name if match else None,
+                'profile': profile.as_dict(),
+            })
+
+        return response
@@ -0,0 +1,51 @@
+"""
+Observation of the SQL queries that are made within a block of code, such as a request.
+
+``connection.execute_wrapper`` only applies to the connections of the current thread. Under ASGI,
+the sync parts of a request, such as sync views, run in another thread than its middleware, with
+connections of their own, so their queries would not be seen. Instead, every connection has a
+single execute wrapper, which passes its queries to the observers of the current context, see
+:py:func:`observe_queries`. Context variables are copied to the threads that run sync code for an
+async request (``sync_to_async``), so those queries are observed too.
+"""
+import contextvars
+from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Tuple
+
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+_observers: 'contextvars.ContextVar[Tuple[Callable, ...]]' = \
+    contextvars.ContextVar('steambird_query_observers', default=())
+
+
+def _observe(execute, sql, params, many, context):
+    # The first observer is the outermost, like the first of a connection's execute wrappers.
+    for observer in reversed(_observers.get()):
+        execute = partial(observer, execute)
+    return execute(sql, params, many, context)
+
+
+@receiver(connection_created, dispatch_uid='steambird-observe-queries')
+def _install(connection, **_kwargs) -> None:
+    # Every query is made after its connection was opened, which is done once per thread and
+    #  then whenever it was closed.
+    if _observe not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _observe)
+
+
+@contextmanager
+def observe_queries(observer: Callable):
+    """
+    Passes the queries that are made within the block, on all databases and in all threads that
+    run in its context, to an observer.
+
+    :param observer: An execute wrapper, see ``connection.execute_wrapper``
+    """
+    token = _observers.set(_observers.get() + (observer,))
+    try:
+        yield
+    finally:
+        _observers.reset(token)
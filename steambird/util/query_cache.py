@@ -0,0 +1,154 @@
+"""
+In-process cache for the results of search queries, for searches that are made on every
+keystroke. Queries are normalised before they are used as a key, identical queries that are made
+at the same time result in a single search, and the results of a query can be derived from the
+cached results of a shorter query that it starts with.
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def normalise_query(query: str) -> str:
+    return ' '.join(query.lower().split())
+
+
+class QueryCache:
+    """
+    Caches lists of results by normalised query.
+
+    :param ttl: Seconds a result is used
+    :param matches: (normalised query, result item) -> bool. If given, a query can be answered by
+        filtering the results of a cached shorter query it starts with.
+    :param prefix_max_results: Results of a shorter query are only filtered if there are fewer
+        than this, as a search with many results may not return all of them.
+    :param max_entries: Number of queries to keep
+    """
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, ttl: float, matches: Optional[Callable[[str, Any], bool]] = None,
+                 prefix_max_results: Optional[int] = None, max_entries: int = 1024):
+        self.ttl = ttl
+        self.matches = matches
+        self.prefix_max_results = prefix_max_results
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[str, Tuple[float, List]]' = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _fresh(self, key: str) -> Optional[List]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def _from_prefix(self, key: str) -> Optional[List]:
+        if self.matches is None:
+            return None
+
+        for length in range(len(key) - 1, 0, -1):
+            results = self._fresh(key[:length])
+            if results is None:
+                continue
+            if self.prefix_max_results is not None and \
+                    len(results) >= self.prefix_max_results:
+                return None
+            return [item for item in results if self.matches(key, item)]
+
+        return None
+
+    def _store(self, key: str, results: List) -> None:
+        self._entries[key] = (time.monotonic(), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _begin(self, key: str) -> Tuple[Optional[List], Optional[Future], bool]:
+        """
+        :return: The cached results if there are any, else the pending search and whether the
+            caller has to perform it
+        """
+        with self._lock:
+            results = self._fresh(key)
+            if results is None:
+                results = self._from_prefix(key)
+            if results is not None:
+                return results, None, False
+
+            pending = self._pending.get(key)
+            if pending is not None:
+                return None, pending, False
+
+            pending = self._pending[key] = Future()
+            return None, pending, True
+
+    def _finish(self, key: str, pending: Future, results: List) -> None:
+        with self._lock:
+            self._store(key, results)
+            del self._pending[key]
+        pending.set_result(results)
+
+    def _fail(self, key: str, pending: Future, error: BaseException) -> None:
+        with self._lock:
+            del self._pending[key]
+        pending.set_exception(error)
+
+    def get(self, query: str, search: Callable[[str], List]) -> List:
+        """
+        Returns the results of a query, from the cache if possible, or otherwise by calling
+        `search`. Exceptions of `search` are raised to every caller waiting for this query, and
+        are not cached.
+
+        :param query: The query, as entered
+        :param search: Function that performs the search
+        :return: The results
+        """
+        key = normalise_query(query)
+        results, pending, owner = self._begin(key)
+
+        if results is not None:
+            return results
+        if not owner:
+            return pending.result()
+
+        try:
+            results = search(query)
+        except BaseException as error:
+            self._fail(key, pending, error)
+            raise
+
+        self._finish(key, pending, results)
+        return results
+
+    async def aget(self, query: str, search: Callable[[str], Awaitable[List]]) -> List:
+        """
+        Async version of :py:meth:`get`, with an async `search`. Searches are coalesced with those
+        of :py:meth:`get`.
+        """
+        key = normalise_query(query)
+        results, pending, owner = self._begin(key)
+
+        if results is not None:
+            return results
+        if not owner:
+            return await asyncio.wrap_future(pending)
+
+        try:
+            results = await search(query)
+        except BaseException as error:
+            self._fail(key, pending, error)
+            raise
+
+        self._finish(key, pending, results)
+        return results
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,98 @@
+"""
+A minimal in-process SMTP server that accepts and counts every message, without delivering it.
+It is meant as a local stand-in for a real mail server in benchmarks and tests.
+"""
+import socketserver
+import threading
+from typing import List, Tuple
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    server: 'SMTPSink'
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write('{}\r\n'.format(line).encode('ascii'))
+
+    def _read_data(self) -> bytes:
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                break
+            lines.append(line[1:] if line.startswith(b'..') else line)
+        return b''.join(lines)
+
+    def handle(self) -> None:
+        self._reply('220 localhost SMTP sink')
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+
+            command = line.decode('ascii', 'replace').strip().split(' ', 1)[0].upper()
+
+            if command in ('EHLO', 'HELO'):
+                self._reply('250 localhost')
+            elif command == 'DATA':
+                self._reply('354 End data with <CR><LF>.<CR><LF>')
+                self.server.received(self._read_data())
+                self._reply('250 OK')
+            elif command == 'QUIT':
+                self._reply('221 Bye')
+                return
+            else:
+                # MAIL, RCPT, RSET, NOOP and anything else are simply accepted.
+                self._reply('250 OK')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """
+    SMTP server running in a background thread. Use as a context manager::
+
+        with SMTPSink() as sink:
+            connection = get_connection(host=sink.host, port=sink.port)
+            ...
+            sink.count  # the number of messages that were received
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address: Tuple[str, int] = ('127.0.0.1', 0), keep: bool = False):
+        super().__init__(address, _SMTPHandler)
+        self.keep = keep
+        self.count = 0
+        self.bytes = 0
+        self.messages: List[bytes] = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def host(self) -> str:
+        return self.server_address[0]
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def received(self, data: bytes) -> None:
+        with self._lock:
+            self.count += 1
+            self.bytes += len(data)
+            if self.keep:
+                self.messages.append(data)
+
+    def start(self) -> 'SMTPSink':
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self) -> 'SMTPSink':
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,90 @@
+"""
+Storage of static files in production. ``collectstatic`` (run when the Docker image is built)
+gives every file a name with a hash of its contents, as ManifestStaticFilesStorage does, so the
+files can be cached by browsers forever: a changed file gets a new name. The files are also
+compressed in advance, so they are not compressed for every request:
+
+- with gzip, as ``name.gz``, which uWSGI serves to browsers that accept it (see entrypoint.sh),
+- with brotli, as ``name.br``, if the ``brotli`` package is installed, for a proxy that can serve
+  them.
+"""
+import gzip
+import io
+import logging
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+
+LOGGER = logging.getLogger(__name__)
+
+COMPRESSED_EXTENSIONS = ('.css', '.js', '.less', '.map', '.json', '.svg', '.eot', '.ttf', '.ico',
+                         '.txt', '.html', '.xml')
+"""Files that compress well. Images other than svg and woff(2) fonts are compressed already."""
+
+MIN_SIZE = 1024
+"""Smaller files are not worth compressing."""
+
+
+def _gzip(content: bytes) -> bytes:
+    buffer = io.BytesIO()
+    # Without a modification time, the same file always gives the same archive.
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as file:
+        file.write(content)
+    return buffer.getvalue()
+
+
+def _brotli(content: bytes) -> bytes:
+    # pylint: disable=import-outside-toplevel
+    import brotli
+
+    return brotli.compress(content)
+
+
+def _compressors():
+    """
+    :return: Extension -> function that compresses contents, of the available compressions
+    """
+    result = {'.gz': _gzip}
+    try:
+        # pylint: disable=import-outside-toplevel, unused-import
+        import brotli
+        result['.br'] = _brotli
+    except ImportError:
+        LOGGER.info('brotli is not installed, static files are only compressed with gzip')
+    return result
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage, which also compresses the hashed files after post-processing.
+    """
+
+    def post_process(self, *args, **kwargs):
+        yield from super().post_process(*args, **kwargs)
+
+        # collectstatic passes dry_run as a keyword, as ManifestFilesMixin expects.
+        if not kwargs.get('dry_run'):
+            # Not the names that post_process yields: those include the names that a file had
+            #  before the names of the files it refers to were filled in, which are deleted.
+            self.compress(set(self.hashed_files.values()))
+
+    def compress(self, names) -> None:
+        """
+        Writes a compressed copy next to each of the files that compresses well, with every
+        available compression, unless the copy is hardly smaller.
+        """
+        available = _compressors()
+
+        for name in names:
+            if not name.endswith(COMPRESSED_EXTENSIONS):
+                continue
+            with self.open(name) as file:
+                content = file.read()
+            if len(content) < MIN_SIZE:
+                continue
+
+            for extension, compress in available.items():
+                compressed = compress(content)
+                if len(compressed) < len(content) * 0.95:
+                    with open(self.path(name + extension), 'wb') as file:
+                        file.write(compressed)
@@ -1,10 +1,13 @@
+from django.conf import settings
 from django.contrib.auth import login
 from django.http import HttpResponse, HttpResponseRedirect
 from django.shortcuts import render
 from django.urls import reverse
+from django.utils.crypto import constant_time_compare
 from django.views import View
 
 from steambird.models import AuthToken
+from steambird.util.metrics import exposition
 
 
 def handler404(request, exception=None, template_name="errors/404.html"):
@@ -56,3 +59,21 @@ class TokenLogin(View):
             return HttpResponseRedirect(redirect_to=request.GET['next'])
 
         return HttpResponseRedirect(redirect_to=reverse('index'))
+
+
+class MetricsView(View):
+    """
+    Metrics of all processes in the Prometheus text format, see :py:mod:`steambird.util.metrics`.
+    Available to staff, and to scrapers that send ``Authorization: Bearer <METRICS_TOKEN>``.
+    """
+
+    # pylint: disable=no-self-use
+    def get(self, request):
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        authorization = request.META.get('HTTP_AUTHORIZATION', '')
+
+        if not (request.user.is_active and request.user.is_staff) and \
+                not (token and constant_time_compare(authorization, 'Bearer ' + token)):
+            return HttpResponse(status=401, reason="No Credentials Provided")
+
+        return HttpResponse(exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')